@@ -0,0 +1,58 @@
+import argparse
+import json
+import sys
+from backend.db import connect
+from backend import workers
+from backend.logs import setup_logging, LOG_LEVEL, LOG_FORMAT
+
+# Headless single cycle without Streamlit:
+#   python -m backend --keywords "kw1, kw2" [url ...]
+# With no URLs every URL saved from the UI is scanned.
+
+def saved_urls():
+    with connect() as conn:
+        c = conn.cursor()
+        c.execute("SELECT url FROM urls ORDER BY id")
+        return [row[0] for row in c.fetchall()]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m backend', description='Run one monitoring cycle.')
+    parser.add_argument('urls', nargs='*', help='URLs to scan (default: all saved URLs)')
+    parser.add_argument('--keywords', default='', help='comma-separated keywords')
+    parser.add_argument('--section', default=None, help='only scan the element with this id')
+    parser.add_argument('--output', default=None, help='write the results as JSON to this file')
+    parser.add_argument('--workers', type=int, default=workers.WORKER_PROCESSES,
+                        help='processes that parse and diff fetched pages; 0 does it in this process')
+    parser.add_argument('--log-level', default=LOG_LEVEL, help=f'default: {LOG_LEVEL}')
+    parser.add_argument('--log-format', choices=('text', 'json'), default=LOG_FORMAT)
+    args = parser.parse_args(argv)
+    setup_logging(args.log_level, args.log_format)
+    workers.WORKER_PROCESSES = args.workers
+
+    urls = args.urls or saved_urls()
+    if not urls:
+        print("No URLs to scan.")
+        return 1
+    keywords = [k.strip() for k in args.keywords.split(",") if k.strip()]
+
+    # Imported here so --help and argument errors return without loading the scan stack
+    from backend.monitor import run_cycle
+    from backend import alert, pdf_report
+    try:
+        results = run_cycle(urls, keywords, args.section)
+    finally:
+        workers.shutdown()
+        # The cycle only queued its alerts and reports; they go out before the process exits
+        alert.flush()
+        pdf_report.shutdown()
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f)
+    for url, result in results.items():
+        status = result["error"] or ("changed" if result["changes"] else "unchanged")
+        print(f"{url}: {status}; keywords: {', '.join(result['found_keywords']) or '-'}")
+    return 0 if all(not result["error"] for result in results.values()) else 2
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,25 +1,254 @@
-import smtplib
-from email.mime.text import MIMEText
-import logging
-
-# Configure logging
-logging.basicConfig(filename='alert_errors.log', level=logging.ERROR)
-
-def alert_user(url, keywords, message):
-    msg = MIMEText(message)
-    msg['Subject'] = f'Dark Web Alert: Changes Detected for {url}'
-    msg['From'] = 'your_email@gmail.com'  # Replace with your email
-    msg['To'] = 'receiver_email@example.com'  # Replace with recipient email
-
-    try:
-        with smtplib.SMTP('smtp.gmail.com', 587) as s:
-            s.starttls()
-            s.login('your_email@gmail.com', 'your_app_password')  # Replace with your email and App Password
-            s.send_message(msg)
-        print("Alert sent.")
-    except Exception as e:
-        print(f"Failed to send alert: {e}")
-        logging.error(f"Alert failed for {url}: {e}")  # Log the error
-        # Fallback: Save alert to a file
-        with open('failed_alerts.txt', 'a') as f:
-            f.write(f"Time: {time.ctime()}\nURL: {url}\nMessage: {message}\nError: {e}\n{'-'*50}\n")
\ No newline at end of file
+import smtplib
+from email.mime.text import MIMEText
+import logging
+import threading
+import time
+from backend.db import connect
+from backend import metrics
+
+logger = logging.getLogger(__name__)
+# Failed alerts are also kept in their own file, as before
+_error_log = logging.FileHandler('alert_errors.log', delay=True)
+_error_log.setLevel(logging.ERROR)
+logger.addHandler(_error_log)
+
+SMTP_HOST = 'smtp.gmail.com'
+SMTP_PORT = 587
+SMTP_STARTTLS = True
+SMTP_USER = 'your_email@gmail.com'  # Replace with your email; None skips login
+SMTP_PASSWORD = 'your_app_password'  # Replace with your App Password
+SENDER = 'your_email@gmail.com'  # Replace with your email
+RECIPIENT = 'receiver_email@example.com'  # Replace with recipient email
+FAILED_ALERTS_FILE = 'failed_alerts.txt'
+
+# Retry schedule: RETRY_BASE * 2**attempt seconds, then give up and write to FAILED_ALERTS_FILE
+MAX_SEND_ATTEMPTS = 6
+RETRY_BASE = 30
+POLL_INTERVAL = 5
+# A claimed alert ('sending') that is neither sent nor failed within this long is claimed again,
+# so alerts claimed by a process that died are not lost
+SEND_LEASE = 600
+# The SMTP connection is kept open between alerts and closed after this long unused
+SMTP_IDLE_TIMEOUT = 60
+# Hold alerts and send one digest per cycle instead of one mail per URL
+DIGEST_ALERTS = False
+# Held alerts are sent anyway after this long, in case no cycle releases them
+DIGEST_MAX_WAIT = 900
+
+def enqueue_alert(url, subject, body, hold=False):
+    now = time.time()
+    with connect() as conn:
+        c = conn.cursor()
+        c.execute(
+            '''INSERT INTO alert_queue (url, subject, body, status, attempts, created_at, next_attempt)
+               VALUES (?, ?, ?, ?, 0, ?, ?)''',
+            (url, subject, body, 'held' if hold else 'pending', now, now)
+        )
+        conn.commit()
+        return c.lastrowid
+
+def alert_user(url, keywords, message):
+    # Only queues the alert; the dispatcher thread does the SMTP work off the scan path
+    enqueue_alert(url, f'Dark Web Alert: Changes Detected for {url}', message, hold=DIGEST_ALERTS)
+    dispatcher.start()
+    dispatcher.wake()
+
+def release_held(max_age=None):
+    # Folds held alerts into a single digest; max_age only releases those waiting that long
+    cutoff = time.time() - max_age if max_age is not None else None
+    with connect() as conn:
+        c = conn.cursor()
+        # One write transaction, so a cycle and a dispatcher (of this or another process)
+        # releasing at the same time cannot both digest the same alerts
+        c.execute("BEGIN IMMEDIATE")
+        if cutoff is None:
+            c.execute("SELECT id, url, body FROM alert_queue WHERE status = 'held' ORDER BY id")
+        else:
+            c.execute(
+                "SELECT id, url, body FROM alert_queue WHERE status = 'held' AND created_at <= ? ORDER BY id",
+                (cutoff,)
+            )
+        rows = c.fetchall()
+        if not rows:
+            conn.rollback()
+            return None
+        urls = sorted({row[1] for row in rows})
+        body = f"\n{'-' * 50}\n".join(row[2] for row in rows)
+        now = time.time()
+        c.execute(
+            '''INSERT INTO alert_queue (url, subject, body, status, attempts, created_at, next_attempt)
+               VALUES (?, ?, ?, 'pending', 0, ?, ?)''',
+            (", ".join(urls), f'Dark Web Alert digest: {len(rows)} alerts for {len(urls)} URLs', body, now, now)
+        )
+        digest_id = c.lastrowid
+        c.executemany("UPDATE alert_queue SET status = 'digested' WHERE id = ?", [(row[0],) for row in rows])
+        conn.commit()
+    dispatcher.start()
+    dispatcher.wake()
+    return digest_id
+
+def flush():
+    # Before the process exits: held alerts go out as a digest and every due alert is sent. The
+    # dispatcher thread is stopped first, so it is not killed halfway through a send.
+    release_held()
+    dispatcher.stop(drain=True)
+
+def _record_failure(url, message, error):
+    logger.error("Alert failed for %s: %s", url, error)
+    # Fallback: Save alert to a file
+    with open(FAILED_ALERTS_FILE, 'a') as f:
+        f.write(f"Time: {time.ctime()}\nURL: {url}\nMessage: {message}\nError: {error}\n{'-'*50}\n")
+
+class AlertDispatcher:
+    def __init__(self):
+        self._smtp = None
+        self._smtp_used = 0
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='alert-dispatcher', daemon=True)
+            self._thread.start()
+
+    def wake(self):
+        self._wake.set()
+
+    def stop(self, timeout=10, drain=False):
+        # drain: one last send of the due alerts, in the calling thread
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout)
+        if drain:
+            try:
+                self.send_pending()
+            except Exception as e:
+                logger.error("Alert dispatcher error: %s", e)
+        self._close()
+
+    def _connect(self):
+        if self._smtp is not None:
+            try:
+                self._smtp.noop()
+                return self._smtp
+            except smtplib.SMTPException:
+                self._close()
+        smtp = smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=60)
+        if SMTP_STARTTLS:
+            smtp.starttls()
+        if SMTP_USER:
+            smtp.login(SMTP_USER, SMTP_PASSWORD)
+        self._smtp = smtp
+        return smtp
+
+    def _close(self):
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._smtp = None
+
+    def _send(self, subject, body):
+        msg = MIMEText(body)
+        msg['Subject'] = subject
+        msg['From'] = SENDER
+        msg['To'] = RECIPIENT
+        start = time.perf_counter()
+        try:
+            self._connect().send_message(msg)
+        except smtplib.SMTPServerDisconnected:
+            # Server dropped the idle connection between our NOOP and the send; retry once fresh
+            self._close()
+            self._connect().send_message(msg)
+        metrics.observe('smtp_send_seconds', time.perf_counter() - start)
+        self._smtp_used = time.monotonic()
+
+    def _claim(self, alert_id):
+        # Every process that queues alerts runs a dispatcher on the same queue (the UI and the
+        # daemon), so an alert is only sent by the one that moves it to 'sending'
+        now = time.time()
+        with connect() as conn:
+            c = conn.cursor()
+            c.execute("BEGIN IMMEDIATE")
+            c.execute(
+                '''UPDATE alert_queue SET status = 'sending', next_attempt = ?
+                   WHERE id = ? AND status IN ('pending', 'sending') AND next_attempt <= ?''',
+                (now + SEND_LEASE, alert_id, now)
+            )
+            conn.commit()
+            return c.rowcount == 1
+
+    def send_pending(self):
+        # Sends every due alert once; returns the number delivered
+        now = time.time()
+        with connect() as conn:
+            c = conn.cursor()
+            c.execute(
+                '''SELECT id, url, subject, body, attempts FROM alert_queue
+                   WHERE status IN ('pending', 'sending') AND next_attempt <= ? ORDER BY id''',
+                (now,)
+            )
+            rows = c.fetchall()
+
+        sent = 0
+        for alert_id, url, subject, body, attempts in rows:
+            if not self._claim(alert_id):
+                # Another dispatcher is sending it
+                continue
+            try:
+                self._send(subject, body)
+                status, next_attempt, error = 'sent', None, None
+                sent += 1
+                metrics.count('alerts_sent')
+                logger.info("Alert sent for %s", url)
+            except Exception as e:
+                self._close()
+                attempts += 1
+                error = str(e)
+                metrics.count('alert_send_failures')
+                logger.warning("Failed to send alert for %s: %s", url, e)
+                if attempts >= MAX_SEND_ATTEMPTS:
+                    status, next_attempt = 'failed', None
+                    _record_failure(url, body, e)
+                else:
+                    status, next_attempt = 'pending', time.time() + RETRY_BASE * 2 ** (attempts - 1)
+            with connect() as conn:
+                conn.execute(
+                    "UPDATE alert_queue SET status = ?, attempts = ?, next_attempt = ?, last_error = ? WHERE id = ?",
+                    (status, attempts, next_attempt, error, alert_id)
+                )
+                conn.commit()
+        return sent
+
+    def _next_due(self):
+        with connect() as conn:
+            c = conn.cursor()
+            c.execute("SELECT MIN(next_attempt), COUNT(*) FROM alert_queue WHERE status IN ('pending', 'sending')")
+            next_due, depth = c.fetchone()
+        metrics.set_gauge('alert_queue_depth', depth)
+        return next_due
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.clear()
+            try:
+                release_held(DIGEST_MAX_WAIT)
+                self.send_pending()
+                next_due = self._next_due()
+            except Exception as e:
+                logger.error("Alert dispatcher error: %s", e)
+                next_due = None
+            if self._smtp is not None and time.monotonic() - self._smtp_used > SMTP_IDLE_TIMEOUT:
+                self._close()
+            wait = POLL_INTERVAL if next_due is None else min(POLL_INTERVAL, max(0, next_due - time.time()))
+            self._wake.wait(wait)
+
+# One dispatcher per process; started on the first queued alert
+dispatcher = AlertDispatcher()
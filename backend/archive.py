@@ -0,0 +1,135 @@
+import os
+import gzip
+import hashlib
+import time
+from backend.db import connect
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+ARCHIVE_DIR = os.path.join(os.path.dirname(__file__), '..', 'archive')
+BLOB_DIR = os.path.join(ARCHIVE_DIR, 'blobs')
+# Manifest entries older than this are pruned, but the newest KEEP_VERSIONS per URL always stay
+RETENTION_DAYS = 30
+KEEP_VERSIONS = 20
+# Blobs younger than this are never collected; a concurrent scan may not have written its manifest row yet
+GC_GRACE_SECONDS = 3600
+COMPRESSION = 'zstd' if zstandard else 'gzip'
+
+_EXTENSIONS = {'zstd': '.zst', 'gzip': '.gz'}
+
+def _compress(data):
+    if COMPRESSION == 'zstd':
+        return zstandard.ZstdCompressor(level=10).compress(data)
+    return gzip.compress(data, compresslevel=6)
+
+def _decompress(data, path):
+    if path.endswith('.zst'):
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+def blob_path(digest):
+    # Whichever compression the blob was written with
+    for ext in _EXTENSIONS.values():
+        path = os.path.join(BLOB_DIR, digest[:2], digest + ext)
+        if os.path.exists(path):
+            return path
+    return None
+
+def put_blob(content):
+    data = content.encode('utf-8')
+    digest = hashlib.sha256(data).hexdigest()
+    if blob_path(digest):
+        return digest
+    directory = os.path.join(BLOB_DIR, digest[:2])
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, digest + _EXTENSIONS[COMPRESSION])
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(_compress(data))
+    os.replace(tmp_path, path)
+    return digest
+
+def read_blob(digest):
+    path = blob_path(digest)
+    if not path:
+        return None
+    with open(path, 'rb') as f:
+        return _decompress(f.read(), path).decode('utf-8')
+
+def save_snapshot(url, html):
+    # Returns (manifest entry id, blob path); identical pages share one blob
+    digest = put_blob(html)
+    with connect() as conn:
+        c = conn.cursor()
+        c.execute(
+            "INSERT INTO archive_manifest (url, timestamp, html_hash, size) VALUES (?, ?, ?, ?)",
+            (url, time.strftime("%Y-%m-%d %H:%M:%S"), digest, len(html))
+        )
+        conn.commit()
+        return c.lastrowid, blob_path(digest)
+
+def set_text_hash(entry_id, digest):
+    # Links a scan's text blob (put_blob) to its snapshot once the scan is recorded
+    with connect() as conn:
+        conn.execute("UPDATE archive_manifest SET text_hash = ? WHERE id = ?", (digest, entry_id))
+        conn.commit()
+
+def touch(url):
+    # Unchanged page: record the scan against the blobs already stored
+    with connect() as conn:
+        c = conn.cursor()
+        c.execute(
+            '''INSERT INTO archive_manifest (url, timestamp, html_hash, text_hash, size)
+               SELECT url, ?, html_hash, text_hash, size FROM archive_manifest
+               WHERE url = ? ORDER BY id DESC LIMIT 1''',
+            (time.strftime("%Y-%m-%d %H:%M:%S"), url)
+        )
+        conn.commit()
+        return c.lastrowid if c.rowcount else None
+
+def previous_text_hash(url, before_id=None):
+    with connect() as conn:
+        c = conn.cursor()
+        c.execute(
+            '''SELECT text_hash FROM archive_manifest
+               WHERE url = ? AND text_hash IS NOT NULL AND id < ?
+               ORDER BY id DESC LIMIT 1''',
+            (url, before_id if before_id is not None else 2 ** 63 - 1)
+        )
+        row = c.fetchone()
+    return row[0] if row else None
+
+def prune(retention_days=RETENTION_DAYS, keep_versions=KEEP_VERSIONS):
+    cutoff = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(time.time() - retention_days * 86400))
+    with connect() as conn:
+        c = conn.cursor()
+        c.execute(
+            '''DELETE FROM archive_manifest WHERE timestamp < ? AND id NOT IN (
+                   SELECT id FROM (
+                       SELECT id, ROW_NUMBER() OVER (PARTITION BY url ORDER BY id DESC) AS rn
+                       FROM archive_manifest
+                   ) WHERE rn <= ?
+               )''',
+            (cutoff, keep_versions)
+        )
+        removed = c.rowcount
+        conn.commit()
+        if not removed:
+            return 0
+        c.execute("SELECT html_hash FROM archive_manifest UNION SELECT text_hash FROM archive_manifest")
+        live = {row[0] for row in c.fetchall() if row[0]}
+
+    deleted = 0
+    grace_cutoff = time.time() - GC_GRACE_SECONDS
+    if os.path.isdir(BLOB_DIR):
+        for directory, _, files in os.walk(BLOB_DIR):
+            for name in files:
+                path = os.path.join(directory, name)
+                digest = name.split('.', 1)[0]
+                if digest not in live and os.path.getmtime(path) < grace_cutoff:
+                    os.remove(path)
+                    deleted += 1
+    return deleted
@@ -0,0 +1,59 @@
+import logging
+import threading
+import time
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+# Consecutive failed fetches before a host is skipped
+FAILURE_THRESHOLD = 3
+# First cool-down; doubled each time the probe after a cool-down fails again
+COOLDOWN = 300
+MAX_COOLDOWN = 3600
+
+def host_of(url):
+    # host:port, like the session pool keys
+    return urlsplit(url).netloc.lower()
+
+class CircuitBreaker:
+    # Per-host breaker shared by every scan in the process. After FAILURE_THRESHOLD failures the host
+    # is skipped until its cool-down ends; then a single probe is let through to test it.
+    def __init__(self, threshold=FAILURE_THRESHOLD, cooldown=COOLDOWN, max_cooldown=MAX_COOLDOWN):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    def blocked_for(self, url):
+        # Seconds until the host may be tried again; 0 when the request can go ahead
+        host = host_of(url)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._hosts.get(host)
+            if entry is None or entry["open_until"] is None:
+                return 0
+            if now < entry["open_until"]:
+                return entry["open_until"] - now
+            if entry["probing"] is not None and now - entry["probing"] < self.cooldown:
+                # Another scan is already probing the host (a probe that never reported expires)
+                return self.cooldown
+            entry["probing"] = now
+            return 0
+
+    def record_success(self, url):
+        with self._lock:
+            self._hosts.pop(host_of(url), None)
+
+    def record_failure(self, url):
+        host = host_of(url)
+        with self._lock:
+            entry = self._hosts.setdefault(host, {"failures": 0, "open_until": None, "cooldown": 0, "probing": None})
+            entry["failures"] += 1
+            if entry["probing"] is not None or entry["failures"] >= self.threshold:
+                entry["cooldown"] = min(self.max_cooldown, entry["cooldown"] * 2 or self.cooldown)
+                entry["open_until"] = time.monotonic() + entry["cooldown"]
+                entry["probing"] = None
+                logger.warning("Skipping %s for %ss after %d failures", host, entry['cooldown'], entry['failures'])
+
+breaker = CircuitBreaker()
@@ -0,0 +1,105 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from backend.db import connect
+
+# How long a crawled link's result is reused, by any target, before it is fetched again
+LINK_CACHE_TTL = 3600
+# Entries kept in memory; older ones are evicted (least recently used) but stay on disk until expiry
+LINK_CACHE_SIZE = 5000
+
+class LinkCache:
+    def __init__(self, ttl=LINK_CACHE_TTL, max_entries=LINK_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _remember(self, url, entry):
+        self._entries[url] = entry
+        self._entries.move_to_end(url)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _load(self, url):
+        with connect() as conn:
+            c = conn.cursor()
+            c.execute(
+                "SELECT fetched_at, fingerprint, body_hash, hit, links FROM link_cache WHERE url = ?",
+                (url,)
+            )
+            row = c.fetchone()
+        if not row:
+            return None
+        return {
+            "fetched_at": row[0],
+            "fingerprint": row[1],
+            "body_hash": row[2],
+            "hit": json.loads(row[3]) if row[3] else None,
+            "links": json.loads(row[4]) if row[4] else [],
+        }
+
+    def get(self, url, fingerprint):
+        # Returns (hit, links) like a crawler visit, or None on a miss
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is not None:
+                self._entries.move_to_end(url)
+        if entry is None:
+            entry = self._load(url)
+            if entry is None:
+                return None
+            with self._lock:
+                self._remember(url, entry)
+        if time.time() - entry["fetched_at"] > self.ttl or entry["fingerprint"] != fingerprint:
+            # Expired, or matched against a different keyword list
+            self.invalidate(url)
+            return None
+        return entry["hit"], entry["links"]
+
+    def put(self, url, fingerprint, body, hit, links):
+        entry = {
+            "fetched_at": time.time(),
+            "fingerprint": fingerprint,
+            "body_hash": hashlib.sha256(body.encode('utf-8')).hexdigest(),
+            "hit": hit,
+            "links": links,
+        }
+        with self._lock:
+            self._remember(url, entry)
+        with connect() as conn:
+            conn.execute(
+                '''INSERT OR REPLACE INTO link_cache (url, fetched_at, fingerprint, body_hash, hit, links)
+                   VALUES (?, ?, ?, ?, ?, ?)''',
+                (url, entry["fetched_at"], fingerprint, entry["body_hash"],
+                 json.dumps(hit) if hit else None, json.dumps(links))
+            )
+            conn.commit()
+
+    def invalidate(self, url):
+        with self._lock:
+            self._entries.pop(url, None)
+        with connect() as conn:
+            conn.execute("DELETE FROM link_cache WHERE url = ?", (url,))
+            conn.commit()
+
+    def purge(self, fingerprint=None):
+        # Drops expired entries, and with a fingerprint every entry built for another keyword list
+        cutoff = time.time() - self.ttl
+        with self._lock:
+            for url, entry in list(self._entries.items()):
+                if entry["fetched_at"] < cutoff or (fingerprint is not None and entry["fingerprint"] != fingerprint):
+                    del self._entries[url]
+        with connect() as conn:
+            if fingerprint is None:
+                conn.execute("DELETE FROM link_cache WHERE fetched_at < ?", (cutoff,))
+            else:
+                conn.execute(
+                    "DELETE FROM link_cache WHERE fetched_at < ? OR fingerprint != ?",
+                    (cutoff, fingerprint)
+                )
+            conn.commit()
+
+link_cache = LinkCache()
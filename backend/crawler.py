@@ -0,0 +1,78 @@
+import asyncio
+import logging
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+# Depth 1 scans the links found on the target itself, as before; raise it to follow links further
+MAX_DEPTH = 1
+# Links taken from each page, in document order
+MAX_FANOUT = 10
+# Hard cap on links visited per target
+MAX_LINKS = 200
+PER_HOST_LIMIT = 2
+WORKERS = 8
+
+def is_onion_link(url):
+    host = urlsplit(url).hostname or ''
+    return host.endswith('.onion')
+
+async def crawl(seeds, visit, max_depth=MAX_DEPTH, fanout=MAX_FANOUT, max_links=MAX_LINKS,
+                per_host=PER_HOST_LIMIT, workers=WORKERS, seen=None, host_limits=None,
+                link_filter=is_onion_link):
+    # visit(url) is a coroutine returning (result, child_links). seen maps url -> future of that
+    # pair and may be shared by several crawls of one cycle, so each link is fetched only once.
+    # host_limits maps host -> semaphore; shared the same way, it caps a host's fetches across
+    # every crawl of the cycle rather than per crawl.
+    # Returns [(url, result)] ordered by (depth, url), independent of completion order.
+    loop = asyncio.get_running_loop()
+    seen = {} if seen is None else seen
+    queue = asyncio.PriorityQueue()
+    depths = {}
+    results = {}
+    host_limits = {} if host_limits is None else host_limits
+
+    def enqueue(links, depth):
+        for link in [link for link in links if link_filter(link)][:fanout]:
+            if link in depths or len(depths) >= max_links:
+                continue
+            depths[link] = depth
+            queue.put_nowait((depth, link))
+
+    async def fetch_once(url):
+        future = loop.create_future()
+        seen[url] = future
+        try:
+            host = urlsplit(url).hostname or ''
+            limit = host_limits.setdefault(host, asyncio.Semaphore(per_host))
+            async with limit:
+                future.set_result(await visit(url))
+        except Exception as e:
+            logger.warning("Failed to scrape additional link %s: %s", url, e)
+        finally:
+            # Never leave other crawls waiting on a link that failed or was cancelled
+            if not future.done():
+                future.set_result((None, []))
+
+    async def worker():
+        while True:
+            depth, url = await queue.get()
+            try:
+                if url not in seen:
+                    await fetch_once(url)
+                result, links = await seen[url]
+                results[url] = result
+                if depth < max_depth:
+                    enqueue(links, depth + 1)
+            finally:
+                queue.task_done()
+
+    enqueue(seeds, 1)
+    tasks = [asyncio.create_task(worker()) for _ in range(workers)]
+    try:
+        await queue.join()
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    return [(url, results.get(url)) for url in sorted(depths, key=lambda u: (depths[u], u))]
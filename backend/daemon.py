@@ -0,0 +1,224 @@
+import argparse
+import asyncio
+import logging
+import signal
+import sys
+import threading
+import time
+from backend.db import get_setting, set_setting, monitored_urls
+from backend import metrics
+from backend import workers
+from backend.logs import setup_logging, LOG_LEVEL, LOG_FORMAT
+from backend.engine import TOR_CONCURRENCY, CLEARNET_CONCURRENCY
+from backend.scheduling import BASE_INTERVAL, ensure_schedules, due_targets, next_due_time, record_outcomes
+
+# Standalone scheduler: python -m backend.daemon
+# Scans the URLs marked as monitored in urls.db with the keywords saved from the UI, and writes
+# every result to the database, where the UI reads it. Runs until SIGINT/SIGTERM.
+# Each URL has its own schedule (backend.scheduling); due URLs are dispatched as they come due,
+# so a slow Tor site only delays itself.
+
+logger = logging.getLogger(__name__)
+
+# How often the daemon re-reads its settings and the schedule, and reports that it is alive
+SETTINGS_POLL = 5
+# Due URLs started per dispatch, highest priority first; the rest wait for the next poll
+MAX_DISPATCH = 50
+# Per-period work, which a standalone cycle does after every run but a poll should not:
+# held alerts go out as one digest, archive retention and link cache expiry,
+# and one cycle_metrics row summarizing the batches dispatched in the period
+DIGEST_INTERVAL = 300
+HOUSEKEEPING_INTERVAL = 3600
+METRICS_INTERVAL = 300
+
+class MonitorDaemon:
+    def __init__(self, urls=None, keywords=None, interval=None, section=None,
+                 tor_limit=TOR_CONCURRENCY, clearnet_limit=CLEARNET_CONCURRENCY, metrics_file=None):
+        # Arguments given on the command line override the settings stored by the UI
+        self.urls = urls
+        self.keywords = keywords
+        self.interval = interval
+        self.section = section
+        self.tor_limit = tor_limit
+        self.clearnet_limit = clearnet_limit
+        # Prometheus text file rewritten after every batch, if set
+        self.metrics_file = metrics_file
+        self._stop = threading.Event()
+        self._last_run = {}
+
+    def enabled(self):
+        return bool(self.urls) or get_setting('monitoring_enabled', False)
+
+    def targets(self):
+        urls = self.urls or monitored_urls()
+        keywords = self.keywords if self.keywords is not None else get_setting('keywords', [])
+        return urls, keywords
+
+    def base_interval(self):
+        # Starting interval for URLs without a schedule yet
+        return self.interval or get_setting('interval', BASE_INTERVAL)
+
+    def heartbeat(self, state):
+        set_setting('daemon_heartbeat', {"time": time.time(), "state": state})
+
+    def run_once(self):
+        # Scans every target now, whatever its schedule, and reschedules them from the outcome
+        from backend.monitor import run_cycle
+        urls, keywords = self.targets()
+        if not urls:
+            logger.info("No monitored URLs; nothing to scan")
+            return {}
+        ensure_schedules(urls, self.base_interval())
+        results = run_cycle(urls, keywords, self.section,
+                            tor_limit=self.tor_limit, clearnet_limit=self.clearnet_limit)
+        record_outcomes(results)
+        self._log_batch(results)
+        return results
+
+    def _log_batch(self, results):
+        errors = sum(1 for result in results.values() if result.get("error"))
+        logger.info("Scanned %d URLs (%d errors)", len(results), errors)
+        set_setting('last_cycle', {"time": time.time(), "urls": len(results), "errors": errors})
+        if self.metrics_file:
+            metrics.write_prometheus(self.metrics_file)
+
+    async def _scan(self, engine, urls, keywords):
+        from backend.monitor import monitor_cycle
+        try:
+            results = await monitor_cycle(urls, keywords, self.section, engine=engine, standalone=False)
+            await asyncio.to_thread(record_outcomes, results)
+            await asyncio.to_thread(self._log_batch, results)
+        except Exception as e:
+            logger.exception("Error in monitoring cycle: %s", e)
+            # Retry later rather than leave the URLs due and rescan them on every poll
+            await asyncio.to_thread(record_outcomes, {url: {"error": str(e)} for url in urls})
+
+    async def _dispatch(self, engine, in_flight):
+        enabled = await asyncio.to_thread(self.enabled)
+        if not enabled:
+            return 'paused', SETTINGS_POLL
+        urls, keywords = await asyncio.to_thread(self.targets)
+        base_interval = await asyncio.to_thread(self.base_interval)
+        await asyncio.to_thread(ensure_schedules, urls, base_interval)
+        due = await asyncio.to_thread(due_targets, urls)
+        # A URL still being scanned is not started twice
+        metrics.set_gauge('targets_due', len(due))
+        due = [url for url in due if url not in in_flight][:MAX_DISPATCH]
+        if due:
+            task = asyncio.create_task(self._scan(engine, due, keywords))
+            for url in due:
+                in_flight[url] = task
+            task.add_done_callback(lambda _, due=due: [in_flight.pop(url, None) for url in due])
+        metrics.set_gauge('targets_in_flight', len(in_flight))
+        next_due = await asyncio.to_thread(next_due_time, [url for url in urls if url not in in_flight])
+        wait = SETTINGS_POLL if next_due is None else min(SETTINGS_POLL, max(0.1, next_due - time.time()))
+        return ('scanning' if in_flight else 'idle'), wait
+
+    def _due(self, name, interval):
+        now = time.monotonic()
+        # The first poll only starts the clock
+        last = self._last_run.setdefault(name, now)
+        if now - last < interval:
+            return False
+        self._last_run[name] = now
+        return True
+
+    async def _periodic(self, period):
+        # Returns the metrics period that batches dispatched from now on count towards
+        from backend.alert import release_held
+        from backend.monitor import housekeeping
+        try:
+            if self._due('digest', DIGEST_INTERVAL):
+                await asyncio.to_thread(release_held)
+            if self._due('housekeeping', HOUSEKEEPING_INTERVAL):
+                await asyncio.to_thread(housekeeping)
+        except Exception as e:
+            logger.exception("Error in housekeeping: %s", e)
+        if self._due('metrics', METRICS_INTERVAL):
+            await asyncio.to_thread(metrics.end_period, period)
+            period = metrics.begin_period()
+        return period
+
+    async def run_async(self):
+        from backend.engine import FetchEngine
+        from backend.alert import release_held
+        in_flight = {}
+        # Set in this task's context, so the scan tasks it creates inherit it
+        period = metrics.begin_period()
+        # One engine for the daemon's lifetime keeps connections and Tor circuits warm
+        # Queue pages and transient errors come back as deferred results and are requeued through
+        # the schedule, so no job sleeps through a back-off
+        async with FetchEngine(self.tor_limit, self.clearnet_limit, defer_retries=True) as engine:
+            while not self._stop.is_set():
+                try:
+                    state, wait = await self._dispatch(engine, in_flight)
+                except Exception as e:
+                    logger.exception("Error scheduling scans: %s", e)
+                    state, wait = 'idle', SETTINGS_POLL
+                await asyncio.to_thread(self.heartbeat, state)
+                period = await self._periodic(period)
+                await asyncio.sleep(wait)
+            tasks = set(in_flight.values())
+            if tasks:
+                logger.info("Waiting for %d running scans", len(tasks))
+                await asyncio.gather(*tasks, return_exceptions=True)
+        await asyncio.to_thread(metrics.end_period, period)
+        await asyncio.to_thread(release_held)
+        self.heartbeat('stopped')
+
+    def run(self):
+        asyncio.run(self.run_async())
+
+    def stop(self):
+        self._stop.set()
+
+def shutdown():
+    # Flush what the last cycle queued before the process exits
+    from backend import alert, pdf_report, workers
+    alert.flush()
+    pdf_report.shutdown()
+    workers.shutdown()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m backend.daemon', description='Run monitoring cycles on a schedule.')
+    parser.add_argument('urls', nargs='*', help='URLs to scan (default: the URLs monitored from the UI)')
+    parser.add_argument('--keywords', default=None, help='comma-separated keywords (default: the UI setting)')
+    parser.add_argument('--interval', type=int, default=None,
+                        help=f'starting interval in seconds for new URLs (default: {BASE_INTERVAL})')
+    parser.add_argument('--section', default=None, help='only scan the element with this id')
+    parser.add_argument('--tor-limit', type=int, default=TOR_CONCURRENCY, help='concurrent Tor fetches')
+    parser.add_argument('--clearnet-limit', type=int, default=CLEARNET_CONCURRENCY, help='concurrent clearnet fetches')
+    parser.add_argument('--workers', type=int, default=workers.WORKER_PROCESSES,
+                        help='processes that parse and diff fetched pages; 0 does it in the scanning process')
+    parser.add_argument('--once', action='store_true', help='scan every URL once and exit')
+    parser.add_argument('--metrics-file', default=None, help='write Prometheus metrics to this file after each batch')
+    parser.add_argument('--log-level', default=LOG_LEVEL, help=f'default: {LOG_LEVEL}')
+    parser.add_argument('--log-format', choices=('text', 'json'), default=LOG_FORMAT)
+    args = parser.parse_args(argv)
+    setup_logging(args.log_level, args.log_format)
+    workers.WORKER_PROCESSES = args.workers
+
+    keywords = None
+    if args.keywords is not None:
+        keywords = [k.strip() for k in args.keywords.split(",") if k.strip()]
+    daemon = MonitorDaemon(args.urls, keywords, args.interval, args.section,
+                           args.tor_limit, args.clearnet_limit, args.metrics_file)
+
+    def on_signal(signum, frame):
+        # Running scans finish first; a second Ctrl-C exits immediately
+        logger.info("Stopping after the running scans")
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+        daemon.stop()
+    signal.signal(signal.SIGINT, on_signal)
+    signal.signal(signal.SIGTERM, on_signal)
+    try:
+        if args.once:
+            daemon.run_once()
+        else:
+            daemon.run()
+    finally:
+        shutdown()
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,391 @@
+import os
+import sqlite3
+import threading
+import time
+import json
+
+DB_PATH = os.path.join(os.path.dirname(__file__), '..', 'urls.db')
+# Counters lived here before they moved into url_stats; imported once on first start
+LEGACY_LOG_FILE = os.path.join(os.path.dirname(__file__), '..', 'store', 'monitoring_log.json')
+
+_initialized = False
+_init_lock = threading.Lock()
+
+def connect():
+    if not _initialized:
+        with _init_lock:
+            if not _initialized:
+                init_db()
+    conn = sqlite3.connect(DB_PATH, timeout=30)
+    conn.execute('PRAGMA synchronous=NORMAL')
+    return conn
+
+def _add_missing_columns(c, table, columns):
+    existing = {row[1] for row in c.execute(f"PRAGMA table_info({table})")}
+    for name, decl in columns.items():
+        if name not in existing:
+            try:
+                c.execute(f"ALTER TABLE {table} ADD COLUMN {name} {decl}")
+            except sqlite3.OperationalError as e:
+                # Another process migrated the table first
+                if 'duplicate column' not in str(e):
+                    raise
+
+def init_db():
+    global _initialized
+    with sqlite3.connect(DB_PATH, timeout=30) as conn:
+        c = conn.cursor()
+        # WAL lets the UI read while a cycle is writing, and overlapping writers wait instead of failing
+        c.execute('PRAGMA journal_mode=WAL')
+        c.execute('''CREATE TABLE IF NOT EXISTS urls (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            alias TEXT NOT NULL,
+            url TEXT NOT NULL UNIQUE
+        )''')
+        # Targets the daemon scans; set from the UI's monitored URL selection
+        _add_missing_columns(c, 'urls', {'monitored': 'INTEGER NOT NULL DEFAULT 0'})
+        c.execute('''CREATE TABLE IF NOT EXISTS settings (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        )''')
+        c.execute('''CREATE TABLE IF NOT EXISTS fetch_state (
+            url TEXT PRIMARY KEY,
+            variant TEXT,
+            etag TEXT,
+            last_modified TEXT,
+            content_hash TEXT,
+            updated_at TEXT
+        )''')
+        # The page's links (JSON), so a page fetched as unchanged still has its backlinks crawled
+        _add_missing_columns(c, 'fetch_state', {'links': 'TEXT'})
+        c.execute('''CREATE TABLE IF NOT EXISTS url_stats (
+            url TEXT PRIMARY KEY,
+            changes_count INTEGER NOT NULL DEFAULT 0,
+            keywords_count INTEGER NOT NULL DEFAULT 0,
+            last_keywords TEXT,
+            page_title TEXT,
+            last_scan TEXT
+        )''')
+        # Points at the newest monitoring_results row, so the dashboard never groups the whole history
+        _add_missing_columns(c, 'url_stats', {'last_result_id': 'INTEGER'})
+        c.execute('''CREATE TABLE IF NOT EXISTS monitoring_results (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            url_id INTEGER,
+            timestamp TEXT,
+            changes TEXT,
+            keywords_found TEXT,
+            additional_links_keywords TEXT,
+            FOREIGN KEY(url_id) REFERENCES urls(id)
+        )''')
+        _add_missing_columns(c, 'monitoring_results', {
+            'url': 'TEXT',
+            'page_title': 'TEXT',
+            'error': 'TEXT',
+            'backlinks': 'TEXT',
+        })
+        c.execute("CREATE INDEX IF NOT EXISTS idx_results_url ON monitoring_results (url, id)")
+        c.execute("CREATE INDEX IF NOT EXISTS idx_results_url_id ON monitoring_results (url_id)")
+        c.execute('''CREATE TABLE IF NOT EXISTS archive_manifest (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            url TEXT NOT NULL,
+            timestamp TEXT NOT NULL,
+            html_hash TEXT NOT NULL,
+            text_hash TEXT,
+            size INTEGER
+        )''')
+        c.execute("CREATE INDEX IF NOT EXISTS idx_manifest_url ON archive_manifest (url, id)")
+        c.execute('''CREATE TABLE IF NOT EXISTS alert_queue (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            url TEXT,
+            subject TEXT NOT NULL,
+            body TEXT NOT NULL,
+            status TEXT NOT NULL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            created_at REAL NOT NULL,
+            next_attempt REAL,
+            last_error TEXT
+        )''')
+        c.execute("CREATE INDEX IF NOT EXISTS idx_alert_queue_status ON alert_queue (status, next_attempt)")
+        c.execute('''CREATE TABLE IF NOT EXISTS link_cache (
+            url TEXT PRIMARY KEY,
+            fetched_at REAL NOT NULL,
+            fingerprint TEXT,
+            body_hash TEXT,
+            hit TEXT,
+            links TEXT
+        )''')
+        c.execute("CREATE INDEX IF NOT EXISTS idx_link_cache_fetched ON link_cache (fetched_at)")
+        c.execute('''CREATE TABLE IF NOT EXISTS url_schedule (
+            url TEXT PRIMARY KEY,
+            interval REAL NOT NULL,
+            jitter REAL NOT NULL,
+            priority INTEGER NOT NULL DEFAULT 0,
+            next_due REAL NOT NULL,
+            failures INTEGER NOT NULL DEFAULT 0,
+            last_run REAL,
+            last_change REAL
+        )''')
+        c.execute("CREATE INDEX IF NOT EXISTS idx_url_schedule_due ON url_schedule (next_due)")
+        # SimHash of each URL's last scanned text and its 8-bit bands (backend.mirrors)
+        c.execute('''CREATE TABLE IF NOT EXISTS page_fingerprints (
+            url TEXT PRIMARY KEY,
+            simhash INTEGER NOT NULL,
+            band0 INTEGER, band1 INTEGER, band2 INTEGER, band3 INTEGER,
+            band4 INTEGER, band5 INTEGER, band6 INTEGER, band7 INTEGER,
+            updated_at REAL,
+            alerted_simhash INTEGER,
+            alerted_keywords TEXT,
+            alerted_at REAL
+        )''')
+        for band in range(8):
+            c.execute(f"CREATE INDEX IF NOT EXISTS idx_fingerprint_band{band} ON page_fingerprints (band{band})")
+        # Digest of the change the URL last alerted on (mirrors.change_digest)
+        _add_missing_columns(c, 'page_fingerprints', {'alerted_change': 'TEXT'})
+        # Last known reachability of each URL, from health checks and scans
+        c.execute('''CREATE TABLE IF NOT EXISTS url_status (
+            url TEXT PRIMARY KEY,
+            status INTEGER,
+            error TEXT,
+            checked_at REAL NOT NULL
+        )''')
+        c.execute('''CREATE TABLE IF NOT EXISTS cycle_metrics (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            started_at REAL NOT NULL,
+            duration REAL,
+            targets INTEGER,
+            summary TEXT
+        )''')
+        _import_legacy_log(c)
+        c.execute(
+            '''UPDATE url_stats SET last_result_id = (SELECT MAX(id) FROM monitoring_results r WHERE r.url = url_stats.url)
+               WHERE last_result_id IS NULL'''
+        )
+        conn.commit()
+    _initialized = True
+
+def _import_legacy_log(c):
+    if not os.path.exists(LEGACY_LOG_FILE):
+        return
+    if c.execute("SELECT 1 FROM url_stats LIMIT 1").fetchone():
+        return
+    with open(LEGACY_LOG_FILE, 'r', encoding='utf-8') as f:
+        log_data = json.load(f)
+    c.executemany(
+        "INSERT OR IGNORE INTO url_stats (url, changes_count, keywords_count, last_keywords, page_title) "
+        "VALUES (?, ?, ?, ?, ?)",
+        [
+            (url, entry.get("changes_count", 0), entry.get("keywords_count", 0),
+             json.dumps(entry.get("last_keywords", [])), entry.get("page_title"))
+            for url, entry in log_data.items()
+        ]
+    )
+
+def get_fetch_state(url):
+    with connect() as conn:
+        c = conn.cursor()
+        c.execute("SELECT variant, etag, last_modified, content_hash, links FROM fetch_state WHERE url = ?",
+                  (url,))
+        row = c.fetchone()
+    if not row:
+        return None
+    return {"variant": row[0], "etag": row[1], "last_modified": row[2], "content_hash": row[3],
+            "links": json.loads(row[4]) if row[4] is not None else None}
+
+def save_fetch_state(url, variant, etag, last_modified, content_hash):
+    save_fetch_states([(url, variant, etag, last_modified, content_hash, None)])
+
+def save_fetch_states(rows):
+    # rows of (url, variant, etag, last_modified, content_hash, links); links None keeps the stored ones
+    updated_at = time.ctime()
+    with connect() as conn:
+        conn.executemany(
+            '''INSERT INTO fetch_state (url, variant, etag, last_modified, content_hash, links, updated_at)
+               VALUES (?, ?, ?, ?, ?, ?, ?)
+               ON CONFLICT(url) DO UPDATE SET variant = excluded.variant, etag = excluded.etag,
+                   last_modified = excluded.last_modified, content_hash = excluded.content_hash,
+                   links = COALESCE(excluded.links, fetch_state.links), updated_at = excluded.updated_at''',
+            [(*row[:5], json.dumps(row[5]) if row[5] is not None else None, updated_at) for row in rows]
+        )
+        conn.commit()
+
+def last_link_hits(url):
+    # Keyword hits on linked pages listed by url's newest recorded result
+    with connect() as conn:
+        c = conn.cursor()
+        c.execute(
+            '''SELECT m.additional_links_keywords FROM url_stats s
+               JOIN monitoring_results m ON m.id = s.last_result_id WHERE s.url = ?''',
+            (url,)
+        )
+        row = c.fetchone()
+    return json.loads(row[0]) if row and row[0] else []
+
+def get_stats(url):
+    with connect() as conn:
+        c = conn.cursor()
+        c.execute(
+            "SELECT changes_count, keywords_count, last_keywords, page_title FROM url_stats WHERE url = ?",
+            (url,)
+        )
+        row = c.fetchone()
+    if not row:
+        return {"changes_count": 0, "keywords_count": 0, "last_keywords": [], "page_title": None}
+    return {
+        "changes_count": row[0],
+        "keywords_count": row[1],
+        "last_keywords": json.loads(row[2]) if row[2] else [],
+        "page_title": row[3],
+    }
+
+def record_scans(entries):
+    # Counters are incremented in SQL, so overlapping cycles never lose updates
+    if not entries:
+        return
+    with connect() as conn:
+        c = conn.cursor()
+        c.executemany(
+            '''INSERT INTO url_stats (url, changes_count, keywords_count, last_keywords, page_title, last_scan)
+               VALUES (?, ?, ?, ?, ?, ?)
+               ON CONFLICT(url) DO UPDATE SET
+                   changes_count = changes_count + excluded.changes_count,
+                   keywords_count = keywords_count + excluded.keywords_count,
+                   last_keywords = COALESCE(excluded.last_keywords, last_keywords),
+                   page_title = COALESCE(excluded.page_title, page_title),
+                   last_scan = excluded.last_scan''',
+            [
+                (e["url"], 1 if e["changed"] else 0, len(e["keywords"] or []),
+                 json.dumps(e["keywords"]) if e["keywords"] is not None else None,
+                 e["page_title"], e["timestamp"])
+                for e in entries
+            ]
+        )
+        c.executemany(
+            '''INSERT INTO monitoring_results
+                   (url_id, url, timestamp, changes, keywords_found, additional_links_keywords, page_title, error,
+                    backlinks)
+               VALUES ((SELECT id FROM urls WHERE url = ?), ?, ?, ?, ?, ?, ?, ?, ?)''',
+            [
+                (e["url"], e["url"], e["timestamp"], e["changes"], json.dumps(e["keywords"] or []),
+                 json.dumps(e["additional_results"]), e["page_title"], e["error"],
+                 json.dumps(e.get("backlinks") or []))
+                for e in entries
+            ]
+        )
+        # A completed scan is as good as a health check, so pre-flight checks skip these URLs
+        now = time.time()
+        c.executemany(
+            "INSERT OR REPLACE INTO url_status (url, status, error, checked_at) VALUES (?, 200, NULL, ?)",
+            [(e["url"], now) for e in entries if not e["error"]]
+        )
+        c.executemany(
+            "UPDATE url_stats SET last_result_id = (SELECT MAX(id) FROM monitoring_results WHERE url = ?) WHERE url = ?",
+            [(url, url) for url in {e["url"] for e in entries}]
+        )
+        conn.commit()
+
+class ScanBatch:
+    # Collects the scans of one cycle and writes them in a single transaction
+    def __init__(self):
+        self._entries = []
+        self._lock = threading.Lock()
+
+    def add(self, entry):
+        with self._lock:
+            self._entries.append(entry)
+
+    def flush(self):
+        with self._lock:
+            entries, self._entries = self._entries, []
+        record_scans(entries)
+
+def get_setting(key, default=None):
+    with connect() as conn:
+        c = conn.cursor()
+        c.execute("SELECT value FROM settings WHERE key = ?", (key,))
+        row = c.fetchone()
+    return json.loads(row[0]) if row else default
+
+def set_setting(key, value):
+    with connect() as conn:
+        conn.execute("INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)", (key, json.dumps(value)))
+        conn.commit()
+
+def monitored_urls():
+    with connect() as conn:
+        c = conn.cursor()
+        c.execute("SELECT url FROM urls WHERE monitored = 1 ORDER BY id")
+        return [row[0] for row in c.fetchall()]
+
+def set_monitored(urls):
+    with connect() as conn:
+        c = conn.cursor()
+        c.execute("UPDATE urls SET monitored = 0")
+        c.executemany("UPDATE urls SET monitored = 1 WHERE url = ?", [(url,) for url in urls])
+        conn.commit()
+
+# Dashboard filters over the latest result of each saved URL
+RESULT_FILTERS = {
+    'all': '1',
+    'changed': "r.error IS NULL AND r.changes != ''",
+    'keywords': "r.error IS NULL AND s.last_keywords IS NOT NULL AND s.last_keywords != '[]'",
+    'errors': 'r.error IS NOT NULL',
+}
+RESULTS_PAGE_SIZE = 20
+
+def latest_scan():
+    # (id, timestamp) of the newest result; the id changes whenever a scan is recorded
+    with connect() as conn:
+        c = conn.cursor()
+        c.execute("SELECT id, timestamp FROM monitoring_results ORDER BY id DESC LIMIT 1")
+        return c.fetchone() or (None, None)
+
+def result_summaries(result_filter='all', offset=0, limit=RESULTS_PAGE_SIZE):
+    # One page of the latest result per saved URL, newest first, without the diff and link lists.
+    # Returns (total matching, rows); load those with result_detail.
+    where = RESULT_FILTERS[result_filter]
+    base = f'''FROM url_stats s
+                JOIN urls u ON u.url = s.url
+                JOIN monitoring_results r ON r.id = s.last_result_id
+                WHERE {where}'''
+    with connect() as conn:
+        c = conn.cursor()
+        total = c.execute(f"SELECT COUNT(*) {base}").fetchone()[0]
+        c.execute(
+            f'''SELECT r.id, u.alias, u.url, r.timestamp, COALESCE(r.page_title, s.page_title), r.error,
+                       r.changes != '', s.last_keywords
+                {base}
+                ORDER BY r.id DESC LIMIT ? OFFSET ?''',
+            (limit, offset)
+        )
+        rows = c.fetchall()
+    return total, [
+        {
+            "id": result_id,
+            "alias": alias,
+            "url": url,
+            "timestamp": timestamp,
+            "page_title": title or alias,
+            "error": error,
+            "changed": bool(changed),
+            # Unchanged pages are not re-matched, so the last scanned keywords still apply
+            "found_keywords": json.loads(last_keywords) if last_keywords and not error else [],
+        }
+        for result_id, alias, url, timestamp, title, error, changed, last_keywords in rows
+    ]
+
+def result_detail(result_id):
+    with connect() as conn:
+        c = conn.cursor()
+        c.execute(
+            "SELECT changes, additional_links_keywords, backlinks FROM monitoring_results WHERE id = ?",
+            (result_id,)
+        )
+        row = c.fetchone()
+    if not row:
+        return None
+    changes, additional, backlinks = row
+    return {
+        "changes": changes or "",
+        "additional_results": json.loads(additional) if additional else [],
+        "backlinks": json.loads(backlinks) if backlinks else [],
+    }
@@ -0,0 +1,158 @@
+import hashlib
+import time
+from difflib import unified_diff
+
+# Budgets keep diff time predictable on huge or heavily rewritten pages; pages over MAX_BLOCKS
+# lines always use the Myers engine
+MAX_BLOCKS = 20000
+MAX_EDITS = 1000
+TIME_BUDGET = 2.0
+MAX_DIFF_LINES = 500
+CONTEXT_LINES = 3
+DEFAULT_ENGINE = 'myers'
+
+class DiffBudgetExceeded(Exception):
+    pass
+
+def blocks_hash(blocks):
+    return hashlib.sha256('\n'.join(blocks).encode('utf-8')).hexdigest()
+
+def _myers_ops(a, b, max_edits, deadline):
+    # Greedy O((N+M)D) shortest edit script; a and b are lists of interned line ids
+    n, m = len(a), len(b)
+    max_d = min(n + m, max_edits)
+    off = max_d + 1
+    v = [0] * (2 * off + 1)
+    trace = []
+    for d in range(max_d + 1):
+        if time.monotonic() > deadline:
+            raise DiffBudgetExceeded("time budget exceeded")
+        # Only diagonals -d-1..d+1 are read when backtracking from this step
+        trace.append(v[off - d - 1:off + d + 2])
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and v[off + k - 1] < v[off + k + 1]):
+                x = v[off + k + 1]
+            else:
+                x = v[off + k - 1] + 1
+            y = x - k
+            while x < n and y < m and a[x] == b[y]:
+                x += 1
+                y += 1
+            v[off + k] = x
+            if x >= n and y >= m:
+                return _backtrack(trace, n, m)
+    raise DiffBudgetExceeded("edit budget exceeded")
+
+def _backtrack(trace, n, m):
+    ops = []
+    x, y = n, m
+    for d in range(len(trace) - 1, -1, -1):
+        window = trace[d]
+        k = x - y
+        if k == -d or (k != d and window[k - 1 + d + 1] < window[k + 1 + d + 1]):
+            prev_k = k + 1
+        else:
+            prev_k = k - 1
+        prev_x = window[prev_k + d + 1]
+        prev_y = prev_x - prev_k
+        while x > prev_x and y > prev_y:
+            x -= 1
+            y -= 1
+            ops.append((' ', x, y))
+        if d > 0:
+            if x == prev_x:
+                ops.append(('+', x, prev_y))
+            else:
+                ops.append(('-', prev_x, y))
+        x, y = prev_x, prev_y
+    ops.reverse()
+    return ops
+
+def _approximate_ops(a, b):
+    # Budget fallback: linear set difference, good enough to show what appeared and vanished
+    in_b = set(b)
+    in_a = set(a)
+    ops = [(' ' if line in in_b else '-', i, 0) for i, line in enumerate(a)]
+    ops += [('+', len(a), j) for j, line in enumerate(b) if line not in in_a]
+    return ops
+
+def _format_unified(ops, old, new, context=CONTEXT_LINES):
+    changed = [idx for idx, op in enumerate(ops) if op[0] != ' ']
+    if not changed:
+        return []
+    groups = []
+    for idx in changed:
+        start, end = max(0, idx - context), min(len(ops), idx + context + 1)
+        if groups and start <= groups[-1][1]:
+            groups[-1][1] = end
+        else:
+            groups.append([start, end])
+
+    lines = ['--- old_snapshot\n', '+++ new_snapshot\n']
+    for start, end in groups:
+        hunk = ops[start:end]
+        old_count = sum(1 for op in hunk if op[0] != '+')
+        new_count = sum(1 for op in hunk if op[0] != '-')
+        old_start = hunk[0][1] + (1 if old_count else 0)
+        new_start = hunk[0][2] + (1 if new_count else 0)
+        lines.append(f"@@ -{old_start},{old_count} +{new_start},{new_count} @@\n")
+        for tag, i, j in hunk:
+            lines.append(f"{tag}{new[j] if tag == '+' else old[i]}\n")
+    return lines
+
+def myers_diff(old, new, max_edits=MAX_EDITS, time_budget=TIME_BUDGET):
+    # Trim the common prefix/suffix first; most page updates touch a small region
+    prefix = 0
+    limit = min(len(old), len(new))
+    while prefix < limit and old[prefix] == new[prefix]:
+        prefix += 1
+    suffix = 0
+    while suffix < limit - prefix and old[-1 - suffix] == new[-1 - suffix]:
+        suffix += 1
+
+    ids = {}
+    a = [ids.setdefault(line, len(ids)) for line in old[prefix:len(old) - suffix]]
+    b = [ids.setdefault(line, len(ids)) for line in new[prefix:len(new) - suffix]]
+    try:
+        middle = _myers_ops(a, b, max_edits, time.monotonic() + time_budget)
+        note = None
+    except DiffBudgetExceeded as e:
+        middle = _approximate_ops(a, b)
+        note = f"... approximate diff ({e})\n"
+
+    ops = [(' ', i, i) for i in range(prefix)]
+    ops += [(tag, i + prefix, j + prefix) for tag, i, j in middle]
+    ops += [(' ', len(old) - suffix + i, len(new) - suffix + i) for i in range(suffix)]
+    lines = _format_unified(ops, old, new)
+    if lines and note:
+        lines.insert(2, note)
+    return lines
+
+def difflib_diff(old, new, **_):
+    return list(unified_diff(
+        [line + '\n' for line in old],
+        [line + '\n' for line in new],
+        fromfile='old_snapshot',
+        tofile='new_snapshot',
+    ))
+
+DIFF_ENGINES = {
+    'myers': myers_diff,
+    'difflib': difflib_diff,
+}
+
+def diff_blocks(old, new, engine=None, max_lines=MAX_DIFF_LINES):
+    # old and new are lists of visible-text blocks; returns unified diff text or "" when unchanged
+    if blocks_hash(old) == blocks_hash(new):
+        return ""
+    if len(old) > MAX_BLOCKS or len(new) > MAX_BLOCKS:
+        # difflib has no budget; Myers keeps to its edit and time budgets on any length
+        lines = myers_diff(old, new)
+    else:
+        lines = DIFF_ENGINES[engine or DEFAULT_ENGINE](old, new)
+    if not lines:
+        # The approximate diff of an exceeded budget only sees lines that appeared or vanished
+        lines = ['--- old_snapshot\n', '+++ new_snapshot\n', "... lines moved or repeated, none added or removed\n"]
+    if len(lines) > max_lines:
+        lines = lines[:max_lines] + [f"... diff truncated ({len(lines) - max_lines} more lines)\n"]
+    return ''.join(lines)
@@ -0,0 +1,146 @@
+import asyncio
+import logging
+import socket
+import time
+from backend import metrics
+from backend.scraper import (
+    HEADERS, TOR_PROXY, MAX_ATTEMPTS, DEFAULT_WAIT,
+    UNCHANGED, RetryLater, request_timeout, is_queue_page, extract_content, save_content,
+    load_validators, check_unchanged, fetch_validators, retry_after, is_transient, note_host, check_breaker,
+    CHUNK_SIZE, BodyReader, check_headers, charset_of,
+)
+
+logger = logging.getLogger(__name__)
+
+# Separate caps so a handful of slow hidden services cannot starve clearnet targets
+TOR_CONCURRENCY = 4
+CLEARNET_CONCURRENCY = 16
+
+class FetchEngine:
+    def __init__(self, tor_limit=TOR_CONCURRENCY, clearnet_limit=CLEARNET_CONCURRENCY, defer_retries=False):
+        self.tor_limit = tor_limit
+        self.clearnet_limit = clearnet_limit
+        # Raise RetryLater for queue pages and transient errors instead of sleeping in the job;
+        # for callers with a scheduler that requeues the URL
+        self.defer_retries = defer_retries
+        self._limits = {
+            True: asyncio.Semaphore(tor_limit),
+            False: asyncio.Semaphore(clearnet_limit),
+        }
+        self._sessions = {}
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def close(self):
+        for session in self._sessions.values():
+            await session.close()
+        self._sessions.clear()
+
+    def _session(self, is_onion):
+        if is_onion not in self._sessions:
+            # Imported on first fetch: aiohttp alone is a few hundred ms of startup
+            import aiohttp
+            from aiohttp_socks import ProxyConnector
+            if is_onion:
+                # aiohttp-socks spells socks5h as socks5 + rdns (resolve .onion names via Tor)
+                proxy = TOR_PROXY.replace('socks5h://', 'socks5://')
+                connector = ProxyConnector.from_url(proxy, rdns=True, limit=self.tor_limit)
+            else:
+                connector = aiohttp.TCPConnector(limit=self.clearnet_limit)
+            self._sessions[is_onion] = aiohttp.ClientSession(connector=connector, headers=HEADERS)
+        return self._sessions[is_onion]
+
+    async def fetch(self, url, headers=None, section=None):
+        # Returns (status, headers, text, section_html); see scraper.BodyReader
+        import aiohttp
+        is_onion = '.onion' in url
+        timeout = aiohttp.ClientTimeout(total=request_timeout(is_onion))
+        queued = time.perf_counter()
+        async with self._limits[is_onion]:
+            # Time spent waiting for a Tor/clearnet slot, apart from the fetch itself
+            metrics.record_stage('fetch_wait', time.perf_counter() - queued)
+            with metrics.stage('fetch'):
+                async with self._session(is_onion).get(url, timeout=timeout, headers=headers) as res:
+                    res.raise_for_status()
+                    check_headers(res.headers)
+                    reader = BodyReader(charset_of(res.headers), section)
+                    async for chunk in res.content.iter_chunked(CHUNK_SIZE):
+                        if reader.feed(chunk):
+                            break
+                    return (res.status, res.headers) + reader.finish()
+
+    async def probe(self, url, timeout):
+        # Reachability only: HEAD, or a one-byte ranged GET for servers that refuse HEAD.
+        # Leaving the response context hands the connection back without reading a body.
+        import aiohttp
+        is_onion = '.onion' in url
+        timeout = aiohttp.ClientTimeout(total=timeout)
+        async with self._limits[is_onion]:
+            session = self._session(is_onion)
+            async with session.head(url, timeout=timeout, allow_redirects=True) as res:
+                status = res.status
+            if status in (405, 501):
+                async with session.get(url, timeout=timeout, headers={'Range': 'bytes=0-0'}) as res:
+                    status = res.status
+            return status
+
+    async def scrape_and_save(self, url, section=None, variant=None):
+        import aiohttp
+        is_onion = '.onion' in url
+        attempt = 0
+        wait_time = DEFAULT_WAIT
+        state, conditional = await asyncio.to_thread(load_validators, url, variant)
+
+        logger.info("[%s] Scraping: %s", 'Tor' if is_onion else 'Clearnet', url)
+
+        # Back-off sleeps happen outside the concurrency slot so other targets keep going
+        while attempt < MAX_ATTEMPTS:
+            check_breaker(url)
+            try:
+                status, headers, text, section_html = await self.fetch(url, conditional, section)
+                note_host(url, status)
+
+                if is_onion and status != 304 and is_queue_page(text):
+                    if self.defer_retries:
+                        logger.info("Queue page, deferring %s by %ss", url, wait_time)
+                        raise RetryLater(wait_time, "queue page")
+                    logger.info("Queue page, waiting %ss for %s", wait_time, url)
+                    metrics.count('retries')
+                    await asyncio.sleep(wait_time)
+                    wait_time *= 2
+                    attempt += 1
+                    continue
+
+                unchanged, body_hash = await asyncio.to_thread(
+                    check_unchanged, url, variant, state, status, headers, section_html or text
+                )
+                if unchanged:
+                    return UNCHANGED, None
+
+                page = await asyncio.to_thread(extract_content, text, url, section, section_html)
+                with metrics.stage('archive'):
+                    path = await asyncio.to_thread(save_content, page, url)
+                page.validators = fetch_validators(variant, headers, body_hash)
+                logger.debug("Saved %s to %s", url, path)
+                return page, path
+
+            except (aiohttp.ClientError, asyncio.TimeoutError, socket.gaierror, OSError) as e:
+                logger.warning("Attempt %d failed for %s: %s", attempt + 1, url, e)
+                # Only ClientResponseError carries a status; everything else is a connection failure
+                status = getattr(e, 'status', None)
+                note_host(url, status)
+                if self.defer_retries:
+                    if not is_transient(status):
+                        return None, None
+                    raise RetryLater(retry_after(getattr(e, 'headers', None), wait_time), str(e))
+                metrics.count('retries')
+                attempt += 1
+                await asyncio.sleep(wait_time)
+                wait_time *= 2
+
+        logger.error("Gave up on %s after %d attempts", url, MAX_ATTEMPTS)
+        return None, None
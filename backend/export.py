@@ -1,19 +1,96 @@
-import pandas as pd
-import time
-import os
-
-REPORTS_DIR = os.path.join(os.path.dirname(__file__), '..', 'reports')
-
-def export_to_csv(url, changes, keywords, additional_results=None):
-    additional_results = additional_results or []
-    data = [{
-        "timestamp": time.ctime(),
-        "url": url,
-        "keywords_found": ", ".join(keywords),
-        "change_summary": changes[:200],
-        "additional_links_keywords": "; ".join([f"{r['url']}: {', '.join(r['found_keywords'])}" for r in additional_results])
-    }]
-    os.makedirs(REPORTS_DIR, exist_ok=True)
-    log_file = os.path.join(REPORTS_DIR, "log.csv")
-    df = pd.DataFrame(data)
-    df.to_csv(log_file, mode='a', index=False)
\ No newline at end of file
+import csv
+import time
+import os
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+REPORTS_DIR = os.path.join(os.path.dirname(__file__), '..', 'reports')
+LOG_FILE = os.path.join(REPORTS_DIR, "log.csv")
+FIELDS = ["timestamp", "url", "keywords_found", "change_summary", "additional_links_keywords"]
+
+_write_lock = threading.Lock()
+
+def build_row(url, changes, keywords, additional_results=None):
+    additional_results = additional_results or []
+    return {
+        "timestamp": time.ctime(),
+        "url": url,
+        "keywords_found": ", ".join(keywords),
+        "change_summary": changes[:200],
+        "additional_links_keywords": "; ".join([f"{r['url']}: {', '.join(r['found_keywords'])}" for r in additional_results])
+    }
+
+@contextmanager
+def _locked_append(path):
+    # Thread lock for this process, flock for other processes (UI, daemon) appending to the same file
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with _write_lock:
+        with open(path, 'a', newline='', encoding='utf-8') as f:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield f
+            finally:
+                if fcntl:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+def write_rows(rows, path=None):
+    if not rows:
+        return
+    with _locked_append(path or LOG_FILE) as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDS)
+        # Header only once, checked under the lock so concurrent writers cannot both add one
+        if f.seek(0, os.SEEK_END) == 0:
+            writer.writeheader()
+        writer.writerows(rows)
+
+def export_to_csv(url, changes, keywords, additional_results=None):
+    write_rows([build_row(url, changes, keywords, additional_results)])
+
+class CsvExporter:
+    # Buffers a cycle's rows and appends them in one locked write
+    def __init__(self, path=None, flush_rows=500):
+        self.path = path
+        self.flush_rows = flush_rows
+        self._rows = []
+        self._lock = threading.Lock()
+
+    def add(self, url, changes, keywords, additional_results=None):
+        row = build_row(url, changes, keywords, additional_results)
+        with self._lock:
+            self._rows.append(row)
+            full = len(self._rows) >= self.flush_rows
+        if full:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            rows, self._rows = self._rows, []
+        write_rows(rows, self.path)
+
+def iter_rows(path=None, url=None, since=None):
+    # Streams the log one row at a time; since is a time.struct_time or epoch seconds
+    path = path or LOG_FILE
+    if not os.path.exists(path):
+        return
+    if isinstance(since, time.struct_time):
+        since = time.mktime(since)
+    with open(path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f, fieldnames=FIELDS):
+            # Files written by the old pandas exporter repeat the header before every row
+            if row["timestamp"] == "timestamp":
+                continue
+            if url is not None and row["url"] != url:
+                continue
+            if since is not None:
+                try:
+                    if time.mktime(time.strptime(row["timestamp"])) < since:
+                        continue
+                except (TypeError, ValueError):
+                    continue
+            yield row
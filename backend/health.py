@@ -0,0 +1,75 @@
+import asyncio
+import logging
+import time
+from backend.db import connect
+
+logger = logging.getLogger(__name__)
+
+# Statuses younger than this are reused instead of probing again; scans refresh them too
+HEALTH_TTL = 300
+# Failures are rechecked sooner, so a site that comes back is not reported down for long
+FAILURE_TTL = 60
+# Probes only wait for the status line, so they can give up much sooner than a scan
+CHECK_TIMEOUT = 15
+TOR_CHECK_TIMEOUT = 30
+# Probes in flight at once; higher than the scan limits since a probe holds its slot briefly
+TOR_CHECK_CONCURRENCY = 8
+CLEARNET_CHECK_CONCURRENCY = 32
+
+def is_reachable(status):
+    # Redirects are followed; 206 is the answer to the ranged GET fallback
+    return status is not None and 200 <= status < 400
+
+def cached_statuses(urls, ttl=HEALTH_TTL, now=None):
+    # url -> (status, error) for the URLs checked or scanned within ttl
+    now = time.time() if now is None else now
+    wanted = set(urls)
+    with connect() as conn:
+        c = conn.cursor()
+        c.execute(
+            '''SELECT url, status, error FROM url_status
+               WHERE checked_at >= ? AND (status BETWEEN 200 AND 399 OR checked_at >= ?)''',
+            (now - ttl, now - min(ttl, FAILURE_TTL))
+        )
+        return {url: (status, error) for url, status, error in c.fetchall() if url in wanted}
+
+def save_statuses(statuses, now=None):
+    now = time.time() if now is None else now
+    with connect() as conn:
+        conn.executemany(
+            "INSERT OR REPLACE INTO url_status (url, status, error, checked_at) VALUES (?, ?, ?, ?)",
+            [(url, status, error, now) for url, (status, error) in statuses.items()]
+        )
+        conn.commit()
+
+async def probe_all(urls):
+    from backend.engine import FetchEngine
+
+    async def probe(engine, url):
+        timeout = TOR_CHECK_TIMEOUT if '.onion' in url else CHECK_TIMEOUT
+        try:
+            return await engine.probe(url, timeout), None
+        except asyncio.TimeoutError:
+            return None, f"No response within {timeout}s"
+        except Exception as e:
+            return None, str(e) or type(e).__name__
+
+    async with FetchEngine(TOR_CHECK_CONCURRENCY, CLEARNET_CHECK_CONCURRENCY) as engine:
+        statuses = await asyncio.gather(*(probe(engine, url) for url in urls))
+    return dict(zip(urls, statuses))
+
+def check_urls(urls, ttl=HEALTH_TTL):
+    # url -> (status, error). Probes the URLs without a fresh status, all at once, and caches them.
+    urls = list(dict.fromkeys(urls))
+    statuses = cached_statuses(urls, ttl) if ttl else {}
+    stale = [url for url in urls if url not in statuses]
+    if stale:
+        start = time.perf_counter()
+        probed = asyncio.run(probe_all(stale))
+        logger.info("Checked %d URLs in %.1fs (%d cached)", len(stale), time.perf_counter() - start, len(statuses))
+        save_statuses(probed)
+        statuses.update(probed)
+    return {url: statuses[url] for url in urls}
+
+def check_url(url, ttl=HEALTH_TTL):
+    return check_urls([url], ttl)[url]
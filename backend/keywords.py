@@ -0,0 +1,112 @@
+from collections import deque
+from functools import lru_cache
+
+# Below this many keywords, C-level substring scans beat walking the automaton in Python
+DIRECT_SCAN_LIMIT = 200
+
+class KeywordMatcher:
+    # Aho-Corasick automaton: finds every keyword in a single pass over the text,
+    # so the cost no longer grows with the size of the watchlist.
+    def __init__(self, keywords, case_insensitive=True, whole_word=False):
+        self.case_insensitive = case_insensitive
+        self.whole_word = whole_word
+        self.keywords = []
+        seen = set()
+        for kw in keywords:
+            kw = kw.strip() if kw else ""
+            if kw and kw not in seen:
+                seen.add(kw)
+                self.keywords.append(kw)
+        self._lengths = [len(self._fold(kw)) for kw in self.keywords]
+        self._build()
+
+    def _fold(self, text):
+        return text.lower() if self.case_insensitive else text
+
+    def _build(self):
+        goto = [{}]
+        out = [[]]
+        for index, kw in enumerate(self.keywords):
+            node = 0
+            for ch in self._fold(kw):
+                nxt = goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[node][ch] = nxt
+                    goto.append({})
+                    out.append([])
+                node = nxt
+            out[node].append(index)
+
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in goto[node].items():
+                queue.append(nxt)
+                state = fail[node]
+                while state and ch not in goto[state]:
+                    state = fail[state]
+                fail[nxt] = goto[state].get(ch, 0)
+                # Inherit matches that end on the fallback state (e.g. "he" inside "she")
+                out[nxt] = out[nxt] + out[fail[nxt]]
+
+        self._goto = goto
+        self._fail = fail
+        self._out = out
+
+    def _is_word_char(self, ch):
+        return ch.isalnum() or ch == '_'
+
+    def iter_matches(self, text):
+        # Yields (keyword, start, end) for every occurrence, overlapping ones included
+        folded = self._fold(text)
+        goto, fail, out, lengths = self._goto, self._fail, self._out, self._lengths
+        keywords = self.keywords
+        whole_word = self.whole_word
+        size = len(folded)
+        node = 0
+        for i, ch in enumerate(folded):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if out[node]:
+                end = i + 1
+                for index in out[node]:
+                    start = end - lengths[index]
+                    if whole_word and (
+                        (start > 0 and self._is_word_char(folded[start - 1]))
+                        or (end < size and self._is_word_char(folded[end]))
+                    ):
+                        continue
+                    yield keywords[index], start, end
+
+    def find(self, text):
+        # Distinct keywords present in the text
+        if len(self.keywords) <= DIRECT_SCAN_LIMIT and not self.whole_word:
+            folded = self._fold(text)
+            return [kw for kw in self.keywords if self._fold(kw) in folded]
+        found = {}
+        for kw, _, _ in self.iter_matches(text):
+            if kw not in found:
+                found[kw] = True
+                if len(found) == len(self.keywords):
+                    break
+        return list(found)
+
+    def counts(self, text):
+        counts = {}
+        for kw, _, _ in self.iter_matches(text):
+            counts[kw] = counts.get(kw, 0) + 1
+        return counts
+
+    def matches(self, text):
+        return list(self.iter_matches(text))
+
+@lru_cache(maxsize=32)
+def _cached_matcher(keywords, case_insensitive, whole_word):
+    return KeywordMatcher(keywords, case_insensitive, whole_word)
+
+def get_matcher(keywords, case_insensitive=True, whole_word=False):
+    # Compiled once per keyword list; the list is usually identical across a whole cycle
+    return _cached_matcher(tuple(keywords or ()), case_insensitive, whole_word)
@@ -0,0 +1,42 @@
+import json
+import logging
+import sys
+from backend.metrics import current_url
+
+# Used by the entry points (daemon, CLI, UI); library use leaves logging to the application
+LOG_LEVEL = 'INFO'
+# 'text' for people, 'json' (one object per line) for log shippers
+LOG_FORMAT = 'text'
+TEXT_FORMAT = '%(asctime)s %(levelname)s %(name)s [%(target)s] %(message)s'
+
+class TargetFilter(logging.Filter):
+    # Tags every record with the URL of the job that emitted it, from the metrics context
+    def filter(self, record):
+        record.target = current_url() or '-'
+        return True
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "time": record.created,
+            "level": record.levelname,
+            "logger": record.name,
+            "target": getattr(record, 'target', None),
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry)
+
+def setup_logging(level=None, fmt=None, stream=None):
+    handler = logging.StreamHandler(stream or sys.stderr)
+    handler.addFilter(TargetFilter())
+    if (fmt or LOG_FORMAT) == 'json':
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+    logger = logging.getLogger('backend')
+    logger.handlers[:] = [handler]
+    logger.setLevel(level or LOG_LEVEL)
+    logger.propagate = False
+    return logger
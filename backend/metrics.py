@@ -0,0 +1,247 @@
+import argparse
+import contextvars
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from backend.db import connect
+
+# Cycle summaries kept in urls.db for the UI panel; older ones are dropped
+KEEP_CYCLES = 200
+
+# The job and cycle a piece of work belongs to. asyncio tasks and asyncio.to_thread copy the
+# context, so stages timed deep in the fetch or crawl are still attributed to the right target.
+_current_target = contextvars.ContextVar('current_target', default=None)
+_current_cycle = contextvars.ContextVar('current_cycle', default=None)
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+class Registry:
+    # Process-wide counters, gauges and timing summaries (count, sum, max), keyed by name and labels
+    def __init__(self):
+        self._counters = {}
+        self._gauges = {}
+        self._timings = {}
+        self._lock = threading.Lock()
+
+    def incr(self, name, value=1, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set_gauge(self, name, value, **labels):
+        with self._lock:
+            self._gauges[(name, _label_key(labels))] = value
+
+    def observe(self, name, seconds, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            timing = self._timings.setdefault(key, [0, 0.0, 0.0])
+            timing[0] += 1
+            timing[1] += seconds
+            timing[2] = max(timing[2], seconds)
+
+    def snapshot(self):
+        def rows(items, value):
+            return [{"name": name, "labels": dict(labels), **value(v)} for (name, labels), v in sorted(items)]
+        with self._lock:
+            return {
+                "counters": rows(self._counters.items(), lambda v: {"value": v}),
+                "gauges": rows(self._gauges.items(), lambda v: {"value": v}),
+                "timings": rows(self._timings.items(), lambda v: {"count": v[0], "sum": v[1], "max": v[2]}),
+            }
+
+    def prometheus(self, prefix='monitor_'):
+        # Prometheus text exposition format; timings become summaries without quantiles
+        def fmt(name, labels, suffix=''):
+            label_text = ','.join(f'{k}="{str(v)}"' for k, v in labels)
+            return f"{prefix}{name}{suffix}" + (f"{{{label_text}}}" if label_text else "")
+        lines = []
+        with self._lock:
+            for kind, items in (('counter', self._counters), ('gauge', self._gauges)):
+                seen = set()
+                for (name, labels), value in sorted(items.items()):
+                    if name not in seen:
+                        lines.append(f"# TYPE {prefix}{name} {kind}")
+                        seen.add(name)
+                    lines.append(f"{fmt(name, labels)} {value}")
+            seen = set()
+            for (name, labels), (count, total, _) in sorted(self._timings.items()):
+                if name not in seen:
+                    lines.append(f"# TYPE {prefix}{name} summary")
+                    seen.add(name)
+                lines.append(f"{fmt(name, labels, '_count')} {count}")
+                lines.append(f"{fmt(name, labels, '_sum')} {total:.6f}")
+        return "\n".join(lines) + "\n"
+
+registry = Registry()
+
+class TargetStats:
+    # Stage durations and counters of one URL's job
+    def __init__(self, url):
+        self.url = url
+        self.stages = {}
+        self.counters = {}
+        self.outcome = None
+        self.duration = None
+        self._start = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def add_stage(self, name, seconds):
+        with self._lock:
+            self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def add(self, name, value):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def finish(self):
+        self.duration = time.perf_counter() - self._start
+
+    def to_dict(self):
+        return {
+            "url": self.url,
+            "outcome": self.outcome,
+            "duration": self.duration,
+            "stages": dict(self.stages),
+            "counters": dict(self.counters),
+        }
+
+class CycleStats(TargetStats):
+    # Totals of one monitoring cycle plus the stats of each of its targets
+    def __init__(self):
+        super().__init__(None)
+        self.started_at = time.time()
+        self.targets = []
+
+    def add_target(self, target):
+        with self._lock:
+            self.targets.append(target)
+
+    def to_dict(self):
+        outcomes = {}
+        for target in self.targets:
+            outcomes[target.outcome] = outcomes.get(target.outcome, 0) + 1
+        return {
+            "started_at": self.started_at,
+            "duration": self.duration,
+            "stages": dict(self.stages),
+            "counters": dict(self.counters),
+            "outcomes": outcomes,
+            "targets": [target.to_dict() for target in self.targets],
+        }
+
+def current_url():
+    target = _current_target.get()
+    return target.url if target is not None else None
+
+def record_stage(name, seconds):
+    registry.observe('stage_seconds', seconds, stage=name)
+    for stats in (_current_target.get(), _current_cycle.get()):
+        if stats is not None:
+            stats.add_stage(name, seconds)
+
+@contextmanager
+def stage(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(name, time.perf_counter() - start)
+
+def count(name, value=1):
+    registry.incr(name, value)
+    for stats in (_current_target.get(), _current_cycle.get()):
+        if stats is not None:
+            stats.add(name, value)
+
+def set_gauge(name, value, **labels):
+    registry.set_gauge(name, value, **labels)
+
+def observe(name, seconds, **labels):
+    # Process-level timing outside any target, e.g. SMTP sends on the dispatcher thread
+    registry.observe(name, seconds, **labels)
+
+@contextmanager
+def track_target(url):
+    target = TargetStats(url)
+    token = _current_target.set(target)
+    try:
+        yield target
+    finally:
+        target.finish()
+        _current_target.reset(token)
+        registry.observe('target_seconds', target.duration)
+        registry.incr('targets', outcome=target.outcome)
+        cycle = _current_cycle.get()
+        if cycle is not None:
+            cycle.add_target(target)
+
+@contextmanager
+def track_cycle():
+    cycle = CycleStats()
+    token = _current_cycle.set(cycle)
+    try:
+        yield cycle
+    finally:
+        cycle.finish()
+        _current_cycle.reset(token)
+        registry.observe('cycle_seconds', cycle.duration)
+
+def begin_period():
+    # For a caller whose scan batches overlap and are too small to summarize one by one (the
+    # daemon): targets of the tasks it starts from now on are counted in the returned stats, which
+    # end_period saves as one cycle_metrics row. Targets still running at that point go unrecorded.
+    period = CycleStats()
+    _current_cycle.set(period)
+    return period
+
+def end_period(period):
+    period.finish()
+    if period.targets:
+        save_cycle(period)
+
+def save_cycle(cycle):
+    summary = cycle.to_dict()
+    with connect() as conn:
+        conn.execute(
+            "INSERT INTO cycle_metrics (started_at, duration, targets, summary) VALUES (?, ?, ?, ?)",
+            (summary["started_at"], summary["duration"], len(summary["targets"]), json.dumps(summary))
+        )
+        conn.execute(
+            "DELETE FROM cycle_metrics WHERE id <= (SELECT MAX(id) FROM cycle_metrics) - ?",
+            (KEEP_CYCLES,)
+        )
+        conn.commit()
+
+def recent_cycles(limit=20):
+    # Newest first
+    with connect() as conn:
+        c = conn.cursor()
+        c.execute("SELECT summary FROM cycle_metrics ORDER BY id DESC LIMIT ?", (limit,))
+        return [json.loads(row[0]) for row in c.fetchall()]
+
+def export_json(limit=20):
+    return {"process": registry.snapshot(), "cycles": recent_cycles(limit)}
+
+def write_prometheus(path):
+    # For node_exporter's textfile collector; renamed into place so scrapes never see half a file
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        f.write(registry.prometheus())
+    os.replace(tmp_path, path)
+
+def main(argv=None):
+    # Recorded cycles from urls.db, for processes other than the one that ran them
+    parser = argparse.ArgumentParser(prog='python -m backend.metrics', description='Print recent cycle metrics as JSON.')
+    parser.add_argument('--limit', type=int, default=20, help='number of cycles, newest first')
+    args = parser.parse_args(argv)
+    json.dump(recent_cycles(args.limit), sys.stdout, indent=2)
+    sys.stdout.write("\n")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
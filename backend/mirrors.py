@@ -0,0 +1,142 @@
+import hashlib
+import json
+import threading
+import time
+from backend.db import connect
+
+# Mirrors and near-duplicates are found by SimHash over word shingles of the normalized page text
+# (Page.text). Fingerprints are stored per URL with their bands indexed, so finding the pages
+# within MIRROR_DISTANCE bits is an index lookup rather than a scan of every target.
+
+FINGERPRINT_BITS = 64
+SHINGLE_WORDS = 3
+# Pages with fewer distinct shingles get no fingerprint: blank, JS-only, "Login" or "403 Forbidden"
+# pages are alike across unrelated sites, and grouping them would slow and silence real targets
+MIN_SHINGLES = 10
+# Pages whose fingerprints differ in at most this many bits are treated as the same content; mirrors
+# that differ only in their own address and a timestamp stay within 5 bits even for short pages,
+# unrelated pages are 20+ bits apart. With BANDS > MIRROR_DISTANCE, two such pages always share at
+# least one band exactly.
+MIRROR_DISTANCE = 6
+BANDS = 8
+BAND_BITS = FINGERPRINT_BITS // BANDS
+# Mirrors other than the representative of their group are scanned this many times less often
+MIRROR_SLOWDOWN = 8
+# An alert is dropped when a mirror already alerted on the same content and keywords this recently
+ALERT_WINDOW = 86400
+
+# _BIT_TABLES[bit] maps every byte value to its bit'th bit, for counting a bit across many bytes
+_BIT_TABLES = [bytes((value >> bit) & 1 for value in range(256)) for bit in range(8)]
+
+def simhash(text):
+    # None when the text is too short to tell mirrors from unrelated pages
+    words = text.lower().split()
+    shingles = set(map(' '.join, zip(*(words[i:] for i in range(SHINGLE_WORDS)))))
+    if len(shingles) < MIN_SHINGLES:
+        return None
+    # Counting per bit over the packed digests keeps the 64 x shingles loop in C
+    data = b''.join(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest() for shingle in shingles)
+    fingerprint = 0
+    for byte in range(8):
+        column = data[byte::8]
+        for bit in range(8):
+            if column.translate(_BIT_TABLES[bit]).count(1) * 2 > len(shingles):
+                fingerprint |= 1 << (byte * 8 + bit)
+    return fingerprint
+
+def distance(a, b):
+    return bin(a ^ b).count('1')
+
+_BAND_COLUMNS = ', '.join(f'band{band}' for band in range(BANDS))
+
+def _bands(fingerprint):
+    return [(fingerprint >> (band * BAND_BITS)) & ((1 << BAND_BITS) - 1) for band in range(BANDS)]
+
+def _to_db(fingerprint):
+    # SQLite integers are signed 64-bit
+    return fingerprint - (1 << 64) if fingerprint >= 1 << 63 else fingerprint
+
+def _from_db(value):
+    return value + (1 << 64) if value is not None and value < 0 else value
+
+def record_fingerprint(url, fingerprint, now=None):
+    # Without a fingerprint the URL leaves its mirror group, including the alert it claimed
+    now = time.time() if now is None else now
+    with connect() as conn:
+        if fingerprint is None:
+            conn.execute("DELETE FROM page_fingerprints WHERE url = ?", (url,))
+            conn.commit()
+            return
+        conn.execute(
+            f'''INSERT INTO page_fingerprints (url, simhash, {_BAND_COLUMNS}, updated_at)
+                VALUES (?, ?, {', '.join('?' * BANDS)}, ?)
+                ON CONFLICT(url) DO UPDATE SET simhash = excluded.simhash,
+                    {', '.join(f'band{band} = excluded.band{band}' for band in range(BANDS))},
+                    updated_at = excluded.updated_at''',
+            (url, _to_db(fingerprint), *_bands(fingerprint), now)
+        )
+        conn.commit()
+
+def _near(c, fingerprint, columns):
+    # Rows within MIRROR_DISTANCE of fingerprint, found through the band indexes
+    bands = _bands(fingerprint)
+    c.execute(
+        f'''SELECT url, simhash, {columns} FROM page_fingerprints
+            WHERE {' OR '.join(f'band{band} = ?' for band in range(BANDS))}''',
+        bands
+    )
+    return [row for row in c.fetchall() if distance(_from_db(row[1]), fingerprint) <= MIRROR_DISTANCE]
+
+def representatives(urls):
+    # url -> the URL that stands for its mirror group: the scheduled member with the fewest
+    # consecutive failures, then the smallest URL, so a mirror takes over when it goes down
+    result = {}
+    with connect() as conn:
+        c = conn.cursor()
+        c.execute("SELECT url, failures FROM url_schedule")
+        failures = dict(c.fetchall())
+        for url in urls:
+            row = c.execute("SELECT simhash FROM page_fingerprints WHERE url = ?", (url,)).fetchone()
+            members = [url]
+            if row:
+                members += [other for other, *_ in _near(c, _from_db(row[0]), 'updated_at') if other in failures]
+            result[url] = min(members, key=lambda member: (failures.get(member, 0), member))
+    return result
+
+def change_digest(changes):
+    # What an alert is about: the lines its diff added and removed, without line numbers or context.
+    # The page's SimHash barely moves when one line is added, so it cannot tell two changes apart.
+    lines = sorted(line for line in changes.splitlines()
+                   if line.startswith(('+', '-')) and not line.startswith(('+++ ', '--- ')))
+    return hashlib.sha256('\n'.join(lines).encode('utf-8')).hexdigest()
+
+_alert_lock = threading.Lock()
+
+def claim_alert(url, fingerprint, change, keywords, now=None):
+    # Returns the mirror that already alerted within ALERT_WINDOW on this content, this change
+    # (change_digest) and these keywords; otherwise records that url alerts on them and returns None.
+    # Mirrors scanned at the same time would both miss each other's claim, so check and record
+    # happen in one write transaction.
+    if fingerprint is None:
+        return None
+    now = time.time() if now is None else now
+    with _alert_lock, connect() as conn:
+        c = conn.cursor()
+        c.execute("BEGIN IMMEDIATE")
+        c.execute(
+            '''SELECT url, alerted_simhash, alerted_keywords FROM page_fingerprints
+               WHERE url != ? AND alerted_at >= ? AND alerted_simhash IS NOT NULL AND alerted_change = ?''',
+            (url, now - ALERT_WINDOW, change)
+        )
+        for other, alerted, alerted_keywords in c.fetchall():
+            if (distance(_from_db(alerted), fingerprint) <= MIRROR_DISTANCE
+                    and set(keywords) <= set(json.loads(alerted_keywords or '[]'))):
+                conn.rollback()
+                return other
+        c.execute(
+            '''UPDATE page_fingerprints SET alerted_simhash = ?, alerted_change = ?, alerted_keywords = ?,
+                   alerted_at = ? WHERE url = ?''',
+            (_to_db(fingerprint), change, json.dumps(sorted(keywords)), now, url)
+        )
+        conn.commit()
+    return None
@@ -1,152 +1,478 @@
-import time
-import os
-from difflib import unified_diff
-from bs4 import BeautifulSoup
-import hashlib
-from backend.scraper import scrape_and_save
-from backend.alert import alert_user
-from backend.export import export_to_csv
-from backend.pdf_report import generate_pdf_report
-import json
-
-# Define a directory to store data files like the snapshot
-DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'store')
-LOG_FILE = os.path.join(DATA_DIR, "monitoring_log.json")
-
-def load_log():
-    if os.path.exists(LOG_FILE):
-        with open(LOG_FILE, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    return {}
-
-def save_log(log_data):
-    with open(LOG_FILE, 'w', encoding='utf-8') as f:
-        json.dump(log_data, f, indent=4)
-
-def detect_keywords(content, keywords):
-    found_keywords = []
-    if not keywords:
-        return found_keywords
-    # Use visible text instead of raw HTML
-    soup = BeautifulSoup(content, 'lxml')
-    text_lower = soup.get_text(separator=' ', strip=True).lower()
-    for kw in keywords:
-        if kw and kw.strip():
-            if kw.strip().lower() in text_lower:
-                found_keywords.append(kw.strip())
-    return list(set(found_keywords))
-
-def detect_changes(old, new):
-    diff = unified_diff(
-        str(old).splitlines(keepends=True),
-        str(new).splitlines(keepends=True),
-        fromfile='old_snapshot',
-        tofile='new_snapshot',
-    )
-    changes = ''.join(diff)
-    print(f"Change detection result for diff: {'Changes found' if changes else 'No changes'} - Diff: {changes[:100]}...")
-    return changes
-
-def enumerate_backlinks(soup, base_url):
-    backlinks = set()
-    for a in soup.find_all('a', href=True):
-        href = a['href']
-        if href.endswith('.onion'):
-            backlinks.add(href)
-        elif href.startswith(('http://', 'https://')):
-            backlinks.add(href)
-        elif href.startswith('/'):
-            backlinks.add(f"{base_url.rstrip('/')}{href}")
-        elif not href.startswith(('#', 'javascript:', 'mailto:', 'tel:')):
-            backlinks.add(f"{base_url.rstrip('/')}/{href.lstrip('/')}")
-    return list(backlinks)[:10]
-
-def monitor_job(url, keywords, section=None):
-    os.makedirs(DATA_DIR, exist_ok=True)
-    log_data = load_log()
-
-    try:
-        content, path = scrape_and_save(url, section)
-        print(f"[Success] Saved: {path}")
-        print(f"Successfully scraped {url} (Title: {page_title})")
-        soup = BeautifulSoup(content, 'lxml')
-        page_title = soup.title.string if soup.title else url
-        print(f"Successfully scraped {url} (Title: {page_title})")
-        
-        found_keywords = detect_keywords(content, keywords)
-
-        snapshot_file = os.path.join(DATA_DIR, f"{hashlib.md5(url.encode()).hexdigest()}_snapshot.html")
-        prev_content = ""
-        if os.path.exists(snapshot_file):
-            with open(snapshot_file, 'r', encoding='utf- 8') as f:
-                prev_content = f.read()
-            print(f"Previous snapshot found for {url}: {snapshot_file}")
-        else:
-            print(f"No previous snapshot for {url}. First run.")
-
-        with open(snapshot_file, 'w', encoding='utf-8') as f:
-            f.write(str(content))
-
-        changes = detect_changes(prev_content, content)
-        print(f"Changes detected for {url}: {'Yes' if changes else 'No'} - Length: {len(changes)}")
-        if keywords:
-            print(f"Keywords found for {url}: {found_keywords}")
-
-        backlinks = enumerate_backlinks(soup, url)
-        print(f"Backlinks found for {url}: {backlinks}")
-
-        if url not in log_data:
-            log_data[url] = {"changes_count": 0, "keywords_count": 0, "last_keywords": []}
-        if changes:
-            log_data[url]["changes_count"] += 1
-        if keywords:
-            log_data[url]["keywords_count"] += len(found_keywords)
-            log_data[url]["last_keywords"] = found_keywords
-        save_log(log_data)
-
-        additional_results = []
-        if keywords:
-            for link in backlinks:
-                if link.endswith('.onion'):
-                    try:
-                        link_content, link_path = scrape_and_save(link, section)
-                        link_keywords = detect_keywords(link_content, keywords)
-                        if link_keywords:
-                            additional_results.append({"url": link, "found_keywords": link_keywords})
-                            print(f"Keywords found in additional link {link}: {link_keywords}")
-                    except Exception as e:
-                        print(f"Failed to scrape additional link {link}: {e}")
-
-        if changes or (keywords and (found_keywords or additional_results)):
-            print(f"Alerting and generating reports for {url}...")
-            alert_message = (
-                f"URL: {url}\n"
-                f"Title: {page_title}\n"
-                f"Changes:\n{changes}\n"
-                f"Keywords: {found_keywords}\n"
-                f"Additional Links: {additional_results}\n"
-                f"Backlinks: {backlinks}\n"
-                f"Insights: {url} has changed {log_data[url]['changes_count']} times, "
-                f"found {log_data[url]['keywords_count']} keywords total"
-            )
-            alert_user(url, found_keywords, alert_message)
-            export_to_csv(url, changes, found_keywords, additional_results)
-            generate_pdf_report(url, found_keywords, changes, path, additional_results)
-            return {
-                "changes": changes,
-                "found_keywords": found_keywords,
-                "additional_results": additional_results,
-                "page_title": page_title,
-                "backlinks": backlinks,
-                "error": None
-            }
-    except Exception as e:
-        print(f"Scraping failed for {url}: {e}")
-        return {
-            "error": f"Scraping failed: {e}",
-            "changes": "",
-            "found_keywords": [],
-            "additional_results": [],
-            "page_title": url,
-            "backlinks": []
-        }
\ No newline at end of file
+import time
+import os
+import asyncio
+import hashlib
+import logging
+from backend.scraper import scrape_and_save, UNCHANGED, RetryLater, remember_validators
+from backend.keywords import get_matcher
+from backend.diff import diff_blocks
+from backend.page import Page
+from backend.engine import FetchEngine, TOR_CONCURRENCY, CLEARNET_CONCURRENCY
+from backend.crawler import crawl
+from backend.cache import link_cache
+from backend.db import get_stats, get_fetch_state, last_link_hits, record_scans, ScanBatch
+from backend.archive import previous_text_hash, read_blob, put_blob, set_text_hash, prune
+from backend.alert import alert_user, release_held
+from backend.export import export_to_csv, CsvExporter
+from backend import pdf_report
+from backend.pdf_report import submit_pdf_report, CycleReport
+from backend import metrics
+from backend import workers
+from backend.mirrors import simhash, record_fingerprint, claim_alert, change_digest
+
+logger = logging.getLogger(__name__)
+
+# Define a directory to store data files like the snapshot
+DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'store')
+# Backlinks listed in results and alerts
+MAX_BACKLINKS = 10
+
+def detect_keywords(page, keywords, whole_word=False):
+    if not keywords:
+        return []
+    # Use visible text instead of raw HTML
+    with metrics.stage('keywords'):
+        return get_matcher(keywords, whole_word=whole_word).find(page.keyword_text)
+
+def detect_changes(old, new, engine=None):
+    # old and new are lists of visible-text blocks
+    with metrics.stage('diff'):
+        changes = diff_blocks(old, new, engine)
+    logger.debug("Diff: %s", changes[:100])
+    return changes
+
+def enumerate_backlinks(page, base_url, limit=MAX_BACKLINKS):
+    # Document order, de-duplicated, so the same page always yields the same links
+    backlinks = {}
+    for href in page.links:
+        if href.endswith('.onion'):
+            backlinks[href] = True
+        elif href.startswith(('http://', 'https://')):
+            backlinks[href] = True
+        elif href.startswith('/'):
+            backlinks[f"{base_url.rstrip('/')}{href}"] = True
+        elif not href.startswith(('#', 'javascript:', 'mailto:', 'tel:')):
+            backlinks[f"{base_url.rstrip('/')}/{href.lstrip('/')}"] = True
+    return list(backlinks)[:limit]
+
+def snapshot_path(url, ext='txt'):
+    return os.path.join(DATA_DIR, f"{hashlib.md5(url.encode()).hexdigest()}_snapshot.{ext}")
+
+def load_legacy_snapshot(url):
+    # Snapshot files written before the content-addressed archive
+    snapshot_file = snapshot_path(url)
+    if os.path.exists(snapshot_file):
+        with open(snapshot_file, 'r', encoding='utf-8') as f:
+            return f.read().splitlines()
+    # Snapshots from before text-block diffing stored raw HTML
+    legacy_file = snapshot_path(url, 'html')
+    if os.path.exists(legacy_file):
+        with open(legacy_file, 'r', encoding='utf-8') as f:
+            return Page(f.read(), url).blocks
+    return None
+
+def error_result(url, e):
+    logger.error("Scraping failed for %s: %s", url, e)
+    return {
+        "error": f"Scraping failed: {e}",
+        "changes": "",
+        "found_keywords": [],
+        "additional_results": [],
+        "page_title": url,
+        "backlinks": []
+    }
+
+def deferred_result(url, e):
+    # Not a failure of the page: the scheduler retries the URL after e.delay seconds
+    logger.info("Deferred %s: %s", url, e)
+    metrics.count('deferred')
+    return {
+        "error": f"Deferred: {e}",
+        "changes": "",
+        "found_keywords": [],
+        "additional_results": [],
+        "page_title": url,
+        "backlinks": [],
+        "retry_after": e.delay
+    }
+
+def scan_variant(keywords, section=None):
+    # A changed keyword list or section must force a full rescan of otherwise unchanged pages
+    key = "\n".join([section or ""] + sorted(k.strip().lower() for k in keywords or [] if k and k.strip()))
+    return hashlib.md5(key.encode('utf-8')).hexdigest()
+
+def unchanged_scan(url, keywords):
+    # Stands in for analyze_page when the fetch found the page unchanged: its links come from the
+    # fetch state, so the backlink crawl still runs (mostly link cache hits)
+    logger.info("No changes for %s; skipping parse, archive and diff", url)
+    stats = get_stats(url)
+    state = get_fetch_state(url)
+    links = state["links"] if state and state["links"] is not None else []
+    return {
+        "changes": "",
+        "found_keywords": stats["last_keywords"] if keywords else [],
+        "page_title": stats["page_title"] or url,
+        "links": links,
+        "backlinks": links[:MAX_BACKLINKS],
+        "fingerprint": None,
+        "stats": stats,
+        "previous_hits": last_link_hits(url) if keywords else [],
+        "unchanged": True
+    }
+
+def load_history(url, archive_id):
+    # (digest of the last scan's text blob, None), or (None, blocks) from a legacy snapshot
+    text_hash = previous_text_hash(url, archive_id)
+    if text_hash is not None:
+        return text_hash, None
+    blocks = load_legacy_snapshot(url)
+    if blocks is None:
+        logger.info("No previous snapshot for %s; first run", url)
+    return None, blocks or []
+
+def read_history(text_hash, blocks):
+    if text_hash is None:
+        return blocks
+    text = read_blob(text_hash)
+    return text.splitlines() if text is not None else []
+
+def digest_page(page, keywords, prev_blocks):
+    # The CPU-bound part of a scan; runs in the job's thread or in a worker (digest_html)
+    with metrics.stage('parse'):
+        page_title = page.title
+        # Build the tree here so parsing is not billed to whichever stage reads it first
+        page.blocks
+
+    found_keywords = detect_keywords(page, keywords)
+    # Stored text may predate the current masks; cleaning again is a no-op otherwise
+    changes = detect_changes(page.normalizer.clean_blocks(prev_blocks), page.blocks)
+
+    with metrics.stage('fingerprint'):
+        fingerprint = simhash(page.text)
+
+    return {
+        "changes": changes,
+        "found_keywords": found_keywords,
+        "page_title": page_title,
+        "links": enumerate_backlinks(page, page.url, limit=None),
+        "fingerprint": fingerprint,
+    }
+
+def digest_html(html, url, keywords, history):
+    # Worker side of analyze_page: the page's text is archived here and only its digest sent back
+    page = Page(html, url)
+    with metrics.stage('history'):
+        prev_blocks = read_history(*history)
+    scan = digest_page(page, keywords, prev_blocks)
+    with metrics.stage('history'):
+        scan["text_hash"] = put_blob('\n'.join(page.blocks))
+    return scan
+
+def finish_scan(url, keywords, scan):
+    scan["page_title"] = scan["page_title"] or url
+    logger.info("Scraped %s (title: %s)", url, scan["page_title"])
+    changes = scan["changes"]
+    logger.info("Changes for %s: %s (%d chars)", url, 'yes' if changes else 'no', len(changes))
+    if keywords:
+        logger.info("Keywords found for %s: %s", url, scan["found_keywords"])
+
+    with metrics.stage('fingerprint'):
+        record_fingerprint(url, scan["fingerprint"])
+
+    scan["backlinks"] = scan["links"][:MAX_BACKLINKS]
+    logger.debug("Backlinks found for %s: %s", url, scan["backlinks"])
+
+    # Totals including this scan; the scan itself is written once the job finishes
+    stats = get_stats(url)
+    if changes:
+        stats["changes_count"] += 1
+    if keywords:
+        stats["keywords_count"] += len(scan["found_keywords"])
+    scan["stats"] = stats
+    return scan
+
+def analyze_page(url, keywords, page):
+    with metrics.stage('history'):
+        prev_blocks = read_history(*load_history(url, page.archive_id))
+    scan = digest_page(page, keywords, prev_blocks)
+    with metrics.stage('history'):
+        scan["text_hash"] = put_blob('\n'.join(page.blocks))
+    return finish_scan(url, keywords, scan)
+
+async def analyze_in_worker(url, keywords, page):
+    # analyze_page with the parse, diff and fingerprint in a worker process (backend.workers)
+    with metrics.stage('history'):
+        history = await asyncio.to_thread(load_history, url, page.archive_id)
+    scan = await workers.run(digest_html, page.html, url, keywords, history)
+    return await asyncio.to_thread(finish_scan, url, keywords, scan)
+
+def backlink_keywords(link, link_page, keywords):
+    link_keywords = detect_keywords(link_page, keywords)
+    if link_keywords:
+        logger.info("Keywords found in additional link %s: %s", link, link_keywords)
+        return {"url": link, "found_keywords": link_keywords}
+    return None
+
+def scan_link(link, link_page, keywords):
+    # Crawler visit result: keyword hit (or None) plus the links to expand further
+    if link_page is None:
+        return None, []
+    return backlink_keywords(link, link_page, keywords), enumerate_backlinks(link_page, link, limit=None)
+
+def scan_link_html(html, link, keywords):
+    return scan_link(link, Page(html, link), keywords)
+
+def link_visitor(fetch, keywords, section=None):
+    # Crawler visit that serves links fetched recently by any target from the link cache
+    fingerprint = scan_variant(keywords, section)
+
+    async def visit(link):
+        cached = await asyncio.to_thread(link_cache.get, link, fingerprint)
+        if cached is not None:
+            metrics.count('link_cache_hits')
+            return cached
+        metrics.count('link_cache_misses')
+        link_page, link_path = await fetch(link)
+        if link_page is not None and workers.enabled():
+            result = await workers.run(scan_link_html, link_page.html, link, keywords)
+        else:
+            result = await asyncio.to_thread(scan_link, link, link_page, keywords)
+        if link_page is not None:
+            await asyncio.to_thread(link_cache.put, link, fingerprint, link_page.html, *result)
+        return result
+    return visit
+
+def report_results(url, keywords, path, scan, additional_results, cycle=None):
+    changes = scan["changes"]
+    found_keywords = scan["found_keywords"]
+    if scan.get("unchanged"):
+        # The page's own keywords were reported when it last changed; only link hits its last
+        # result did not list are news
+        alerting = any(hit not in scan["previous_hits"] for hit in additional_results)
+    else:
+        alerting = changes or (keywords and (found_keywords or additional_results))
+    mirror_of = None
+    if alerting:
+        mirror_of = claim_alert(url, scan["fingerprint"], change_digest(changes), found_keywords)
+    if mirror_of:
+        # A mirror already alerted on this content; the scan is still recorded
+        logger.info("Not alerting for %s: same content as %s", url, mirror_of)
+        metrics.count('mirror_alerts_collapsed')
+    elif alerting:
+        logger.info("Alerting and generating reports for %s", url)
+        alert_message = (
+            f"URL: {url}\n"
+            f"Title: {scan['page_title']}\n"
+            f"Changes:\n{changes}\n"
+            f"Keywords: {found_keywords}\n"
+            f"Additional Links: {additional_results}\n"
+            f"Backlinks: {scan['backlinks']}\n"
+            f"Insights: {url} has changed {scan['stats']['changes_count']} times, "
+            f"found {scan['stats']['keywords_count']} keywords total"
+        )
+        alert_user(url, found_keywords, alert_message)
+        if cycle is not None:
+            cycle.export.add(url, changes, found_keywords, additional_results)
+        else:
+            export_to_csv(url, changes, found_keywords, additional_results)
+        if cycle is not None and cycle.report is not None:
+            cycle.report.add(url, found_keywords, changes, path, additional_results)
+        else:
+            submit_pdf_report(url, found_keywords, changes, path, additional_results)
+    return {
+        "changes": changes,
+        "found_keywords": found_keywords,
+        "additional_results": additional_results,
+        "page_title": scan["page_title"],
+        "backlinks": scan["backlinks"],
+        "mirror_of": mirror_of,
+        "error": None,
+        "unchanged": bool(scan.get("unchanged"))
+    }
+
+class Cycle:
+    # State shared by the jobs of one monitoring cycle
+    def __init__(self):
+        self.batch = ScanBatch()
+        # Backlinks already crawled this cycle, shared by every target (url -> future)
+        self.seen_links = {}
+        # Per-host semaphores of the crawler, so PER_HOST_LIMIT holds across all targets
+        self.host_limits = {}
+        self.report = CycleReport() if pdf_report.CONSOLIDATED_REPORTS else None
+        self.export = CsvExporter()
+        # url -> scan_state of the pages scanned, saved once their scans are written
+        self.scan_states = {}
+
+    def finish(self, standalone=True):
+        # standalone=False: the caller releases digests and runs housekeeping on its own timer
+        with metrics.stage('db_flush'):
+            self.batch.flush()
+            save_scan_states(self.scan_states)
+        with metrics.stage('export_flush'):
+            self.export.flush()
+        if standalone:
+            # With DIGEST_ALERTS on, this cycle's alerts go out as one mail
+            release_held()
+        if self.report is not None:
+            self.report.submit()
+        if standalone:
+            housekeeping()
+
+def housekeeping():
+    # Archive retention and expired link cache entries; both scan whole tables
+    with metrics.stage('housekeeping'):
+        prune()
+        link_cache.purge()
+
+def result_outcome(result):
+    if result.get("retry_after") is not None:
+        return 'deferred'
+    if result.get("error"):
+        return 'error'
+    if result.get("unchanged"):
+        return 'unchanged'
+    return 'changed' if result["changes"] else 'scanned'
+
+def scan_state(page, scan):
+    return page.archive_id, scan["text_hash"], page.validators, scan["links"]
+
+def save_scan_states(states):
+    # Runs once the scans are written. Their text becomes the history the next diff compares against
+    # and their validators let the next fetch skip an unchanged page; a scan that failed after the
+    # fetch leaves neither behind, so its change is found again on the next scan.
+    for archive_id, text_hash, _, _ in states.values():
+        if archive_id is not None:
+            set_text_hash(archive_id, text_hash)
+    remember_validators({url: state[2] for url, state in states.items()},
+                        {url: state[3] for url, state in states.items()})
+
+def record_result(url, keywords, result, cycle=None):
+    if result.get("retry_after") is not None:
+        # Deferred: nothing was scanned, so the last scan stays the URL's latest result
+        return
+    state = result.pop("scan_state", None)
+    scanned = not result.get("error") and not result.get("unchanged")
+    entry = {
+        "url": url,
+        "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "changed": bool(result["changes"]),
+        # None leaves last_keywords and the keyword counter untouched
+        "keywords": result["found_keywords"] if keywords and scanned else None,
+        "page_title": result["page_title"] if scanned else None,
+        "changes": result["changes"],
+        "additional_results": result["additional_results"],
+        "backlinks": result["backlinks"],
+        "error": result.get("error"),
+    }
+    if cycle is not None:
+        cycle.batch.add(entry)
+        if state is not None:
+            cycle.scan_states[url] = state
+    else:
+        record_scans([entry])
+        if state is not None:
+            save_scan_states({url: state})
+
+def monitor_job(url, keywords, section=None, cycle=None):
+    with metrics.track_target(url) as target:
+        result = _run_job(url, keywords, section, cycle)
+        record_result(url, keywords, result, cycle)
+        target.outcome = result_outcome(result)
+    return result
+
+def _run_job(url, keywords, section=None, cycle=None):
+    os.makedirs(DATA_DIR, exist_ok=True)
+
+    try:
+        page, path = scrape_and_save(url, section, variant=scan_variant(keywords, section))
+        if page is None:
+            raise Exception("Unable to fetch page.")
+        if page is UNCHANGED:
+            scan = unchanged_scan(url, keywords)
+        else:
+            scan = analyze_page(url, keywords, page)
+
+        additional_results = []
+        if keywords:
+            visit = link_visitor(lambda link: asyncio.to_thread(scrape_and_save, link, section), keywords, section)
+            with metrics.stage('crawl'):
+                crawled = asyncio.run(crawl(scan["links"], visit))
+            additional_results = [hit for link, hit in crawled if hit]
+
+        with metrics.stage('report'):
+            result = report_results(url, keywords, path, scan, additional_results, cycle)
+        if page is not UNCHANGED:
+            result["scan_state"] = scan_state(page, scan)
+        return result
+    except RetryLater as e:
+        return deferred_result(url, e)
+    except Exception as e:
+        return error_result(url, e)
+
+async def async_monitor_job(engine, url, keywords, section=None, cycle=None):
+    with metrics.track_target(url) as target:
+        result = await _run_async_job(engine, url, keywords, section, cycle)
+        await asyncio.to_thread(record_result, url, keywords, result, cycle)
+        target.outcome = result_outcome(result)
+    return result
+
+async def _run_async_job(engine, url, keywords, section=None, cycle=None):
+    os.makedirs(DATA_DIR, exist_ok=True)
+
+    try:
+        page, path = await engine.scrape_and_save(url, section, variant=scan_variant(keywords, section))
+        if page is None:
+            raise Exception("Unable to fetch page.")
+        if page is UNCHANGED:
+            scan = await asyncio.to_thread(unchanged_scan, url, keywords)
+        elif workers.enabled():
+            scan = await analyze_in_worker(url, keywords, page)
+        else:
+            scan = await asyncio.to_thread(analyze_page, url, keywords, page)
+
+        additional_results = []
+        if keywords:
+            visit = link_visitor(lambda link: engine.scrape_and_save(link, section), keywords, section)
+            seen = cycle.seen_links if cycle is not None else None
+            host_limits = cycle.host_limits if cycle is not None else None
+            with metrics.stage('crawl'):
+                crawled = await crawl(scan["links"], visit, seen=seen, host_limits=host_limits)
+            additional_results = [hit for link, hit in crawled if hit]
+
+        with metrics.stage('report'):
+            result = await asyncio.to_thread(report_results, url, keywords, path, scan, additional_results, cycle)
+        if page is not UNCHANGED:
+            result["scan_state"] = scan_state(page, scan)
+        return result
+    except RetryLater as e:
+        return deferred_result(url, e)
+    except Exception as e:
+        return error_result(url, e)
+
+async def monitor_cycle(urls, keywords, section=None,
+                        tor_limit=TOR_CONCURRENCY, clearnet_limit=CLEARNET_CONCURRENCY, engine=None,
+                        standalone=True):
+    # A long-running caller passes its own engine to keep connections across cycles. With
+    # standalone=False it also takes over what would otherwise run after every call: digest release,
+    # housekeeping and the cycle_metrics row (the daemon, whose batches are a few URLs each)
+    if engine is None:
+        async with FetchEngine(tor_limit, clearnet_limit) as engine:
+            return await monitor_cycle(urls, keywords, section, engine=engine, standalone=standalone)
+    cycle = Cycle()
+    if not standalone:
+        return await _scan_batch(engine, urls, keywords, section, cycle, standalone)
+    # Stages nest (crawl includes the fetches of backlinks), so they are not meant to add up
+    with metrics.track_cycle() as stats:
+        results = await _scan_batch(engine, urls, keywords, section, cycle, standalone)
+    await asyncio.to_thread(metrics.save_cycle, stats)
+    return results
+
+async def _scan_batch(engine, urls, keywords, section, cycle, standalone):
+    results = await asyncio.gather(
+        *(async_monitor_job(engine, url, keywords, section, cycle) for url in urls)
+    )
+    await asyncio.to_thread(cycle.finish, standalone)
+    return dict(zip(urls, results))
+
+def run_cycle(urls, keywords, section=None, **limits):
+    return asyncio.run(monitor_cycle(urls, keywords, section, **limits))
@@ -0,0 +1,143 @@
+import re
+import threading
+import time
+from functools import lru_cache
+from urllib.parse import urlsplit
+from backend import metrics
+from backend.db import get_setting, set_setting
+
+# Noise removed from every page before diffing and keyword matching. Page.lines runs this once per
+# fetch. Keywords are matched on those lines; the diff and fingerprint read Page.blocks, the same
+# lines with volatile text masked, since a keyword may well be a hash, a UUID or a time.
+
+# Elements whose text is never content
+NOISE_TAGS = frozenset(('script', 'style', 'noscript', 'template', 'iframe', 'svg'))
+# Text that changes on every load without the page changing. Matched within a line whose whitespace
+# is already collapsed to single spaces; each pattern starts at a word boundary with a hex digit.
+DEFAULT_MASKS = (
+    # ISO timestamps
+    r'\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}(?::\d{2}(?:\.\d+)?)?(?:Z|[+-]\d{2}:?\d{2})?',
+    # Clock times
+    r'\d{1,2}:\d{2}(?::\d{2})?(?: ?[AaPp][Mm])?\b',
+    # Relative times
+    r'\d+ (?:second|minute|hour|day|week)s? ago\b',
+    # UUIDs
+    r'[0-9a-fA-F]{8}(?:-[0-9a-fA-F]{4}){3}-[0-9a-fA-F]{12}\b',
+)
+# Tokens and session ids. Long hex strings are only masked after such a label: elsewhere they are
+# content (file hashes, transaction ids) whose changes must show up in the diff.
+TOKEN_MASK = r'(?P<label>(?i:\b(?:token|session|sid|csrf|nonce)(?:[ _-]?(?:id|token))?[=:] ?))[0-9a-fA-F]{16,}\b'
+MASK = '***'
+# Per-site rules live in the settings table under this key:
+#   {site: {"ignore": [css selector, ...], "mask": [regex, ...]}}
+# where site is a full URL, a host[:port], or '*' for every site; all matching entries apply.
+SETTINGS_KEY = 'noise_filters'
+# How long a process keeps the rules before re-reading them, so UI edits reach the daemon
+RULES_TTL = 30
+
+def _masked(match):
+    # The label of a masked token stays, so the line still says what was there
+    return (match.group('label') or '') + MASK
+
+class Normalizer:
+    def __init__(self, ignore=(), mask=()):
+        self.ignore = tuple(ignore)
+        # The lookahead lets most positions fail before any default pattern is tried
+        patterns = [r'\b(?=[0-9a-fA-F])(?:' + '|'.join(f'(?:{p})' for p in DEFAULT_MASKS) + ')', TOKEN_MASK]
+        self._mask = re.compile('|'.join(patterns + [f'(?:{p})' for p in mask]))
+
+    def clean(self, line):
+        # Whitespace collapsed and volatile text masked; idempotent, so stored blocks can be re-cleaned
+        return self._mask.sub(_masked, ' '.join(line.split()))
+
+    def clean_blocks(self, lines):
+        return [line for line in (self.clean(line) for line in lines) if line]
+
+    def lines(self, tree):
+        # Visible text split into lines, like get_text('\n', strip=True) without the noise elements;
+        # whitespace collapsed but nothing masked
+        with metrics.stage('normalize'):
+            skip = set()
+            for selector in self.ignore:
+                skip.update(id(element) for element in tree.select(selector))
+            lines = (' '.join(line.split()) for string in _strings(tree, skip) for line in string.splitlines())
+            return [line for line in lines if line]
+
+    def mask_lines(self, lines):
+        with metrics.stage('normalize'):
+            return [line for line in (self._mask.sub(_masked, line) for line in lines) if line]
+
+    def blocks(self, tree):
+        return self.mask_lines(self.lines(tree))
+
+def _strings(tree, skip):
+    # Text nodes in document order; comments, scripts and styles are NavigableString subclasses
+    from bs4 import NavigableString, CData
+    stack = [iter(tree.contents)]
+    while stack:
+        node = next(stack[-1], None)
+        if node is None:
+            stack.pop()
+        elif type(node) in (NavigableString, CData):
+            yield node
+        elif hasattr(node, 'contents') and node.name not in NOISE_TAGS and id(node) not in skip:
+            stack.append(iter(node.contents))
+
+def validate(rules):
+    # Raises ValueError naming the bad selector or pattern
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup('', 'lxml')
+    for selector in rules.get("ignore", []):
+        try:
+            soup.select(selector)
+        except Exception as e:
+            raise ValueError(f"Invalid selector {selector!r}: {e}")
+    for pattern in rules.get("mask", []):
+        try:
+            re.compile(pattern)
+        except re.error as e:
+            raise ValueError(f"Invalid pattern {pattern!r}: {e}")
+
+def get_filters():
+    return get_setting(SETTINGS_KEY, {})
+
+def set_filters(site, ignore=(), mask=()):
+    # Empty lists remove the site's rules
+    rules = {"ignore": [s for s in ignore if s.strip()], "mask": [p for p in mask if p.strip()]}
+    validate(rules)
+    filters = get_filters()
+    if rules["ignore"] or rules["mask"]:
+        filters[site] = rules
+    else:
+        filters.pop(site, None)
+    set_setting(SETTINGS_KEY, filters)
+    _cache.clear()
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+def _cached_filters():
+    with _cache_lock:
+        if _cache.get("expires", 0) < time.monotonic():
+            _cache["filters"] = get_filters()
+            _cache["expires"] = time.monotonic() + RULES_TTL
+        return _cache["filters"]
+
+def rules_for(url):
+    filters = _cached_filters()
+    sites = ['*']
+    if url:
+        sites += [urlsplit(url).netloc.lower(), url]
+    ignore, mask = [], []
+    for site in sites:
+        rules = filters.get(site) or {}
+        ignore += rules.get("ignore", [])
+        mask += rules.get("mask", [])
+    return tuple(ignore), tuple(mask)
+
+@lru_cache(maxsize=256)
+def _normalizer(ignore, mask):
+    return Normalizer(ignore, mask)
+
+def get_normalizer(url=None):
+    return _normalizer(*rules_for(url))
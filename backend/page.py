@@ -0,0 +1,97 @@
+from functools import cached_property
+from backend.normalize import get_normalizer
+
+class Page:
+    # Parsed once by the scraper; every later stage reads the cached tree, text, title and links
+    def __init__(self, html, url=None, tree=None, normalizer=None):
+        self.html = html
+        self.url = url
+        self._tree = tree
+        self._normalizer = normalizer
+        # Manifest entry of the archived HTML, set once the scraper has stored it
+        self.archive_id = None
+        # Fetch state to save once the scan is recorded (monitor.save_scan_states)
+        self.validators = None
+
+    def __str__(self):
+        return self.html
+
+    @property
+    def tree(self):
+        if self._tree is None:
+            from bs4 import BeautifulSoup
+            self._tree = BeautifulSoup(self.html, 'lxml')
+        return self._tree
+
+    @cached_property
+    def normalizer(self):
+        # The URL's noise filters (backend.normalize)
+        return self._normalizer or get_normalizer(self.url)
+
+    @cached_property
+    def lines(self):
+        # Visible text split into lines, without noise elements but with nothing masked
+        return self.normalizer.lines(self.tree)
+
+    @cached_property
+    def blocks(self):
+        # The lines with volatile text masked; the unit of change detection
+        return self.normalizer.mask_lines(self.lines)
+
+    @cached_property
+    def text(self):
+        return ' '.join(self.blocks)
+
+    @cached_property
+    def keyword_text(self):
+        # What keywords are matched against: masks would hide hashes, UUIDs and times on a watchlist
+        return ' '.join(self.lines)
+
+    @cached_property
+    def title(self):
+        title = self.tree.title
+        return str(title.string) if title and title.string else None
+
+    @cached_property
+    def links(self):
+        return [a['href'] for a in self.tree.find_all('a', href=True)]
+
+class SectionParser:
+    # Incremental parse for section scans: fed the body as it is downloaded, it keeps only the
+    # element with the given id and reports when it is complete, so the rest is never read or parsed
+    def __init__(self, element_id):
+        from lxml import etree
+        self._etree = etree
+        self.element_id = element_id
+        self._parser = etree.HTMLPullParser(events=('start', 'end'))
+        self._target = None
+        self.html = None
+
+    def feed(self, text):
+        if self.html is None:
+            self._parser.feed(text)
+            self._drain()
+        return self.html is not None
+
+    def close(self):
+        if self.html is None:
+            try:
+                self._parser.close()
+                self._drain()
+            except self._etree.XMLSyntaxError:
+                pass
+        return self.html
+
+    def _drain(self):
+        for event, element in self._parser.read_events():
+            if event == 'start':
+                if self._target is None and element.get('id') == self.element_id:
+                    self._target = element
+            elif element is self._target:
+                self.html = self._etree.tostring(element, method='html', encoding='unicode', with_tail=False)
+                return
+            elif self._target is None:
+                # Finished before the target started, so not an ancestor of it: free it
+                element.clear()
+                while element.getprevious() is not None:
+                    del element.getparent()[0]
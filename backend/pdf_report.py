@@ -1,117 +1,222 @@
-import os
-import time
-from reportlab.lib.pagesizes import A4
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.enums import TA_LEFT
-from reportlab.lib import colors
-import html
-import re
-
-REPORTS_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'reports'))
-
-def sanitize_diff(changes):
-    if not changes or not changes.strip():
-        return "No content changes detected since the last scan."
-    
-    sanitized = []
-    for line in changes.splitlines():
-        if line.startswith('@@') or line.startswith('---') or line.startswith('+++'):
-            continue
-        if re.match(r'^\s*<\w+\b[^>]*>\s*$', line) or re.match(r'^\s*</\w+>\s*$', line):
-            continue
-        if re.match(r'^\s*(?:function|\{|\}|\.[\w\-]+\s*\{)', line):
-            continue
-        if line.startswith('+') or line.startswith('-'):
-            cleaned_line = re.sub(r'\s+', ' ', line.strip())
-            if cleaned_line and len(cleaned_line) > 10:
-                sanitized.append(cleaned_line)
-    
-    if not sanitized:
-        return "No meaningful content changes detected."
-    
-    return '\n'.join(sanitized[:50])
-
-def generate_pdf_report(url, keywords, changes, archive_path, additional_results=None):
-    print(f"Generating PDF report for {url}")
-    additional_results = additional_results or []
-    os.makedirs(REPORTS_DIR, exist_ok=True)
-    
-    timestamp = time.strftime("%Y%m%d-%H%M%S")
-    report_path = os.path.join(REPORTS_DIR, f"monitoring_report_{timestamp}.pdf")
-    
-    print(f"Attempting to generate PDF report at: {report_path}")
-    
-    doc = SimpleDocTemplate(report_path, pagesize=A4,
-                            rightMargin=72, leftMargin=72,
-                            topMargin=72, bottomMargin=18)
-    
-    story = []
-    styles = getSampleStyleSheet()
-    
-    if 'Justify' not in styles.byName:
-        styles.add(ParagraphStyle(name='Justify', alignment=TA_LEFT))
-    if 'Code' not in styles.byName:
-        styles.add(ParagraphStyle(name='Code', fontName='Courier', fontSize=8, leading=8.8))
-    
-    story.append(Paragraph("Web Monitoring Report", styles['h1']))
-    story.append(Spacer(1, 24))
-
-    metadata = [
-        ['Monitored URL:', Paragraph(f'<a href="{url}">{url}</a>', styles['Normal'])],
-        ['Scan Timestamp:', time.ctime()],
-        ['Archived Snapshot:', Paragraph(archive_path.replace('\\', '/'), styles['Code'])],
-    ]
-    
-    tbl = Table(metadata, colWidths=[120, 340])
-    tbl.setStyle(TableStyle([ 
-        ('BACKGROUND', (0, 0), (0, -1), colors.grey),
-        ('TEXTCOLOR', (0, 0), (0, -1), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 12),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black)
-    ]))
-    story.append(tbl)
-    story.append(Spacer(1, 24))
-
-    story.append(Paragraph("Matched Keywords", styles['h2']))
-    if keywords:
-        for kw in keywords:
-            story.append(Paragraph(f"• {kw}", styles['Normal']))
-    else:
-        story.append(Paragraph("No keywords of interest were found during this scan.", styles['Justify']))
-    story.append(Spacer(1, 12))
-
-    story.append(Paragraph("Detected Changes (Sanitized)", styles['h2']))
-    
-    sanitized_changes = sanitize_diff(changes)
-    if sanitized_changes.startswith("No"):
-        story.append(Paragraph(sanitized_changes, styles['Justify']))
-    else:
-        formatted_changes = ""
-        for line in sanitized_changes.splitlines():
-            if line.startswith('+'):
-                line = f'<font color="green">{html.escape(line)}</font>'
-            elif line.startswith('-'):
-                line = f'<font color="red">{html.escape(line)}</font>'
-            else:
-                line = html.escape(line)
-            formatted_changes += line + '<br/>'
-        story.append(Paragraph(formatted_changes, styles['Code']))
-    
-    story.append(Paragraph("Additional Links Scanned", styles['h2']))
-    if additional_results:
-        for result in additional_results:
-            story.append(Paragraph(f"URL: {result['url']}", styles['Normal']))
-            story.append(Paragraph(f"Keywords: {', '.join(result['found_keywords'])}", styles['Normal']))
-            story.append(Spacer(1, 8))
-    else:
-        story.append(Paragraph("No additional links with keywords found.", styles['Justify']))
-    story.append(Spacer(1, 12))
-    
-    try:
-        doc.build(story)
-        print(f"PDF Report saved to: {report_path}")
-    except Exception as e:
-        print(f"Failed to generate PDF report: {e}")
\ No newline at end of file
+import os
+import time
+import hashlib
+import logging
+from functools import lru_cache
+import threading
+import html
+import re
+from backend import metrics
+from backend.workers import SpawnPool
+
+logger = logging.getLogger(__name__)
+
+# ReportLab is imported inside the rendering functions, which only run in the worker
+# processes, so the scanning process never loads it
+REPORTS_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'reports'))
+# Rendering runs in worker processes so scans never wait on ReportLab
+REPORT_WORKERS = 2
+# Render one PDF per cycle instead of one per changed URL
+CONSOLIDATED_REPORTS = False
+
+def sanitize_diff(changes):
+    if not changes or not changes.strip():
+        return "No content changes detected since the last scan."
+    
+    sanitized = []
+    for line in changes.splitlines():
+        if line.startswith('@@') or line.startswith('---') or line.startswith('+++'):
+            continue
+        if re.match(r'^\s*<\w+\b[^>]*>\s*$', line) or re.match(r'^\s*</\w+>\s*$', line):
+            continue
+        if re.match(r'^\s*(?:function|\{|\}|\.[\w\-]+\s*\{)', line):
+            continue
+        if line.startswith('+') or line.startswith('-'):
+            cleaned_line = re.sub(r'\s+', ' ', line.strip())
+            if cleaned_line and len(cleaned_line) > 10:
+                sanitized.append(cleaned_line)
+    
+    if not sanitized:
+        return "No meaningful content changes detected."
+    
+    return '\n'.join(sanitized[:50])
+
+@lru_cache(maxsize=1)
+def get_styles():
+    # Built once per worker process instead of once per report
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.lib.enums import TA_LEFT
+    styles = getSampleStyleSheet()
+    if 'Justify' not in styles.byName:
+        styles.add(ParagraphStyle(name='Justify', alignment=TA_LEFT))
+    if 'Code' not in styles.byName:
+        styles.add(ParagraphStyle(name='Code', fontName='Courier', fontSize=8, leading=8.8))
+    return styles
+
+def _build_doc(report_path):
+    from reportlab.lib.pagesizes import A4
+    from reportlab.platypus import SimpleDocTemplate
+    return SimpleDocTemplate(report_path, pagesize=A4,
+                             rightMargin=72, leftMargin=72,
+                             topMargin=72, bottomMargin=18)
+
+def _url_story(url, keywords, changes, archive_path, additional_results=None):
+    from reportlab.platypus import Paragraph, Spacer, Table, TableStyle
+    from reportlab.lib import colors
+    additional_results = additional_results or []
+    styles = get_styles()
+    story = []
+
+    metadata = [
+        ['Monitored URL:', Paragraph(f'<a href="{url}">{url}</a>', styles['Normal'])],
+        ['Scan Timestamp:', time.ctime()],
+        ['Archived Snapshot:', Paragraph((archive_path or 'N/A').replace('\\', '/'), styles['Code'])],
+    ]
+    
+    tbl = Table(metadata, colWidths=[120, 340])
+    tbl.setStyle(TableStyle([ 
+        ('BACKGROUND', (0, 0), (0, -1), colors.grey),
+        ('TEXTCOLOR', (0, 0), (0, -1), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 12),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black)
+    ]))
+    story.append(tbl)
+    story.append(Spacer(1, 24))
+
+    story.append(Paragraph("Matched Keywords", styles['h2']))
+    if keywords:
+        for kw in keywords:
+            story.append(Paragraph(f"• {kw}", styles['Normal']))
+    else:
+        story.append(Paragraph("No keywords of interest were found during this scan.", styles['Justify']))
+    story.append(Spacer(1, 12))
+
+    story.append(Paragraph("Detected Changes (Sanitized)", styles['h2']))
+    
+    sanitized_changes = sanitize_diff(changes)
+    if sanitized_changes.startswith("No"):
+        story.append(Paragraph(sanitized_changes, styles['Justify']))
+    else:
+        # One paragraph per line: cheaper to lay out and can break across pages
+        for line in sanitized_changes.splitlines():
+            if line.startswith('+'):
+                line = f'<font color="green">{html.escape(line)}</font>'
+            elif line.startswith('-'):
+                line = f'<font color="red">{html.escape(line)}</font>'
+            else:
+                line = html.escape(line)
+            story.append(Paragraph(line, styles['Code']))
+    
+    story.append(Paragraph("Additional Links Scanned", styles['h2']))
+    if additional_results:
+        for result in additional_results:
+            story.append(Paragraph(f"URL: {result['url']}", styles['Normal']))
+            story.append(Paragraph(f"Keywords: {', '.join(result['found_keywords'])}", styles['Normal']))
+            story.append(Spacer(1, 8))
+    else:
+        story.append(Paragraph("No additional links with keywords found.", styles['Justify']))
+    story.append(Spacer(1, 12))
+    return story
+
+def generate_pdf_report(url, keywords, changes, archive_path, additional_results=None, reports_dir=None):
+    from reportlab.platypus import Paragraph, Spacer
+    reports_dir = reports_dir or REPORTS_DIR
+    os.makedirs(reports_dir, exist_ok=True)
+    
+    timestamp = time.strftime("%Y%m%d-%H%M%S")
+    url_hash = hashlib.md5(url.encode('utf-8')).hexdigest()[:8]
+    report_path = os.path.join(reports_dir, f"monitoring_report_{timestamp}_{url_hash}.pdf")
+    
+    logger.info("Generating PDF report for %s at %s", url, report_path)
+    
+    story = [Paragraph("Web Monitoring Report", get_styles()['h1']), Spacer(1, 24)]
+    story += _url_story(url, keywords, changes, archive_path, additional_results)
+    
+    try:
+        _build_doc(report_path).build(story)
+        logger.info("PDF report saved to %s", report_path)
+    except Exception as e:
+        logger.error("Failed to generate PDF report: %s", e)
+    return report_path
+
+def generate_cycle_report(entries, reports_dir=None):
+    # entries: dicts with the generate_pdf_report arguments, one per alerted URL
+    from reportlab.platypus import Paragraph, Spacer, PageBreak
+    reports_dir = reports_dir or REPORTS_DIR
+    os.makedirs(reports_dir, exist_ok=True)
+    timestamp = time.strftime("%Y%m%d-%H%M%S")
+    report_path = os.path.join(reports_dir, f"cycle_report_{timestamp}.pdf")
+    logger.info("Generating cycle report for %d URLs at %s", len(entries), report_path)
+
+    styles = get_styles()
+    story = [Paragraph("Web Monitoring Report", styles['h1']), Spacer(1, 24)]
+    for index, entry in enumerate(entries):
+        if index:
+            story.append(PageBreak())
+        story.append(Paragraph(entry["url"], styles['h2']))
+        story += _url_story(**entry)
+
+    try:
+        _build_doc(report_path).build(story)
+        logger.info("PDF report saved to %s", report_path)
+    except Exception as e:
+        logger.error("Failed to generate PDF report: %s", e)
+    return report_path
+
+_pool = SpawnPool()
+
+def shutdown(wait=True):
+    # Lets queued reports finish before a long-running process exits
+    _pool.shutdown(wait)
+
+_pending = 0
+_pending_lock = threading.Lock()
+
+def _track_pending(delta):
+    global _pending
+    with _pending_lock:
+        _pending += delta
+        metrics.set_gauge('pdf_reports_pending', _pending)
+
+def _submit(fn, *args):
+    # Rendering time is measured here, from submission to completion, since it runs in another process
+    submitted = time.perf_counter()
+    _track_pending(1)
+    future = _pool.get(REPORT_WORKERS).submit(fn, *args)
+
+    def done(future):
+        _track_pending(-1)
+        metrics.observe('pdf_report_seconds', time.perf_counter() - submitted)
+        if future.exception():
+            logger.error("Failed to generate PDF report: %s", future.exception())
+    future.add_done_callback(done)
+    return future
+
+def submit_pdf_report(url, keywords, changes, archive_path, additional_results=None):
+    # Workers re-import this module, so pass settings that may have been changed at runtime
+    return _submit(generate_pdf_report, url, keywords, changes, archive_path, additional_results, REPORTS_DIR)
+
+class CycleReport:
+    # Collects the alerted URLs of one cycle for a single consolidated PDF
+    def __init__(self):
+        self._entries = []
+        self._lock = threading.Lock()
+
+    def add(self, url, keywords, changes, archive_path, additional_results=None):
+        with self._lock:
+            self._entries.append({
+                "url": url,
+                "keywords": keywords,
+                "changes": changes,
+                "archive_path": archive_path,
+                "additional_results": additional_results,
+            })
+
+    def submit(self):
+        with self._lock:
+            entries, self._entries = self._entries, []
+        if not entries:
+            return None
+        return _submit(generate_cycle_report, entries, REPORTS_DIR)
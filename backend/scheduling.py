@@ -0,0 +1,96 @@
+import random
+import time
+from backend.db import connect
+from backend.mirrors import MIRROR_SLOWDOWN, representatives
+
+# Every URL starts at this interval and adapts to how often it actually changes
+BASE_INTERVAL = 600
+MIN_INTERVAL = 300
+MAX_INTERVAL = 86400
+# Interval multipliers after a scan that found changes / found none
+SPEEDUP = 0.5
+SLOWDOWN = 1.5
+# Fraction of the interval added or removed at random, so targets added together drift apart
+JITTER = 0.1
+
+def ensure_schedules(urls, base_interval=BASE_INTERVAL, now=None):
+    # New targets are due immediately
+    now = time.time() if now is None else now
+    with connect() as conn:
+        conn.executemany(
+            '''INSERT OR IGNORE INTO url_schedule (url, interval, jitter, priority, next_due)
+               VALUES (?, ?, ?, 0, ?)''',
+            [(url, base_interval, JITTER, now) for url in urls]
+        )
+        conn.commit()
+
+def configure(url, interval=None, priority=None, jitter=None):
+    # Manual override; a new interval is the starting point for further adaptation
+    ensure_schedules([url])
+    with connect() as conn:
+        conn.execute(
+            '''UPDATE url_schedule SET interval = COALESCE(?, interval), priority = COALESCE(?, priority),
+                   jitter = COALESCE(?, jitter) WHERE url = ?''',
+            (interval, priority, jitter, url)
+        )
+        conn.commit()
+
+def due_targets(urls, now=None, limit=None):
+    # Due URLs among urls, highest priority first, then the most overdue
+    now = time.time() if now is None else now
+    wanted = set(urls)
+    with connect() as conn:
+        c = conn.cursor()
+        c.execute("SELECT url FROM url_schedule WHERE next_due <= ? ORDER BY priority DESC, next_due", (now,))
+        due = [row[0] for row in c.fetchall() if row[0] in wanted]
+    return due[:limit] if limit else due
+
+def next_due_time(urls):
+    with connect() as conn:
+        c = conn.cursor()
+        c.execute("SELECT url, next_due FROM url_schedule")
+        wanted = set(urls)
+        return min((due for url, due in c.fetchall() if url in wanted), default=None)
+
+def next_interval(interval, changed):
+    if changed:
+        return max(MIN_INTERVAL, interval * SPEEDUP)
+    return min(MAX_INTERVAL, interval * SLOWDOWN)
+
+def record_outcomes(results, now=None):
+    # results: url -> monitoring result; moves each URL's next_due according to what the scan saw
+    now = time.time() if now is None else now
+    represented_by = representatives(results)
+    with connect() as conn:
+        c = conn.cursor()
+        for url, result in results.items():
+            c.execute("SELECT interval, jitter, failures FROM url_schedule WHERE url = ?", (url,))
+            row = c.fetchone()
+            if not row:
+                continue
+            interval, jitter, failures = row
+            changed = bool(result.get("changes"))
+            if result.get("retry_after") is not None:
+                # Queue page, transient error or a host the breaker skips: come back soon, doubling
+                # the wait while it persists up to the URL's own interval, but never sooner than asked
+                failures += 1
+                delay = max(result["retry_after"], min(interval, result["retry_after"] * 2 ** (failures - 1)))
+            elif result.get("error"):
+                # Back off exponentially but keep the interval learned while the site was up
+                failures += 1
+                delay = min(MAX_INTERVAL, interval * 2 ** failures)
+            else:
+                failures = 0
+                interval = next_interval(interval, changed)
+                delay = interval
+                if represented_by[url] != url:
+                    # Another mirror of the same content is scanned at full frequency
+                    delay = min(MAX_INTERVAL, interval * MIRROR_SLOWDOWN)
+            delay *= 1 + random.uniform(-jitter, jitter)
+            c.execute(
+                '''UPDATE url_schedule SET interval = ?, failures = ?, next_due = ?, last_run = ?,
+                       last_change = CASE WHEN ? THEN ? ELSE last_change END
+                   WHERE url = ?''',
+                (interval, failures, now + delay, now, changed, now, url)
+            )
+        conn.commit()
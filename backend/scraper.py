@@ -1,80 +1,257 @@
-import requests
-from bs4 import BeautifulSoup
-import os
-import hashlib
-import time
-import re
-import socket
-
-ARCHIVE_DIR = "archive"
-MAX_ATTEMPTS = 5
-DEFAULT_WAIT = 5
-
-def get_session(is_onion):
-    session = requests.session()
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) Chrome/117.0.0.0',
-        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8'
-    }
-    session.headers.update(headers)
-    if is_onion:
-        session.proxies.update({
-            'http': 'socks5h://127.0.0.1:9050',
-            'https': 'socks5h://127.0.0.1:9050'
-        })
-    return session, ("Tor" if is_onion else "Clearnet")
-
-def is_queue_page(html_content):
-    return bool(re.search(r'queue|waiting|please wait|javascript refresh|cloudflare', str(html_content).lower()))
-
-def sanitize_filename(url):
-    return hashlib.md5(url.encode('utf-8')).hexdigest()
-
-def save_content(content, url):
-    os.makedirs(ARCHIVE_DIR, exist_ok=True)
-    timestamp = time.strftime("%Y%m%d-%H%M%S")
-    filename = f"{sanitize_filename(url)}_{timestamp}.html"
-    filepath = os.path.join(ARCHIVE_DIR, filename)
-    with open(filepath, 'w', encoding='utf-8') as f:
-        f.write(content)
-    return filepath
-
-def scrape_and_save(url, section=None):
-    is_onion = '.onion' in url
-    session, session_type = get_session(is_onion)
-    attempt = 0
-    wait_time = DEFAULT_WAIT
-    timeout = 60 if not is_onion else 90
-
-    print(f"[{session_type}] Scraping: {url}")
-
-    while attempt < MAX_ATTEMPTS:
-        try:
-            res = session.get(url, timeout=timeout)
-            res.raise_for_status()
-            soup = BeautifulSoup(res.text, 'lxml')
-
-            if is_onion and is_queue_page(soup):
-                print(f"[Queue] Waiting for {url} {wait_time}s...")
-                time.sleep(wait_time)
-                wait_time *= 2
-                attempt += 1
-                continue
-
-            content = soup.find(id=section) if section else soup
-            if not content:
-                raise Exception("Unable to extract content.")
-
-            html = str(content)
-            path = save_content(html, url)
-            print(f"[Success] Saved: {path}")
-            return html, path
-
-        except (requests.exceptions.RequestException, socket.gaierror) as e:
-            print(f"[Error] Attempt {attempt+1} failed for {url}: {e}")
-            attempt += 1
-            time.sleep(wait_time)
-            wait_time *= 2
-
-    print(f"[Failure] Gave up after {MAX_ATTEMPTS} attempts.")
-    return None, None
+import codecs
+import hashlib
+import logging
+import time
+import re
+import socket
+from email.utils import parsedate_to_datetime
+from backend.sessions import SessionPool
+from backend.breaker import breaker, host_of
+from backend import metrics
+from backend.db import get_fetch_state, save_fetch_state, save_fetch_states
+from backend.page import Page, SectionParser
+from backend.archive import save_snapshot, touch
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = 5
+DEFAULT_WAIT = 5
+TOR_PROXY = 'socks5h://127.0.0.1:9050'
+# Bodies are streamed and refused past this size, so a huge or hostile page cannot exhaust memory
+MAX_BODY_BYTES = 5 * 1024 * 1024
+CHUNK_SIZE = 64 * 1024
+# Anything else (images, archives, binaries) is refused before its body is read; '' is no header
+HTML_TYPES = ('text/html', 'application/xhtml+xml', 'text/plain', '')
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) Chrome/117.0.0.0',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8'
+}
+
+# Returned instead of page content when the server or the body hash says nothing changed
+UNCHANGED = object()
+
+class FetchRejected(Exception):
+    # The response is not a page we scan: too large or not HTML. Not retried.
+    pass
+
+class RetryLater(Exception):
+    # Raised instead of sleeping in the worker: a queue page, a transient error with defer on, or a
+    # host the circuit breaker is skipping. The caller reschedules the URL after delay seconds.
+    def __init__(self, delay, reason):
+        super().__init__(f"{reason}; retry in {delay:.0f}s")
+        self.delay = delay
+        self.reason = reason
+
+# Shared by the scraper and the GUI status checks so connections and Tor circuits are reused
+session_pool = SessionPool(headers=HEADERS, tor_proxy=TOR_PROXY)
+
+def get_session(url):
+    is_onion = '.onion' in url
+    return session_pool.get(url), ("Tor" if is_onion else "Clearnet")
+
+def request_timeout(is_onion):
+    return 90 if is_onion else 60
+
+def is_queue_page(html_content):
+    return bool(re.search(r'queue|waiting|please wait|javascript refresh|cloudflare', str(html_content).lower()))
+
+def retry_after(headers, default):
+    # Retry-After is either delta-seconds or an HTTP date
+    value = headers.get('Retry-After') if headers else None
+    if not value:
+        return default
+    try:
+        return max(0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return default
+
+def is_transient(status):
+    # None is a connection error or timeout
+    return status is None or status >= 500 or status in (408, 429)
+
+def note_host(url, status):
+    # Any answer that is not transient means the host is up, even a 404
+    if is_transient(status):
+        breaker.record_failure(url)
+    else:
+        breaker.record_success(url)
+
+def check_breaker(url):
+    blocked = breaker.blocked_for(url)
+    if blocked:
+        raise RetryLater(blocked, f"{host_of(url)} is down")
+
+def check_headers(headers):
+    content_type = (headers.get('Content-Type') or '').split(';')[0].strip().lower()
+    if content_type not in HTML_TYPES:
+        raise FetchRejected(f"Unsupported content type {content_type}")
+    length = headers.get('Content-Length')
+    if length and length.isdigit() and int(length) > MAX_BODY_BYTES:
+        raise FetchRejected(f"Response of {length} bytes exceeds the {MAX_BODY_BYTES} byte limit")
+
+def charset_of(headers):
+    match = re.search(r'charset=["\']?([\w.:-]+)', headers.get('Content-Type') or '', re.I)
+    return match.group(1) if match else 'utf-8'
+
+class BodyReader:
+    # Decodes a streamed body, refusing more than max_bytes. With a section id the body is also
+    # parsed as it arrives and feed() returns True once that element is complete.
+    def __init__(self, encoding, section=None, max_bytes=MAX_BODY_BYTES):
+        try:
+            self._decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+        except LookupError:
+            self._decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        self.max_bytes = max_bytes
+        self._size = 0
+        self._parts = []
+        self._section = SectionParser(section) if section else None
+
+    def feed(self, chunk):
+        self._size += len(chunk)
+        if self._size > self.max_bytes:
+            raise FetchRejected(f"Response exceeds the {self.max_bytes} byte limit")
+        text = self._decoder.decode(chunk)
+        self._parts.append(text)
+        return self._section is not None and self._section.feed(text)
+
+    def finish(self):
+        # Returns (text read so far, section HTML or None)
+        self._parts.append(self._decoder.decode(b'', final=True))
+        metrics.count('bytes_fetched', self._size)
+        section_html = self._section.close() if self._section is not None else None
+        return ''.join(self._parts), section_html
+
+def read_body(chunks, headers, section=None):
+    check_headers(headers)
+    reader = BodyReader(charset_of(headers), section)
+    for chunk in chunks:
+        if reader.feed(chunk):
+            break
+    return reader.finish()
+
+def save_content(page, url):
+    page.archive_id, path = save_snapshot(url, page.html)
+    return path
+
+def content_hash(text):
+    # Whitespace-only churn (re-indented templates, trailing spaces) should not count as a change
+    normalized = re.sub(r'\s+', ' ', text).strip()
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+# Stored fetch state plus conditional request headers; nothing when variant is None
+def load_validators(url, variant):
+    if variant is None:
+        return None, {}
+    state = get_fetch_state(url)
+    if not state or state["variant"] != variant:
+        return None, {}
+    headers = {}
+    if state["etag"]:
+        headers['If-None-Match'] = state["etag"]
+    if state["last_modified"]:
+        headers['If-Modified-Since'] = state["last_modified"]
+    return state, headers
+
+# Returns (unchanged, body_hash) and refreshes the stored validators on a hash hit
+def check_unchanged(url, variant, state, status, headers, text):
+    if status == 304:
+        logger.info("Not modified (304): %s", url)
+        metrics.count('not_modified')
+        touch(url)
+        return True, None
+    body_hash = content_hash(text)
+    if state and state["content_hash"] == body_hash:
+        logger.info("Body hash matches last scan: %s", url)
+        metrics.count('hash_unchanged')
+        save_fetch_state(url, variant, headers.get('ETag'), headers.get('Last-Modified'), body_hash)
+        touch(url)
+        return True, body_hash
+    return False, body_hash
+
+def fetch_validators(variant, headers, body_hash):
+    # Kept on the page and saved once its scan is recorded: saved at fetch time, a scan that fails
+    # later would make the next fetch look unchanged and lose the change
+    if variant is None:
+        return None
+    return variant, headers.get('ETag'), headers.get('Last-Modified'), body_hash
+
+def remember_validators(validators, links):
+    # {url: validators} and {url: the page's links} of recorded scans
+    save_fetch_states([(url, *state, links.get(url)) for url, state in validators.items() if state is not None])
+
+def extract_content(text, url, section=None, section_html=None):
+    if section:
+        # Cut out by the streaming parser; the rest of the document is never parsed
+        content = Page(section_html, url) if section_html else None
+    else:
+        content = Page(text, url)
+    if not content:
+        raise Exception("Unable to extract content.")
+    return content
+
+def scrape_and_save(url, section=None, variant=None, defer=False):
+    # variant identifies what the caller derives from the page (section, keyword list);
+    # conditional requests are only sent when it matches the stored state.
+    # With defer, queue pages and transient errors raise RetryLater instead of sleeping here.
+    from requests.exceptions import RequestException
+    is_onion = '.onion' in url
+    session, session_type = get_session(url)
+    attempt = 0
+    wait_time = DEFAULT_WAIT
+    timeout = request_timeout(is_onion)
+    state, conditional = load_validators(url, variant)
+
+    logger.info("[%s] Scraping: %s", session_type, url)
+
+    while attempt < MAX_ATTEMPTS:
+        check_breaker(url)
+        try:
+            with metrics.stage('fetch'), session.get(url, timeout=timeout, headers=conditional, stream=True) as res:
+                res.raise_for_status()
+                note_host(url, res.status_code)
+                status, headers = res.status_code, res.headers
+                text, section_html = read_body(res.iter_content(CHUNK_SIZE), headers, section)
+
+            if is_onion and status != 304 and is_queue_page(text):
+                if defer:
+                    logger.info("Queue page, deferring %s by %ss", url, wait_time)
+                    raise RetryLater(wait_time, "queue page")
+                logger.info("Queue page, waiting %ss for %s", wait_time, url)
+                metrics.count('retries')
+                time.sleep(wait_time)
+                wait_time *= 2
+                attempt += 1
+                continue
+
+            # A section scan only hashes the section, so changes elsewhere on the page are ignored
+            unchanged, body_hash = check_unchanged(url, variant, state, status, headers, section_html or text)
+            if unchanged:
+                return UNCHANGED, None
+
+            page = extract_content(text, url, section, section_html)
+            with metrics.stage('archive'):
+                path = save_content(page, url)
+            page.validators = fetch_validators(variant, headers, body_hash)
+            logger.debug("Saved %s to %s", url, path)
+            return page, path
+
+        except (RequestException, socket.gaierror) as e:
+            logger.warning("Attempt %d failed for %s: %s", attempt + 1, url, e)
+            response = getattr(e, 'response', None)
+            status = response.status_code if response is not None else None
+            note_host(url, status)
+            if defer:
+                if not is_transient(status):
+                    return None, None
+                raise RetryLater(retry_after(response.headers if response is not None else None, wait_time), str(e))
+            metrics.count('retries')
+            attempt += 1
+            time.sleep(wait_time)
+            wait_time *= 2
+
+    logger.error("Gave up on %s after %d attempts", url, MAX_ATTEMPTS)
+    return None, None
@@ -0,0 +1,66 @@
+import threading
+import time
+from urllib.parse import urlsplit
+
+# Connection pools per (Tor/clearnet, host) session; tune for the number of targets per host
+POOL_CONNECTIONS = 4
+POOL_MAXSIZE = 8
+# Sessions unused for this long are closed so dead Tor circuits are not kept around
+IDLE_TIMEOUT = 300
+
+class SessionPool:
+    def __init__(self, headers=None, tor_proxy=None, pool_connections=POOL_CONNECTIONS,
+                 pool_maxsize=POOL_MAXSIZE, idle_timeout=IDLE_TIMEOUT):
+        self.headers = headers or {}
+        self.tor_proxy = tor_proxy
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.idle_timeout = idle_timeout
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def _build(self, is_onion):
+        # Only the sync path and the UI health check need requests; the cycle runs on aiohttp
+        import requests
+        from requests.adapters import HTTPAdapter
+        session = requests.Session()
+        session.headers.update(self.headers)
+        session.headers['Connection'] = 'keep-alive'
+        adapter = HTTPAdapter(pool_connections=self.pool_connections, pool_maxsize=self.pool_maxsize)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        if is_onion and self.tor_proxy:
+            session.proxies.update({
+                'http': self.tor_proxy,
+                'https': self.tor_proxy
+            })
+        return session
+
+    def get(self, url):
+        host = urlsplit(url).netloc.lower()
+        is_onion = '.onion' in host
+        key = (is_onion, host)
+        now = time.monotonic()
+        with self._lock:
+            self._evict_idle(now)
+            entry = self._sessions.get(key)
+            if entry is None:
+                entry = self._sessions[key] = [self._build(is_onion), now]
+            entry[1] = now
+            return entry[0]
+
+    def _evict_idle(self, now):
+        for key, (session, last_used) in list(self._sessions.items()):
+            if now - last_used > self.idle_timeout:
+                session.close()
+                del self._sessions[key]
+
+    def evict_idle(self):
+        with self._lock:
+            self._evict_idle(time.monotonic())
+
+    def close(self):
+        with self._lock:
+            for session, _ in self._sessions.values():
+                session.close()
+            self._sessions.clear()
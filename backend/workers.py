@@ -0,0 +1,90 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+from backend import metrics
+
+# Parsing, keyword matching, diffing and fingerprinting of fetched pages run in worker processes,
+# so a large cycle uses every core instead of queueing on the GIL behind the event loop.
+# Fetching, the database and alerts stay in the scanning process. 0 keeps it all in-process.
+WORKER_PROCESSES = os.cpu_count() or 1
+
+class SpawnPool:
+    # A process pool started on first use, for the scan workers here and the PDF renderers
+    # (backend.pdf_report). spawn, because forking a process that runs the event loop and
+    # dispatcher threads is unsafe.
+    def __init__(self):
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def get(self, max_workers):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=max_workers,
+                                                     mp_context=multiprocessing.get_context('spawn'))
+            return self._executor
+
+    def discard(self, executor):
+        # A worker died (killed, out of memory); the next get starts a fresh pool
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False)
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+_pool = SpawnPool()
+
+def enabled():
+    return WORKER_PROCESSES > 0
+
+def shutdown(wait=True):
+    _pool.shutdown(wait)
+
+def _paths():
+    # Workers re-import every module, so paths that may have been changed at runtime are passed in
+    from backend import db, archive
+    return db.DB_PATH, archive.BLOB_DIR
+
+def _call(fn, name, size, url, args, paths):
+    # In the worker: reads the page from shared memory and returns fn's result with the stages
+    # and counters it recorded, for the scanning process to add to the target's metrics
+    from backend import db, archive
+    db.DB_PATH, archive.BLOB_DIR = paths
+    block = shared_memory.SharedMemory(name)
+    try:
+        html = bytes(block.buf[:size]).decode('utf-8', 'surrogatepass')
+    finally:
+        block.close()
+    with metrics.track_target(url) as target:
+        result = fn(html, url, *args)
+    return result, target.stages, target.counters
+
+async def run(fn, html, url, *args):
+    # Runs fn(html, url, *args) in a worker. The page goes through shared memory rather than the
+    # executor's call queue, which pickles every argument through a single feeder thread and pipe.
+    data = html.encode('utf-8', 'surrogatepass')
+    block = shared_memory.SharedMemory(create=True, size=max(1, len(data)))
+    executor = _pool.get(WORKER_PROCESSES)
+    try:
+        block.buf[:len(data)] = data
+        future = executor.submit(_call, fn, block.name, len(data), url, args, _paths())
+        result, stages, counters = await asyncio.wrap_future(future)
+    except BrokenProcessPool:
+        _pool.discard(executor)
+        raise
+    finally:
+        block.close()
+        block.unlink()
+    for name, seconds in stages.items():
+        metrics.record_stage(name, seconds)
+    for name, value in counters.items():
+        metrics.count(name, value)
+    return result
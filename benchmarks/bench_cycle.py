@@ -0,0 +1,227 @@
+# End-to-end cost of monitoring cycles against the local farm (farm.py), without network access.
+# Each scale runs in its own process and working directory, so RSS and disk growth are its own.
+# Run from the repository root:
+#   python benchmarks/bench_cycle.py [--scales 10 100 1000] [--cycles 3] [--mode cycle|defer|job] [--workers N]
+#   python benchmarks/bench_cycle.py --save baseline.json
+#   python benchmarks/bench_cycle.py --baseline baseline.json
+import argparse
+import asyncio
+import json
+import logging
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+import farm as farm_module
+
+SCALES = (10, 100, 1000)
+# The first cycle fetches everything; later ones see the farm's churn
+CYCLES = 3
+# cycle: run_cycle as the UI and CLI call it; defer: queue pages and errors deferred as the
+# daemon does; job: monitor_job one target after another (the sync path)
+MODES = ('cycle', 'defer', 'job')
+COLUMNS = ('throughput', 'p50_ms', 'p99_ms', 'rss_mib', 'disk_mib')
+
+def configure(workdir, farm, worker_processes):
+    # Everything the scan writes goes under workdir; .onion requests go to the farm's SOCKS proxy.
+    # Relative paths (alert logs) resolve there too, so this runs before backend is imported.
+    os.chdir(workdir)
+    from backend import db, monitor, archive, export, pdf_report, alert, scraper, engine, workers
+    from backend.logs import setup_logging
+    db.DB_PATH = os.path.join(workdir, 'urls.db')
+    db.LEGACY_LOG_FILE = os.path.join(workdir, 'monitoring_log.json')
+    monitor.DATA_DIR = os.path.join(workdir, 'store')
+    archive.BLOB_DIR = os.path.join(workdir, 'archive', 'blobs')
+    export.LOG_FILE = os.path.join(workdir, 'reports', 'log.csv')
+    pdf_report.REPORTS_DIR = os.path.join(workdir, 'reports')
+    # One PDF per cycle; rendering runs in worker processes, off the scan path
+    pdf_report.CONSOLIDATED_REPORTS = True
+    # Alerts are queued as usual, as one digest per cycle; sending fails fast on a closed port
+    alert.DIGEST_ALERTS = True
+    alert.SMTP_HOST, alert.SMTP_PORT = '127.0.0.1', 1
+    # RSS below is the scanning process only, not its parse/diff workers
+    workers.WORKER_PROCESSES = worker_processes
+    proxy = f'socks5h://127.0.0.1:{farm.socks_port}'
+    scraper.TOR_PROXY = engine.TOR_PROXY = scraper.session_pool.tor_proxy = proxy
+    setup_logging('ERROR')
+    logging.getLogger('backend.alert').setLevel(logging.CRITICAL)
+
+def disk_usage(path):
+    total = 0
+    for dirpath, _, filenames in os.walk(path):
+        for name in filenames:
+            try:
+                total += os.path.getsize(os.path.join(dirpath, name))
+            except OSError:
+                pass
+    return total
+
+def rss_kib():
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1])
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+def run_targets(mode, urls, keywords):
+    # Returns the per-target stats of the cycle
+    from backend import metrics
+    from backend.monitor import run_cycle, monitor_cycle, monitor_job, Cycle
+    from backend.engine import FetchEngine
+    if mode == 'job':
+        with metrics.track_cycle() as stats:
+            cycle = Cycle()
+            for url in urls:
+                monitor_job(url, keywords, cycle=cycle)
+            cycle.finish()
+        return [target.to_dict() for target in stats.targets]
+    if mode == 'defer':
+        async def deferred():
+            async with FetchEngine(defer_retries=True) as engine:
+                await monitor_cycle(urls, keywords, engine=engine)
+        asyncio.run(deferred())
+    else:
+        run_cycle(urls, keywords)
+    return metrics.recent_cycles(1)[0]["targets"]
+
+def run_scale(args, targets):
+    farm = farm_module.Farm(targets, onion_share=args.onion_share, churn=args.churn,
+                            latency=args.latency / 1000, tor_latency=args.tor_latency / 1000).start()
+    workdir = tempfile.mkdtemp(prefix='bench_cycle_')
+    try:
+        configure(workdir, farm, args.workers)
+        from backend import pdf_report, workers
+        from backend.alert import dispatcher
+        urls = farm.urls()
+        rows = []
+        for n in range(args.cycles):
+            if n:
+                farm.next_cycle()
+            disk_before = disk_usage(workdir)
+            start = time.perf_counter()
+            stats = run_targets(args.mode, urls, [farm_module.KEYWORD])
+            wall = time.perf_counter() - start
+            durations = [target["duration"] * 1000 for target in stats]
+            outcomes = {}
+            for target in stats:
+                outcomes[target["outcome"]] = outcomes.get(target["outcome"], 0) + 1
+            rows.append({
+                "targets": targets,
+                "cycle": n + 1,
+                "wall": wall,
+                "throughput": targets / wall,
+                "p50_ms": percentile(durations, 0.5),
+                "p99_ms": percentile(durations, 0.99),
+                "rss_mib": rss_kib() / 1024,
+                "disk_mib": (disk_usage(workdir) - disk_before) / 2 ** 20,
+                "outcomes": outcomes,
+            })
+        dispatcher.stop()
+        pdf_report.shutdown()
+        workers.shutdown()
+        return {
+            "targets": targets,
+            "cycles": rows,
+            "peak_rss_mib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+            # Includes the PDFs rendered after the last cycle
+            "disk_mib": disk_usage(workdir) / 2 ** 20,
+            "farm_requests": farm.requests,
+            "farm_mib": farm.bytes_sent / 2 ** 20,
+        }
+    finally:
+        farm.stop()
+        os.chdir(ROOT)
+        if args.keep:
+            print(f"kept {workdir}", file=sys.stderr)
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+def run_child(args, targets):
+    command = [sys.executable, os.path.abspath(__file__), '--single', str(targets),
+               '--cycles', str(args.cycles), '--mode', args.mode,
+               '--latency', str(args.latency), '--tor-latency', str(args.tor_latency),
+               '--onion-share', str(args.onion_share), '--churn', str(args.churn),
+               '--workers', str(args.workers)]
+    if args.keep:
+        command.append('--keep')
+    proc = subprocess.run(command, cwd=ROOT, stdout=subprocess.PIPE, text=True, check=True)
+    return json.loads(proc.stdout)
+
+def print_report(results, baseline=None):
+    previous = {}
+    for result in baseline or []:
+        for row in result["cycles"]:
+            previous[(row["targets"], row["cycle"])] = row
+    print(f"{'targets':>7} {'cycle':>5} {'wall (s)':>9} {'targets/s':>10} {'p50 (ms)':>9} {'p99 (ms)':>9} "
+          f"{'RSS (MiB)':>10} {'disk +MiB':>10}  outcomes")
+    for result in results:
+        for row in result["cycles"]:
+            outcomes = ', '.join(f"{k}: {v}" for k, v in sorted(row["outcomes"].items()))
+            print(f"{row['targets']:>7} {row['cycle']:>5} {row['wall']:>9.2f} {row['throughput']:>10.1f} "
+                  f"{row['p50_ms']:>9.1f} {row['p99_ms']:>9.1f} {row['rss_mib']:>10.1f} "
+                  f"{row['disk_mib']:>10.2f}  {outcomes}")
+            old = previous.get((row["targets"], row["cycle"]))
+            if old:
+                deltas = ' '.join(f"{column} {_delta(old[column], row[column])}" for column in COLUMNS)
+                print(f"{'':>13} vs baseline: {deltas}")
+        print(f"{'':>13} peak RSS {result['peak_rss_mib']:.1f} MiB, disk {result['disk_mib']:.2f} MiB, "
+              f"farm served {result['farm_requests']} requests ({result['farm_mib']:.1f} MiB)")
+
+def _delta(old, new):
+    if not old:
+        return 'n/a'
+    return f"{(new - old) / old * 100:+.0f}%"
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark monitoring cycles against a local farm.')
+    parser.add_argument('--scales', type=int, nargs='+', default=list(SCALES), help='numbers of targets')
+    parser.add_argument('--cycles', type=int, default=CYCLES)
+    parser.add_argument('--mode', choices=MODES, default='cycle')
+    parser.add_argument('--latency', type=float, default=farm_module.LATENCY * 1000, help='HTTP latency in ms')
+    parser.add_argument('--tor-latency', type=float, default=farm_module.TOR_LATENCY * 1000,
+                        help='extra latency per SOCKS connection in ms')
+    parser.add_argument('--onion-share', type=float, default=farm_module.ONION_SHARE)
+    parser.add_argument('--churn', type=float, default=farm_module.CHURN)
+    parser.add_argument('--save', default=None, help='write the results as JSON to this file')
+    parser.add_argument('--baseline', default=None, help='compare with results saved by --save')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='parse/diff worker processes (default: one per core; 0 for none)')
+    parser.add_argument('--keep', action='store_true', help='keep the working directories')
+    parser.add_argument('--single', type=int, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if args.workers is None:
+        args.workers = os.cpu_count() or 1
+
+    if args.single is not None:
+        json.dump(run_scale(args, args.single), sys.stdout)
+        return 0
+
+    print(f"mode {args.mode}, {args.cycles} cycles, latency {args.latency:.0f} ms "
+          f"(+{args.tor_latency:.0f} ms per onion connection), onion share {args.onion_share}, "
+          f"{args.workers} workers")
+    results = [run_child(args, targets) for targets in args.scales]
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+    print_report(results, baseline)
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({"args": {k: v for k, v in vars(args).items() if k not in ('save', 'baseline')},
+                       "results": results}, f, indent=2)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,48 @@
+# Measures the import time of the scan entry points with python -X importtime and fails
+# (exit 1) when a heavy dependency is loaded eagerly again or the budget is exceeded.
+# Run from the repository root: python benchmarks/bench_import.py
+import os
+import subprocess
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+MODULES = ('backend.monitor', 'backend.__main__')
+# Only needed once a page is fetched, parsed or reported on
+DEFERRED = ('reportlab', 'pandas', 'aiohttp', 'aiohttp_socks', 'requests', 'bs4', 'lxml')
+# Cumulative microseconds for the import itself, not interpreter start-up
+BUDGET_US = 300000
+TOP = 10
+
+def import_times(module):
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    times = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        # "import time:   self [us] | cumulative | imported package"
+        self_us, cumulative_us, name = line.split(':', 1)[1].split('|')
+        times[name.strip()] = (int(self_us), int(cumulative_us))
+    return times
+
+def main():
+    failed = False
+    for module in MODULES:
+        times = import_times(module)
+        total = times[module][1]
+        eager = sorted({name.split('.')[0] for name in times} & set(DEFERRED))
+        print(f"{module}: {total / 1000:.1f} ms cumulative, {len(times)} modules")
+        for name, (_, cumulative_us) in sorted(times.items(), key=lambda item: -item[1][1])[1:TOP + 1]:
+            print(f"  {cumulative_us / 1000:8.1f} ms  {name}")
+        if eager:
+            print(f"  FAIL: imported eagerly: {', '.join(eager)}")
+            failed = True
+        if total > BUDGET_US:
+            print(f"  FAIL: over the {BUDGET_US / 1000:.0f} ms budget")
+            failed = True
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
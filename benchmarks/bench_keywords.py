@@ -0,0 +1,54 @@
+# Compares the compiled keyword matcher with the old per-keyword substring loop.
+# Run from the repository root: python benchmarks/bench_keywords.py
+import os
+import random
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from backend.keywords import KeywordMatcher
+
+TEXT_WORDS = 20000
+SIZES = (10, 1000, 10000)
+REPEAT = 5
+
+def legacy_detect(text, keywords):
+    found_keywords = []
+    text_lower = text.lower()
+    for kw in keywords:
+        if kw and kw.strip():
+            if kw.strip().lower() in text_lower:
+                found_keywords.append(kw.strip())
+    return list(set(found_keywords))
+
+def random_word(rng):
+    return ''.join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 10)))
+
+def best_of(fn):
+    best = float('inf')
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    rng = random.Random(42)
+    vocabulary = [random_word(rng) for _ in range(5000)]
+    text = ' '.join(rng.choice(vocabulary) for _ in range(TEXT_WORDS))
+    print(f"text: {len(text)} chars")
+    print(f"{'keywords':>9} {'legacy (ms)':>12} {'compile (ms)':>13} {'matcher (ms)':>13} {'speedup':>8}")
+    for size in SIZES:
+        # Half of the watchlist appears in the text, half does not
+        keywords = [rng.choice(vocabulary) if i % 2 else random_word(rng) for i in range(size)]
+        legacy = best_of(lambda: legacy_detect(text, keywords))
+        start = time.perf_counter()
+        matcher = KeywordMatcher(keywords)
+        compile_time = time.perf_counter() - start
+        compiled = best_of(lambda: matcher.find(text))
+        assert set(matcher.find(text)) == set(legacy_detect(text, keywords))
+        print(f"{size:>9} {legacy * 1000:>12.2f} {compile_time * 1000:>13.2f} {compiled * 1000:>13.2f} {legacy / compiled:>7.1f}x")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,285 @@
+# Local stand-in for the monitored sites: an HTTP server with synthetic pages and a SOCKS5
+# proxy that sends every .onion host to it, so scans run offline and reproducibly.
+# Used by bench_cycle.py; can also be run on its own: python benchmarks/farm.py --targets 10
+import argparse
+import http.server
+import random
+import selectors
+import socket
+import socketserver
+import struct
+import sys
+import threading
+import time
+
+# (name, share of sites, body bytes)
+SIZES = (('small', 0.6, 4 * 1024), ('medium', 0.3, 64 * 1024), ('large', 0.1, 1024 * 1024))
+# Mean share of sites whose content changes in a cycle; each site gets 0, 0.5, 1 or 2 times it
+CHURN = 0.2
+# Mean onion links per site page (0 to twice this), drawn from a pool shared by all sites so
+# crawls overlap
+FANOUT = 5
+LEAVES_PER_SITE = 2
+# Share of onion sites that answer the first request of each cycle with a queue page
+QUEUE_SHARE = 0.05
+# Share of sites and leaves that mention the benchmark keyword
+KEYWORD_SHARE = 0.3
+KEYWORD = 'benchmark'
+ONION_SHARE = 0.5
+# Response delay in seconds, +/- 50%; the SOCKS proxy adds TOR_LATENCY to each connection
+LATENCY = 0.02
+TOR_LATENCY = 0.2
+SEED = 42
+
+QUEUE_PAGE = b"<html><head><title>Queue</title></head><body>You are in the queue, please wait.</body></html>"
+
+def _filler(seed, size=2 * 1024 * 1024):
+    # One block of words that page bodies are sliced from; generating text per request is too slow
+    rng = random.Random(seed)
+    words = [''.join(rng.choices('abcdefghijklmnopqrstuvwxyz', k=rng.randint(3, 9))) for _ in range(2000)]
+    out = []
+    length = 0
+    while length < size:
+        line = ' '.join(rng.choices(words, k=12))
+        out.append(line)
+        length += len(line) + 1
+    return '\n'.join(out)
+
+class QuietErrors:
+    # Clients drop connections mid-body (size cap, section found, timeouts); that is not an error here
+    def handle_error(self, request, client_address):
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+class Farm:
+    def __init__(self, targets, onion_share=ONION_SHARE, churn=CHURN, fanout=FANOUT,
+                 queue_share=QUEUE_SHARE, latency=LATENCY, tor_latency=TOR_LATENCY, seed=SEED):
+        self.latency = latency
+        self.tor_latency = tor_latency
+        self.fanout = fanout
+        self.churn = churn
+        self.cycle = 0
+        self.requests = 0
+        self.bytes_sent = 0
+        self._rng = random.Random(seed)
+        self._filler = _filler(seed)
+        self._lock = threading.Lock()
+        self._queued = set()
+        self.sites = [self._site(i, onion_share, queue_share) for i in range(targets)]
+        self.leaves = max(1, targets * LEAVES_PER_SITE)
+        self.http_server = None
+        self.socks_server = None
+
+    def _site(self, i, onion_share, queue_share):
+        rng = self._rng
+        roll = rng.random()
+        for size_name, share, size in SIZES:
+            if roll < share:
+                break
+            roll -= share
+        onion = rng.random() < onion_share
+        return {
+            "churn": self.churn * rng.choice((0, 0.5, 1, 2)),
+            "fanout": rng.randint(0, 2 * self.fanout),
+            "id": i,
+            "onion": onion,
+            "size": size,
+            "size_name": size_name,
+            "offset": rng.randrange(len(self._filler) - size),
+            "queue": onion and rng.random() < queue_share,
+            "keyword": rng.random() < KEYWORD_SHARE,
+            "version": 0,
+        }
+
+    def urls(self):
+        return [self.url(site) for site in self.sites]
+
+    def url(self, site):
+        if site["onion"]:
+            return f"http://site{site['id']}.onion/"
+        return f"http://127.0.0.1:{self.http_port}/site/{site['id']}"
+
+    @property
+    def http_port(self):
+        return self.http_server.server_address[1]
+
+    @property
+    def socks_port(self):
+        return self.socks_server.server_address[1]
+
+    def next_cycle(self):
+        # Changes the content of a CHURN share of the sites and re-arms the queue pages
+        with self._lock:
+            self.cycle += 1
+            rng = random.Random(f"{SEED}:{self.cycle}")
+            for site in self.sites:
+                if rng.random() < site["churn"]:
+                    site["version"] += 1
+            self._queued.clear()
+
+    def page(self, host, path):
+        # Returns the body, or None for an unknown page
+        try:
+            if host.endswith('.onion'):
+                name = host[:-len('.onion')]
+                if name.startswith('leaf'):
+                    return self._leaf(int(name[4:]))
+                if name.startswith('site'):
+                    return self._site_page(int(name[4:]))
+            elif path.startswith('/site/'):
+                return self._site_page(int(path.split('/')[2]))
+        except ValueError:
+            pass
+        return None
+
+    def _site_page(self, i):
+        if not 0 <= i < len(self.sites):
+            return None
+        site = self.sites[i]
+        with self._lock:
+            if site["queue"] and i not in self._queued:
+                self._queued.add(i)
+                return QUEUE_PAGE
+            version = site["version"]
+        rng = random.Random(f"{i}:links")
+        links = ''.join(f'<a href="http://leaf{rng.randrange(self.leaves)}.onion/">link {n}</a>\n'
+                        for n in range(site["fanout"]))
+        text = self._filler[site["offset"]:site["offset"] + site["size"]]
+        mention = f"<p>{KEYWORD} mention</p>" if site["keyword"] else ""
+        return (f"<html><head><title>Site {i}</title></head><body>"
+                f"<div id=\"main\"><h1>Site {i}</h1><p>Revision {version}</p>{mention}"
+                f"<pre>{text}</pre></div>\n{links}</body></html>").encode()
+
+    def _leaf(self, n):
+        if not 0 <= n < self.leaves:
+            return None
+        rng = random.Random(f"leaf:{n}")
+        offset = rng.randrange(len(self._filler) - 2048)
+        mention = f"<p>{KEYWORD}</p>" if rng.random() < KEYWORD_SHARE else ""
+        return (f"<html><head><title>Leaf {n}</title></head><body>{mention}"
+                f"<p>{self._filler[offset:offset + 2048]}</p></body></html>").encode()
+
+    def delay(self):
+        time.sleep(self.latency * random.uniform(0.5, 1.5))
+
+    def start(self):
+        farm = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                farm.delay()
+                body = farm.page(self.headers.get('Host', '').split(':')[0], self.path)
+                with farm._lock:
+                    farm.requests += 1
+                    farm.bytes_sent += len(body or b'')
+                if body is None:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        class Server(QuietErrors, http.server.ThreadingHTTPServer):
+            daemon_threads = True
+            request_queue_size = 256
+
+        self.http_server = Server(('127.0.0.1', 0), Handler)
+        self.socks_server = SocksServer(('127.0.0.1', 0), self)
+        for server in (self.http_server, self.socks_server):
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        for server in (self.http_server, self.socks_server):
+            if server is not None:
+                server.shutdown()
+                server.server_close()
+
+class SocksHandler(socketserver.BaseRequestHandler):
+    # Minimal SOCKS5: no authentication, CONNECT only. Every destination is the farm's HTTP
+    # server, after TOR_LATENCY to stand in for building a circuit.
+    def handle(self):
+        client = self.request
+        try:
+            version, methods = struct.unpack('!BB', _recv(client, 2))
+            _recv(client, methods)
+            client.sendall(b'\x05\x00')
+            version, command, _, address_type = struct.unpack('!BBBB', _recv(client, 4))
+            if address_type == 1:
+                _recv(client, 4)
+            elif address_type == 3:
+                _recv(client, _recv(client, 1)[0])
+            elif address_type == 4:
+                _recv(client, 16)
+            _recv(client, 2)
+            if command != 1:
+                client.sendall(b'\x05\x07\x00\x01' + b'\x00' * 6)
+                return
+            farm = self.server.farm
+            time.sleep(farm.tor_latency * random.uniform(0.5, 1.5))
+            upstream = socket.create_connection(('127.0.0.1', farm.http_port))
+        except (OSError, struct.error, IndexError):
+            return
+        with upstream:
+            client.sendall(b'\x05\x00\x00\x01' + b'\x00' * 6)
+            try:
+                _relay(client, upstream)
+            except OSError:
+                pass
+
+def _recv(sock, n):
+    data = b''
+    while len(data) < n:
+        chunk = sock.recv(n - len(data))
+        if not chunk:
+            raise OSError("connection closed")
+        data += chunk
+    return data
+
+def _relay(a, b):
+    # selectors rather than select.select, which fails on descriptors above 1024
+    with selectors.DefaultSelector() as selector:
+        selector.register(a, selectors.EVENT_READ, b)
+        selector.register(b, selectors.EVENT_READ, a)
+        while True:
+            events = selector.select(60)
+            if not events:
+                return
+            for key, _ in events:
+                data = key.fileobj.recv(65536)
+                if not data:
+                    return
+                key.data.sendall(data)
+
+class SocksServer(QuietErrors, socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    request_queue_size = 256
+
+    def __init__(self, address, farm):
+        self.farm = farm
+        super().__init__(address, SocksHandler)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serve the benchmark farm until interrupted.')
+    parser.add_argument('--targets', type=int, default=10)
+    args = parser.parse_args(argv)
+    farm = Farm(args.targets).start()
+    print(f"HTTP 127.0.0.1:{farm.http_port}, SOCKS5 127.0.0.1:{farm.socks_port}")
+    for url in farm.urls():
+        print(url)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        farm.stop()
+
+if __name__ == '__main__':
+    main()
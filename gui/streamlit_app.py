@@ -1,380 +1,407 @@
-import streamlit as st
-import sys
-import os
-sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-import json
-import sqlite3
-import time
-import requests
-import logging
-from apscheduler.schedulers.background import BackgroundScheduler
-from backend.monitor import monitor_job
-
-# Suppress Streamlit warnings
-logging.getLogger('streamlit').setLevel(logging.ERROR)
-
-# Database setup
-DB_PATH = os.path.join(os.path.dirname(__file__), '..', 'urls.db')
-RESULTS_FILE = os.path.join(os.path.dirname(__file__), '..', 'latest_results.json')
-LAST_SCAN_TIME_FILE = os.path.join(os.path.dirname(__file__), '..', 'last_scan_time.txt')
-
-def init_db():
-    with sqlite3.connect(DB_PATH) as conn:
-        c = conn.cursor()
-        c.execute('''CREATE TABLE IF NOT EXISTS urls (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            alias TEXT NOT NULL,
-            url TEXT NOT NULL UNIQUE
-        )''')
-        conn.commit()
-
-# Initialize database
-init_db()
-def run_monitoring_cycle(urls, keywords):
-    results = {}
-    for url in urls:
-        try:
-            result = monitor_job(url, keywords)
-            results[url] = result
-            print(f"Monitoring cycle completed for {url}: {result}")
-        except Exception as e:
-            print(f"Error in monitoring cycle for {url}: {e}")
-            results[url] = {
-                "error": str(e),
-                "changes": "",
-                "found_keywords": [],
-                "additional_results": [],
-                "page_title": url,
-                "backlinks": []
-            }
-    # Save results and last scan time
-    with open(RESULTS_FILE, 'w') as f:
-        json.dump(results, f)
-    with open(LAST_SCAN_TIME_FILE, 'w') as f:
-        f.write(time.ctime())
-
-# --- Page and UI Configuration ---
-st.set_page_config(layout="wide", page_title="Kautilya")
-st.title("KAUTILYA: Web Scanner")
-
-# --- Helper Functions to Display Results ---
-def display_change_card(changes_text, url, title):
-    with st.container(border=True):
-        st.markdown(f"### {title or url}")
-        if not changes_text or not changes_text.strip():
-            st.info("No changes detected in the page content since the last scan.")
-        else:
-            st.code(changes_text, language='diff')
-            st.session_state.alerts.append(f"Changes detected for {title or url}")
-        st.markdown("---")
-
-def display_keywords_card(keywords_found, url):
-    with st.container(border=True):
-        st.markdown(f"### Keywords for {url}")
-        if not keywords_found:
-            st.info("No keywords of interest were found on the page.")
-        else:
-            st.success(f"Found the following keywords: **{', '.join(keywords_found)}**")
-        st.markdown("---")
-
-def display_additional_results_card(additional_results, url):
-    with st.container(border=True):
-        st.markdown(f"### Additional Links for {url}")
-        if not additional_results:
-            st.info("No additional links with keywords found.")
-        else:
-            for result in additional_results:
-                st.write(f"- **{result['url']}**: {', '.join(result['found_keywords'])}")
-        st.markdown("---")
-
-def display_backlinks_card(backlinks, alias, url):
-    with st.container(border=True):
-        st.markdown(f"### Backlinks/Subdomains for {alias or url}")
-        if not backlinks:
-            st.info("No backlinks or subdomains found.")
-        else:
-            for link in backlinks:
-                st.write(f"- {link}")
-        st.markdown("---")
-
-def display_keyword_hits_card(keyword_hits):
-    with st.container(border=True):
-        st.markdown("### Keyword Hit Analysis")
-        if not keyword_hits:
-            st.info("No keyword hits recorded.")
-        else:
-            for url, hits in keyword_hits.items():
-                st.write(f"- **{url}**: {hits} hits")
-        st.markdown("---")
-
-def display_status_alert(alias, url, status_code, error=None):
-    with st.container(border=True):
-        st.markdown(f"### Status Alert for {alias}")
-        if status_code == 200:
-            st.success(f"URL {url} is reachable (Status: {status_code})")
-        else:
-            st.error(f"URL {url} returned status {status_code}: {error or 'Unknown error'}")
-        st.markdown("---")
-
-# --- Database and URL Functions ---
-def check_url_status(url):
-    try:
-        is_onion = '.onion' in url
-        session = requests.session()
-        session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) Chrome/117.0.0.0'
-        })
-        if is_onion:
-            session.proxies.update({
-                'http': 'socks5h://127.0.0.1:9050',
-                'https': 'socks5h://127.0.0.1:9050'
-            })
-
-        # Use stream=True to avoid loading the whole body
-        res = session.get(url, timeout=90, stream=True)
-        return res.status_code, None
-    except Exception as e:
-        return None, str(e)
-
-def is_valid_url(url):
-    if not (url.endswith('.onion') or url.startswith(('http://', 'https://'))):
-        return False, "Invalid URL. Must be a .onion URL or start with http:// or https://"
-    status_code, error = check_url_status(url)
-    if status_code != 200:
-        return False, f"URL is unreachable (Status: {status_code or 'N/A'}, Error: {error or 'Unknown'})"
-    return True, None
-
-def save_url(alias, url):
-    valid, error = is_valid_url(url)
-    if not valid:
-        st.error(error)
-        return False
-    try:
-        with sqlite3.connect(DB_PATH) as conn:
-            c = conn.cursor()
-            c.execute("INSERT OR REPLACE INTO urls (alias, url) VALUES (?, ?)", (alias, url))
-            conn.commit()
-        return True
-    except Exception as e:
-        st.error(f"Failed to save URL: {e}")
-        return False
-
-def load_urls():
-    try:
-        with sqlite3.connect(DB_PATH) as conn:
-            c = conn.cursor()
-            c.execute("SELECT alias, url FROM urls")
-            return c.fetchall()
-    except Exception as e:
-        st.error(f"Failed to load URLs: {e}")
-        return []
-
-def delete_url(url):
-    try:
-        with sqlite3.connect(DB_PATH) as conn:
-            c = conn.cursor()
-            c.execute("DELETE FROM urls WHERE url = ?", (url,))
-            conn.commit()
-    except Exception as e:
-        st.error(f"Failed to delete URL: {e}")
-
-# --- Main Application Logic ---
-if 'scheduler' not in st.session_state:
-    st.session_state.scheduler = None
-if 'results' not in st.session_state:
-    st.session_state.results = {}
-if 'last_scan_time' not in st.session_state:
-    st.session_state.last_scan_time = None
-if 'alerts' not in st.session_state:
-    st.session_state.alerts = []
-if 'keyword_hits' not in st.session_state:
-    st.session_state.keyword_hits = {}
-if 'status_alerts' not in st.session_state:
-    st.session_state.status_alerts = {}
-
-# --- Sidebar for Configuration ---
-with st.sidebar:
-    st.header("Scan Configuration")
-    st.warning("Ensure Tor Browser is running (socks5h://127.0.0.1:9150) for .onion URLs.")
-
-    # URL and Alias Input
-    st.subheader("Add New URL")
-    new_url = st.text_input("Enter URL", placeholder="http://example.onion or https://example.com")
-    new_alias = st.text_input("Enter Alias for URL", placeholder="e.g., Forum 1")
-    if st.button("Add URL"):
-        if new_url and new_alias:
-            if save_url(new_alias, new_url):
-                st.success(f"Added {new_url} as {new_alias}")
-        else:
-            st.error("Please provide both URL and alias.")
-
-    # URL Selection
-    st.subheader("Select URLs to Monitor")
-    saved_urls = load_urls()
-    selected_urls = []
-    if saved_urls:
-        selected_urls = st.multiselect("Choose URLs (max 10)", 
-                                      options=[f"{alias} ({url})" for alias, url in saved_urls],
-                                      default=[])
-        selected_urls = [url for alias, url in saved_urls if f"{alias} ({url})" in selected_urls][:10]
-
-    # Display Selected URLs
-    st.subheader("Monitored URLs")
-    if selected_urls:
-        for alias, url in saved_urls:
-            if url in selected_urls:
-                with st.container():
-                    st.write(f"**{alias}**: {url}")
-                    col1, col2 = st.columns([1, 1])
-                    with col1:
-                        if st.button(f"Edit {alias}", key=f"edit_{url}"):
-                            st.session_state[f"editing_{url}"] = True
-                    with col2:
-                        if st.button(f"Delete {alias}", key=f"delete_{url}"):
-                            delete_url(url)
-                            st.rerun()
-                    if st.session_state.get(f"editing_{url}", False):
-                        new_alias = st.text_input(f"New alias for {url}", value=alias, key=f"alias_{url}")
-                        new_url = st.text_input(f"New URL for {alias}", value=url, key=f"url_{url}")
-                        if st.button(f"Save Changes for {alias}", key=f"save_{url}"):
-                            if save_url(new_alias, new_url):
-                                st.session_state[f"editing_{url}"] = False
-                                st.rerun()
-    else:
-        st.info("No URLs selected for monitoring.")
-
-    # Keyword Input
-    st.subheader("Keywords to Monitor (Optional)")
-    keywords_input = st.text_input("Enter keywords (comma-separated, leave blank for general monitoring)", placeholder="keyword1, keyword2")
-    keywords = [k.strip() for k in keywords_input.split(",") if k.strip()]
-
-    # Monitoring Controls
-    if st.button("Start Automated Monitoring", type="primary"):
-        if not selected_urls:
-            st.error("Please select at least one URL.")
-        else:
-            for url in selected_urls:
-                alias = next((a for a, u in saved_urls if u == url), url)
-                status_code, error = check_url_status(url)
-                st.session_state.status_alerts[url] = (alias, status_code, error)
-            if all(st.session_state.status_alerts.get(url, (None, 200, None))[1] == 200 for url in selected_urls):
-                if st.session_state.scheduler is None:
-                    try:
-                        scheduler = BackgroundScheduler()
-                        scheduler.add_job(
-                            lambda: run_monitoring_cycle(selected_urls, keywords),
-                            'interval',
-                            seconds=600,
-                            max_instances=10
-                        )
-                        scheduler.start()
-                        st.session_state.scheduler = scheduler
-                        st.success("Automated monitoring started (every 10 minutes).")
-                    except Exception as e:
-                        st.error(f"Failed to start scheduler: {e}")
-                else:
-                    st.warning("Monitoring already running.")
-            else:
-                st.error("Cannot start monitoring: Some URLs are unreachable.")
-
-    if st.button("Stop Monitoring"):
-        if st.session_state.scheduler:
-            try:
-                st.session_state.scheduler.shutdown()
-                st.session_state.scheduler = None
-                st.success("Monitoring stopped.")
-            except Exception as e:
-                st.error(f"Failed to stop scheduler: {e}")
-        else:
-            st.warning("No monitoring process is running.")
-
-    if st.button("Manual Scan", type="secondary"):
-        if not selected_urls:
-            st.error("Please select at least one URL.")
-        else:
-            for url in selected_urls:
-                alias = next((a for a, u in saved_urls if u == url), url)
-                status_code, error = check_url_status(url)
-                st.session_state.status_alerts[url] = (alias, status_code, error)
-            if all(st.session_state.status_alerts.get(url, (None, 200, None))[1] == 200 for url in selected_urls):
-                with st.spinner("Running manual scan..."):
-                    try:
-                        run_monitoring_cycle(selected_urls, keywords)
-                    except Exception as e:
-                        st.error(f"Manual scan failed: {e}")
-            else:
-                st.error("Cannot run scan: Some URLs are unreachable.")
-
-# # --- Monitoring Cycle ---
-# def run_monitoring_cycle(urls, keywords):
-#     results = {}
-#     for url in urls:
-#         try:
-#             result = monitor_job(url, keywords)
-#             results[url] = result
-#             if keywords and result.get("found_keywords"):
-#                 st.session_state.keyword_hits[url] = st.session_state.keyword_hits.get(url, 0) + len(result["found_keywords"])
-#             print(f"Monitoring cycle completed for {url}: {result}")
-#         except Exception as e:
-#             print(f"Error in monitoring cycle for {url}: {e}")
-#             results[url] = {"error": str(e), "changes": "", "found_keywords": [], "additional_results": [], "page_title": url, "backlinks": []}
-#     st.session_state.results = results
-#     st.session_state.last_scan_time = time.ctime()
-#     st.rerun()
-last_scan_time = None
-results = {}
-if os.path.exists(LAST_SCAN_TIME_FILE):
-    with open(LAST_SCAN_TIME_FILE, 'r') as f:
-        last_scan_time = f.read()
-if os.path.exists(RESULTS_FILE):
-    with open(RESULTS_FILE, 'r') as f:
-        results = json.load(f)
-# --- Landing Page with Individual Cards ---
-st.header("Monitoring Dashboard")
-if last_scan_time:
-    st.caption(f"Last scanned on: {last_scan_time}")
-else:
-    st.caption("No scans have been run yet.")
-
-if results:
-    for url, result in results.items():
-        alias = next((a for a, u in saved_urls if u == url), url)
-        if result.get("error"):
-            with st.container(border=True):
-                st.error(f"### Error for {alias}\n{result['error']}")
-        else:
-            title = result.get("page_title", alias)
-            display_change_card(result.get("changes", ""), url, title)
-            if keywords:
-                display_keywords_card(result.get("found_keywords", []), url)
-                display_additional_results_card(result.get("additional_results", []), url)
-            display_backlinks_card(result.get("backlinks", []), alias, url)
-else:
-    st.info("Start monitoring or run a manual scan from the sidebar.")
-# Display Status Alerts
-if st.session_state.status_alerts:
-    for url, (alias, status_code, error) in st.session_state.status_alerts.items():
-        display_status_alert(alias, url, status_code, error)
-
-if keywords:
-    display_keyword_hits_card(st.session_state.keyword_hits)
-
-if st.session_state.results:
-    for url, result in st.session_state.results.items():
-        alias = next((a for a, u in saved_urls if u == url), url)
-        if result.get("error"):
-            with st.container(border=True):
-                st.error(f"### Error for {alias}\n{result['error']}")
-        else:
-            title = result.get("page_title", alias)
-            display_change_card(result.get("changes", ""), url, title)
-            if keywords:
-                display_keywords_card(result.get("found_keywords", []), url)
-                display_additional_results_card(result.get("additional_results", []), url)
-            display_backlinks_card(result.get("backlinks", []), alias, url)
-else:
-    st.info("Start monitoring or run a manual scan from the sidebar.")
-
-# Debugging: Display raw results
-with st.expander("Debug: Raw Results"):
-    st.write(st.session_state.results)
\ No newline at end of file
+import streamlit as st
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import sqlite3
+import time
+import logging
+from urllib.parse import urlsplit
+from backend.monitor import run_cycle
+from backend.health import check_url, check_urls, is_reachable
+from backend.normalize import get_filters, set_filters
+from backend.db import (DB_PATH, init_db, get_setting, set_setting, monitored_urls, set_monitored,
+                        latest_scan, result_summaries, result_detail, RESULTS_PAGE_SIZE)
+from backend.daemon import SETTINGS_POLL
+from backend.scheduling import BASE_INTERVAL
+from backend import metrics
+from backend.logs import setup_logging
+
+# Suppress Streamlit warnings
+logging.getLogger('streamlit').setLevel(logging.ERROR)
+
+# Streamlit re-executes this script on every interaction; create the schema once per server
+@st.cache_resource
+def init_backend():
+    setup_logging()
+    init_db()
+
+init_backend()
+
+# Keyed by the newest scan id, so a recorded scan invalidates the pages while reruns from
+# widget interactions are served from the cache
+@st.cache_data(max_entries=32)
+def load_results_page(scan_id, result_filter, page):
+    return result_summaries(result_filter, (page - 1) * RESULTS_PAGE_SIZE, RESULTS_PAGE_SIZE)
+
+# A result row never changes once written
+@st.cache_data(max_entries=256)
+def load_result_detail(result_id):
+    return result_detail(result_id)
+
+FILTER_LABELS = {'all': "All", 'changed': "Changed", 'keywords': "Keyword hits", 'errors': "Errors"}
+
+def run_monitoring_cycle(urls, keywords):
+    # Results are written to the database like the daemon's; the dashboard reads them from there
+    results = run_cycle(urls, keywords)
+    for url, result in results.items():
+        logging.getLogger('backend').info("Monitoring cycle completed for %s: %s", url,
+                                          result["error"] or ("changed" if result["changes"] else "unchanged"))
+
+# --- Page and UI Configuration ---
+st.set_page_config(layout="wide", page_title="Kautilya")
+st.title("KAUTILYA: Web Scanner")
+
+# --- Helper Functions to Display Results ---
+def display_change_card(changes_text, url, title):
+    with st.container(border=True):
+        st.markdown(f"### {title or url}")
+        if not changes_text or not changes_text.strip():
+            st.info("No changes detected in the page content since the last scan.")
+        else:
+            st.code(changes_text, language='diff')
+            st.session_state.alerts.append(f"Changes detected for {title or url}")
+        st.markdown("---")
+
+def display_keywords_card(keywords_found, url):
+    with st.container(border=True):
+        st.markdown(f"### Keywords for {url}")
+        if not keywords_found:
+            st.info("No keywords of interest were found on the page.")
+        else:
+            st.success(f"Found the following keywords: **{', '.join(keywords_found)}**")
+        st.markdown("---")
+
+def display_additional_results_card(additional_results, url):
+    with st.container(border=True):
+        st.markdown(f"### Additional Links for {url}")
+        if not additional_results:
+            st.info("No additional links with keywords found.")
+        else:
+            for result in additional_results:
+                st.write(f"- **{result['url']}**: {', '.join(result['found_keywords'])}")
+        st.markdown("---")
+
+def display_backlinks_card(backlinks, alias, url):
+    with st.container(border=True):
+        st.markdown(f"### Backlinks/Subdomains for {alias or url}")
+        if not backlinks:
+            st.info("No backlinks or subdomains found.")
+        else:
+            for link in backlinks:
+                st.write(f"- {link}")
+        st.markdown("---")
+
+def display_result(row, keywords):
+    if row["error"]:
+        with st.container(border=True):
+            st.error(f"### Error for {row['alias']}\n{row['error']}")
+        return
+    with st.container(border=True):
+        st.markdown(f"### {row['page_title']}")
+        st.caption(f"{row['alias']} ({row['url']}), scanned {row['timestamp']}: "
+                   f"{'changed' if row['changed'] else 'no changes'}")
+        # Diffs and link lists are only loaded when asked for
+        show = st.toggle("Show changes and links", key=f"details_{row['url']}")
+    if keywords:
+        display_keywords_card(row["found_keywords"], row["url"])
+    if show:
+        detail = load_result_detail(row["id"]) or {"changes": "", "additional_results": [], "backlinks": []}
+        display_change_card(detail["changes"], row["url"], row["page_title"])
+        if keywords:
+            display_additional_results_card(detail["additional_results"], row["url"])
+        display_backlinks_card(detail["backlinks"], row["alias"], row["url"])
+
+def display_keyword_hits_card(keyword_hits):
+    with st.container(border=True):
+        st.markdown("### Keyword Hit Analysis")
+        if not keyword_hits:
+            st.info("No keyword hits recorded.")
+        else:
+            for url, hits in keyword_hits.items():
+                st.write(f"- **{url}**: {hits} hits")
+        st.markdown("---")
+
+def display_status_alert(alias, url, status_code, error=None):
+    with st.container(border=True):
+        st.markdown(f"### Status Alert for {alias}")
+        if is_reachable(status_code):
+            st.success(f"URL {url} is reachable (Status: {status_code})")
+        else:
+            st.error(f"URL {url} returned status {status_code}: {error or 'Unknown error'}")
+        st.markdown("---")
+
+# --- Database and URL Functions ---
+def check_url_status(url):
+    return check_url(url)
+
+def preflight(urls, aliases):
+    # All URLs are probed at once; those checked or scanned within HEALTH_TTL are not probed again
+    statuses = check_urls(urls)
+    for url, (status_code, error) in statuses.items():
+        st.session_state.status_alerts[url] = (aliases.get(url, url), status_code, error)
+    return all(is_reachable(status_code) for status_code, _ in statuses.values())
+
+def is_valid_url(url):
+    if not (url.endswith('.onion') or url.startswith(('http://', 'https://'))):
+        return False, "Invalid URL. Must be a .onion URL or start with http:// or https://"
+    status_code, error = check_url_status(url)
+    if not is_reachable(status_code):
+        return False, f"URL is unreachable (Status: {status_code or 'N/A'}, Error: {error or 'Unknown'})"
+    return True, None
+
+def save_url(alias, url):
+    valid, error = is_valid_url(url)
+    if not valid:
+        st.error(error)
+        return False
+    try:
+        with sqlite3.connect(DB_PATH) as conn:
+            c = conn.cursor()
+            # Upsert: re-saving a URL renames it without dropping its id or its monitored flag
+            c.execute("INSERT INTO urls (alias, url) VALUES (?, ?) ON CONFLICT(url) DO UPDATE SET alias = excluded.alias",
+                      (alias, url))
+            conn.commit()
+        # Aliases and the saved URL set are part of the cached dashboard pages
+        load_results_page.clear()
+        return True
+    except Exception as e:
+        st.error(f"Failed to save URL: {e}")
+        return False
+
+def load_urls():
+    try:
+        with sqlite3.connect(DB_PATH) as conn:
+            c = conn.cursor()
+            c.execute("SELECT alias, url FROM urls")
+            return c.fetchall()
+    except Exception as e:
+        st.error(f"Failed to load URLs: {e}")
+        return []
+
+def delete_url(url):
+    try:
+        with sqlite3.connect(DB_PATH) as conn:
+            c = conn.cursor()
+            c.execute("DELETE FROM urls WHERE url = ?", (url,))
+            conn.commit()
+        load_results_page.clear()
+    except Exception as e:
+        st.error(f"Failed to delete URL: {e}")
+
+# --- Main Application Logic ---
+if 'alerts' not in st.session_state:
+    st.session_state.alerts = []
+if 'keyword_hits' not in st.session_state:
+    st.session_state.keyword_hits = {}
+if 'status_alerts' not in st.session_state:
+    st.session_state.status_alerts = {}
+
+# --- Sidebar for Configuration ---
+with st.sidebar:
+    st.header("Scan Configuration")
+    st.warning("Ensure Tor Browser is running (socks5h://127.0.0.1:9150) for .onion URLs.")
+
+    # URL and Alias Input
+    st.subheader("Add New URL")
+    new_url = st.text_input("Enter URL", placeholder="http://example.onion or https://example.com")
+    new_alias = st.text_input("Enter Alias for URL", placeholder="e.g., Forum 1")
+    if st.button("Add URL"):
+        if new_url and new_alias:
+            if save_url(new_alias, new_url):
+                st.success(f"Added {new_url} as {new_alias}")
+        else:
+            st.error("Please provide both URL and alias.")
+
+    # URL Selection
+    st.subheader("Select URLs to Monitor")
+    saved_urls = load_urls()
+    aliases = {url: alias for alias, url in saved_urls}
+    selected_urls = []
+    if saved_urls:
+        # Preselect what the daemon is already monitoring
+        monitored = set(monitored_urls())
+        selected_urls = st.multiselect("Choose URLs",
+                                      options=[f"{alias} ({url})" for alias, url in saved_urls],
+                                      default=[f"{alias} ({url})" for alias, url in saved_urls if url in monitored])
+        selected_urls = [url for alias, url in saved_urls if f"{alias} ({url})" in selected_urls]
+
+    # Display Selected URLs
+    st.subheader("Monitored URLs")
+    if selected_urls:
+        for alias, url in saved_urls:
+            if url in selected_urls:
+                with st.container():
+                    st.write(f"**{alias}**: {url}")
+                    col1, col2 = st.columns([1, 1])
+                    with col1:
+                        if st.button(f"Edit {alias}", key=f"edit_{url}"):
+                            st.session_state[f"editing_{url}"] = True
+                    with col2:
+                        if st.button(f"Delete {alias}", key=f"delete_{url}"):
+                            delete_url(url)
+                            st.rerun()
+                    if st.session_state.get(f"editing_{url}", False):
+                        new_alias = st.text_input(f"New alias for {url}", value=alias, key=f"alias_{url}")
+                        new_url = st.text_input(f"New URL for {alias}", value=url, key=f"url_{url}")
+                        if st.button(f"Save Changes for {alias}", key=f"save_{url}"):
+                            if save_url(new_alias, new_url):
+                                st.session_state[f"editing_{url}"] = False
+                                st.rerun()
+    else:
+        st.info("No URLs selected for monitoring.")
+
+    # Keyword Input
+    st.subheader("Keywords to Monitor (Optional)")
+    keywords_input = st.text_input("Enter keywords (comma-separated, leave blank for general monitoring)", placeholder="keyword1, keyword2")
+    keywords = [k.strip() for k in keywords_input.split(",") if k.strip()]
+
+    # Text removed before diffing and keyword matching, so rotating tokens, timestamps and ads
+    # do not show up as changes
+    with st.expander("Noise Filters"):
+        filters = get_filters()
+        sites = ['*'] + sorted({urlsplit(url).netloc.lower() for _, url in saved_urls})
+        site = st.selectbox("Site", sites, format_func=lambda s: "All sites" if s == '*' else s)
+        rules = filters.get(site, {})
+        ignore_input = st.text_area("Ignore elements (CSS selectors, one per line)",
+                                    value="\n".join(rules.get("ignore", [])), placeholder=".ads\n#footer")
+        mask_input = st.text_area("Mask text (regular expressions, one per line)",
+                                  value="\n".join(rules.get("mask", [])), placeholder=r"Visitors: \d+")
+        st.caption("Scripts, styles, timestamps, UUIDs and long hex tokens are always filtered.")
+        if st.button("Save Filters"):
+            try:
+                set_filters(site, ignore_input.splitlines(), mask_input.splitlines())
+                st.success("Filters saved; they apply from the next scan.")
+            except ValueError as e:
+                st.error(str(e))
+
+    # Monitoring Controls
+    if st.button("Start Automated Monitoring", type="primary"):
+        if not selected_urls:
+            st.error("Please select at least one URL.")
+        else:
+            if preflight(selected_urls, aliases):
+                # The daemon (python -m backend.daemon) picks these settings up on its next poll
+                try:
+                    set_monitored(selected_urls)
+                    set_setting('keywords', keywords)
+                    set_setting('monitoring_enabled', True)
+                    interval = get_setting('interval', BASE_INTERVAL)
+                    st.success(f"Automated monitoring started (every {interval // 60} minutes at first, "
+                               "then adapted to how often each site changes).")
+                except Exception as e:
+                    st.error(f"Failed to start monitoring: {e}")
+            else:
+                st.error("Cannot start monitoring: Some URLs are unreachable.")
+
+    if st.button("Stop Monitoring"):
+        if get_setting('monitoring_enabled', False):
+            try:
+                set_setting('monitoring_enabled', False)
+                st.success("Monitoring stopped.")
+            except Exception as e:
+                st.error(f"Failed to stop monitoring: {e}")
+        else:
+            st.warning("No monitoring process is running.")
+
+    # The scheduler runs in its own process, independent of this browser session
+    heartbeat = get_setting('daemon_heartbeat')
+    if heartbeat and heartbeat["state"] != 'stopped' and time.time() - heartbeat["time"] < 3 * SETTINGS_POLL:
+        st.caption(f"Monitoring daemon: {heartbeat['state']}")
+    else:
+        st.warning("Monitoring daemon is not running. Start it with: python -m backend.daemon")
+
+    if st.button("Manual Scan", type="secondary"):
+        if not selected_urls:
+            st.error("Please select at least one URL.")
+        else:
+            if preflight(selected_urls, aliases):
+                with st.spinner("Running manual scan..."):
+                    try:
+                        run_monitoring_cycle(selected_urls, keywords)
+                    except Exception as e:
+                        st.error(f"Manual scan failed: {e}")
+            else:
+                st.error("Cannot run scan: Some URLs are unreachable.")
+
+# # --- Monitoring Cycle ---
+# def run_monitoring_cycle(urls, keywords):
+#     results = {}
+#     for url in urls:
+#         try:
+#             result = monitor_job(url, keywords)
+#             results[url] = result
+#             if keywords and result.get("found_keywords"):
+#                 st.session_state.keyword_hits[url] = st.session_state.keyword_hits.get(url, 0) + len(result["found_keywords"])
+#             print(f"Monitoring cycle completed for {url}: {result}")
+#         except Exception as e:
+#             print(f"Error in monitoring cycle for {url}: {e}")
+#             results[url] = {"error": str(e), "changes": "", "found_keywords": [], "additional_results": [], "page_title": url, "backlinks": []}
+#     st.session_state.results = results
+#     st.session_state.last_scan_time = time.ctime()
+#     st.rerun()
+scan_id, last_scan_time = latest_scan()
+# --- Landing Page with Individual Cards ---
+st.header("Monitoring Dashboard")
+if last_scan_time:
+    st.caption(f"Last scanned on: {last_scan_time}")
+else:
+    st.caption("No scans have been run yet.")
+
+# Only one page of results is queried and rendered per run, however many URLs are monitored
+filter_col, page_col = st.columns([3, 1])
+with filter_col:
+    result_filter = st.radio("Show", list(FILTER_LABELS), format_func=FILTER_LABELS.get, horizontal=True,
+                             key="result_filter", on_change=lambda: st.session_state.update(results_page=1))
+page = st.session_state.get("results_page", 1)
+total, page_rows = load_results_page(scan_id, result_filter, page)
+pages = max(1, -(-total // RESULTS_PAGE_SIZE))
+if page > pages:
+    # Fewer results than when the page was picked
+    page = st.session_state.results_page = pages
+    total, page_rows = load_results_page(scan_id, result_filter, page)
+with page_col:
+    st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, key="results_page")
+
+if page_rows:
+    st.caption(f"{total} URLs")
+    for row in page_rows:
+        display_result(row, keywords)
+elif result_filter != 'all':
+    st.info("No results match this filter.")
+else:
+    st.info("Start monitoring or run a manual scan from the sidebar.")
+# Display Status Alerts
+if st.session_state.status_alerts:
+    for url, (alias, status_code, error) in st.session_state.status_alerts.items():
+        display_status_alert(alias, url, status_code, error)
+
+if keywords:
+    display_keyword_hits_card(st.session_state.keyword_hits)
+
+# Cycle timings recorded by whichever process ran the scans (daemon, CLI or this UI)
+with st.expander("Performance"):
+    cycles = metrics.recent_cycles(20)
+    if cycles:
+        st.dataframe([{
+            "started": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(cycle["started_at"])),
+            "duration (s)": round(cycle["duration"] or 0, 2),
+            "targets": len(cycle["targets"]),
+            "outcomes": ", ".join(f"{k}: {v}" for k, v in cycle["outcomes"].items()),
+            "bytes": cycle["counters"].get("bytes_fetched", 0),
+            "retries": cycle["counters"].get("retries", 0),
+        } for cycle in cycles])
+        latest = cycles[0]
+        st.caption("Latest cycle: seconds per stage, summed over its targets")
+        st.bar_chart({stage: round(seconds, 3) for stage, seconds in sorted(latest["stages"].items())})
+        st.dataframe([{
+            "url": target["url"],
+            "outcome": target["outcome"],
+            "duration (s)": round(target["duration"] or 0, 2),
+            **{stage: round(seconds, 3) for stage, seconds in target["stages"].items()},
+        } for target in latest["targets"]])
+    else:
+        st.caption("No cycles recorded yet.")
+
+# Debugging: Display raw results
+with st.expander("Debug: Raw Results"):
+    st.write(page_rows)
\ No newline at end of file
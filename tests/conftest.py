@@ -0,0 +1,13 @@
+import pytest
+
+from backend import archive, db
+
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    # A fresh urls.db and blob store per test
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(db, 'DB_PATH', str(tmp_path / 'urls.db'))
+    monkeypatch.setattr(db, '_initialized', False)
+    monkeypatch.setattr(archive, 'BLOB_DIR', str(tmp_path / 'archive' / 'blobs'))
+    return tmp_path
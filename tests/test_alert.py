@@ -0,0 +1,151 @@
+import socket
+import threading
+import time
+
+import pytest
+
+# Test-only dependency (requirements-dev.txt)
+Controller = pytest.importorskip("aiosmtpd.controller").Controller
+
+from backend import alert, db
+
+
+class Recorder:
+    # aiosmtpd handler keeping (peer, subject) of every message received
+    def __init__(self):
+        self.messages = []
+
+    async def handle_DATA(self, server, session, envelope):
+        body = envelope.content.decode('utf-8', 'replace')
+        subject = next(line[9:] for line in body.splitlines() if line.startswith('Subject: '))
+        self.messages.append((session.peer, subject))
+        return '250 OK'
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+@pytest.fixture
+def queue(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(db, 'DB_PATH', str(tmp_path / 'urls.db'))
+    monkeypatch.setattr(db, '_initialized', False)
+    monkeypatch.setattr(alert, 'FAILED_ALERTS_FILE', str(tmp_path / 'failed_alerts.txt'))
+    monkeypatch.setattr(alert, 'SMTP_HOST', '127.0.0.1')
+    monkeypatch.setattr(alert, 'SMTP_PORT', free_port())
+    monkeypatch.setattr(alert, 'SMTP_STARTTLS', False)
+    monkeypatch.setattr(alert, 'SMTP_USER', None)
+    # release_held wakes the module's dispatcher; tests drive their own
+    monkeypatch.setattr(alert, 'dispatcher', alert.AlertDispatcher())
+    yield
+    alert.dispatcher.stop()
+
+
+@pytest.fixture
+def smtp(queue):
+    recorder = Recorder()
+    controller = Controller(recorder, hostname='127.0.0.1', port=alert.SMTP_PORT)
+    controller.start()
+    yield recorder
+    controller.stop()
+
+
+def statuses():
+    with db.connect() as conn:
+        return [row[0] for row in conn.execute("SELECT status FROM alert_queue ORDER BY id")]
+
+
+def test_delivers_queued_alerts_over_one_connection(smtp):
+    for n in range(3):
+        alert.enqueue_alert(f'http://site{n}.onion', f'alert {n}', 'body')
+    dispatcher = alert.AlertDispatcher()
+    try:
+        assert dispatcher.send_pending() == 3
+    finally:
+        dispatcher.stop()
+    assert [subject for _, subject in smtp.messages] == ['alert 0', 'alert 1', 'alert 2']
+    assert len({peer for peer, _ in smtp.messages}) == 1
+    assert statuses() == ['sent'] * 3
+
+
+def test_retries_after_outage(queue):
+    alert.enqueue_alert('http://site.onion', 'alert', 'body')
+    dispatcher = alert.AlertDispatcher()
+    try:
+        # Nothing listens yet
+        assert dispatcher.send_pending() == 0
+        with db.connect() as conn:
+            status, attempts, next_attempt = conn.execute(
+                "SELECT status, attempts, next_attempt FROM alert_queue"
+            ).fetchone()
+        assert (status, attempts) == ('pending', 1)
+        assert next_attempt > time.time()
+        # Not due yet, so not retried
+        assert dispatcher.send_pending() == 0
+
+        recorder = Recorder()
+        controller = Controller(recorder, hostname='127.0.0.1', port=alert.SMTP_PORT)
+        controller.start()
+        try:
+            with db.connect() as conn:
+                conn.execute("UPDATE alert_queue SET next_attempt = ?", (time.time(),))
+                conn.commit()
+            assert dispatcher.send_pending() == 1
+        finally:
+            controller.stop()
+    finally:
+        dispatcher.stop()
+    assert [subject for _, subject in recorder.messages] == ['alert']
+    assert statuses() == ['sent']
+
+
+def test_concurrent_dispatchers_send_each_alert_once(smtp):
+    for n in range(20):
+        alert.enqueue_alert(f'http://site{n}.onion', f'alert {n}', 'body')
+    dispatchers = [alert.AlertDispatcher() for _ in range(3)]
+    threads = [threading.Thread(target=d.send_pending) for d in dispatchers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    for d in dispatchers:
+        d.stop()
+    assert sorted(subject for _, subject in smtp.messages) == sorted(f'alert {n}' for n in range(20))
+    assert statuses() == ['sent'] * 20
+
+
+def test_held_alerts_go_out_as_one_digest(smtp):
+    alert.enqueue_alert('http://a.onion', 'alert a', 'body a', hold=True)
+    alert.enqueue_alert('http://b.onion', 'alert b', 'body b', hold=True)
+    assert alert.release_held() is not None
+    # Released once: a second release finds nothing held
+    assert alert.release_held() is None
+    deadline = time.monotonic() + 10
+    while not smtp.messages and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert [subject for _, subject in smtp.messages] == ['Dark Web Alert digest: 2 alerts for 2 URLs']
+    assert statuses() == ['digested', 'digested', 'sent']
+
+
+def test_digest_release_is_not_duplicated(queue):
+    for n in range(5):
+        alert.enqueue_alert(f'http://site{n}.onion', f'alert {n}', 'body', hold=True)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(alert.release_held())) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len([digest for digest in results if digest is not None]) == 1
+    assert statuses().count('digested') == 5
+
+
+def test_flush_sends_everything_queued(smtp):
+    alert.enqueue_alert('http://a.onion', 'alert a', 'body a')
+    alert.enqueue_alert('http://b.onion', 'alert b', 'body b', hold=True)
+    alert.flush()
+    assert [subject for _, subject in smtp.messages] == ['alert a', 'Dark Web Alert digest: 1 alerts for 1 URLs']
+    assert statuses() == ['sent', 'digested', 'sent']
@@ -0,0 +1,77 @@
+import random
+
+from backend import diff
+from backend.diff import diff_blocks, myers_diff, difflib_diff
+
+
+def apply(lines, old):
+    # Rebuilds the new text from a unified diff of old
+    new, position = [], 0
+    for line in lines[2:]:
+        if line.startswith('@@'):
+            start = int(line.split()[1].split(',')[0][1:])
+            count = int(line.split()[1].split(',')[1])
+            start = start - 1 if count else start
+            new += old[position:start]
+            position = start
+        elif line[0] == ' ':
+            new.append(line[1:-1])
+            position += 1
+        elif line[0] == '-':
+            position += 1
+        elif line[0] == '+':
+            new.append(line[1:-1])
+    return new + old[position:]
+
+
+def edit_counts(lines):
+    return sum(1 for line in lines[2:] if line[0] in '+-' and not line.startswith('...'))
+
+
+def test_myers_matches_difflib_on_random_edits():
+    rng = random.Random(7)
+    for _ in range(200):
+        old = [rng.choice('abcdef') for _ in range(rng.randrange(0, 40))]
+        new = list(old)
+        for _ in range(rng.randrange(1, 6)):
+            position = rng.randrange(0, len(new) + 1)
+            if new and rng.random() < 0.5:
+                del new[min(position, len(new) - 1)]
+            else:
+                new.insert(position, rng.choice('abcdefg'))
+        lines = myers_diff(old, new)
+        assert apply(lines, old) == new
+        # A shortest edit script is never longer than difflib's
+        assert edit_counts(lines) <= edit_counts(difflib_diff(old, new))
+
+
+def test_budget_falls_back_to_an_approximate_diff():
+    old = [f'line {n}' for n in range(300)]
+    new = [f'other {n}' for n in range(300)]
+    lines = myers_diff(old, new, max_edits=10)
+    assert lines[2].startswith('... approximate diff')
+    assert sum(1 for line in lines if line.startswith('+')) == 300 + 1
+
+
+def test_change_past_max_blocks_is_reported(monkeypatch):
+    monkeypatch.setattr(diff, 'MAX_BLOCKS', 100)
+    old = [f'line {n}' for n in range(500)]
+    new = old[:400] + ['changed'] + old[401:]
+    text = diff_blocks(old, new, engine='difflib')
+    assert '-line 400\n+changed\n' in text
+
+
+def test_moved_lines_are_not_reported_as_unchanged():
+    # Too many moves for the edit budget, and the approximate diff sees no line added or removed
+    old = [f'line {n}' for n in range(3000)]
+    new = list(reversed(old))
+    assert 'moved or repeated' in diff_blocks(old, new)
+    assert diff_blocks(old, list(old)) == ''
+
+
+def test_long_diffs_are_cut():
+    old = [f'line {n}' for n in range(100)]
+    new = [f'new {n}' for n in range(100)]
+    text = diff_blocks(old, new, max_lines=20)
+    assert len(text.splitlines()) == 21
+    assert text.endswith('more lines)\n')
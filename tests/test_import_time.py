@@ -0,0 +1,18 @@
+import importlib.util
+import os
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+def load_bench_import():
+    spec = importlib.util.spec_from_file_location('bench_import', os.path.join(ROOT, 'benchmarks', 'bench_import.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_scan_entry_points_import_lazily_within_budget(capsys):
+    # Fails when a heavy dependency (bs4, lxml, aiohttp, ...) is imported eagerly again
+    # or the import of the entry points exceeds the budget; the report says which
+    status = load_bench_import().main()
+    assert status == 0, capsys.readouterr().out
@@ -0,0 +1,38 @@
+import random
+
+from backend import keywords
+from backend.keywords import KeywordMatcher
+
+
+def brute_force(words, text):
+    return sorted({(word, start, start + len(word)) for word in words
+                   for start in range(len(text)) if text.lower().startswith(word.lower(), start)})
+
+
+def test_matches_every_occurrence_including_overlaps():
+    words = ['he', 'she', 'his', 'hers', 'Ushers']
+    text = 'ushers and HIS sheep hershey'
+    assert sorted(KeywordMatcher(words).matches(text)) == brute_force(words, text)
+
+
+def test_agrees_with_brute_force_on_random_text():
+    rng = random.Random(3)
+    for _ in range(50):
+        words = list({''.join(rng.choice('abc') for _ in range(rng.randrange(1, 5))) for _ in range(8)})
+        text = ''.join(rng.choice('abcd ') for _ in range(200))
+        assert sorted(KeywordMatcher(words).matches(text)) == brute_force(words, text)
+
+
+def test_whole_word():
+    matcher = KeywordMatcher(['cat', 'cat food'], whole_word=True)
+    assert matcher.find('concatenate the cat food') == ['cat', 'cat food']
+    assert matcher.find('concatenate') == []
+
+
+def test_automaton_and_direct_scan_agree(monkeypatch):
+    words = [f'w{n}' for n in range(300)] + ['leak', 'Dump']
+    text = 'A database dump and a LEAK of w12 and w299'
+    automaton = KeywordMatcher(words).find(text)
+    monkeypatch.setattr(keywords, 'DIRECT_SCAN_LIMIT', 1000)
+    assert sorted(KeywordMatcher(words).find(text)) == sorted(automaton)
+    assert sorted(automaton) == ['Dump', 'leak', 'w1', 'w12', 'w2', 'w29', 'w299']
@@ -0,0 +1,81 @@
+import random
+
+from backend import db
+from backend.diff import diff_blocks
+from backend.mirrors import (simhash, distance, record_fingerprint, representatives, claim_alert,
+                             change_digest, MIRROR_DISTANCE)
+
+
+def page_lines(seed=1, words=800):
+    rng = random.Random(seed)
+    vocabulary = [''.join(rng.choice('abcdefghijklmnop') for _ in range(6)) for _ in range(2000)]
+    text = [rng.choice(vocabulary) for _ in range(words)]
+    return [' '.join(text[i:i + 20]) for i in range(0, words, 20)]
+
+
+def schedule(urls):
+    with db.connect() as conn:
+        conn.executemany("INSERT INTO url_schedule (url, interval, jitter, next_due) VALUES (?, 600, 0, 0)",
+                         [(url,) for url in urls])
+        conn.commit()
+
+
+def test_mirrors_are_grouped_and_unrelated_pages_are_not(database):
+    lines = page_lines()
+    pages = {
+        'http://a.onion/': ['Mirror a'] + lines,
+        'http://b.onion/': ['Mirror b'] + lines,
+        'http://other.onion/': page_lines(seed=2),
+    }
+    schedule(pages)
+    for url, text in pages.items():
+        record_fingerprint(url, simhash(' '.join(text)))
+    groups = representatives(list(pages))
+    assert groups['http://a.onion/'] == groups['http://b.onion/'] == 'http://a.onion/'
+    assert groups['http://other.onion/'] == 'http://other.onion/'
+
+
+def test_pages_with_little_text_are_never_mirrors(database):
+    schedule(['http://a.onion/', 'http://b.onion/'])
+    for url in ('http://a.onion/', 'http://b.onion/'):
+        assert simhash('403 Forbidden') is None
+        record_fingerprint(url, simhash('403 Forbidden'))
+    assert representatives(['http://a.onion/', 'http://b.onion/']) == {
+        'http://a.onion/': 'http://a.onion/', 'http://b.onion/': 'http://b.onion/'}
+    assert claim_alert('http://a.onion/', None, change_digest(''), []) is None
+    assert claim_alert('http://b.onion/', None, change_digest(''), []) is None
+
+
+def test_new_change_on_a_mirror_is_not_collapsed_into_an_earlier_alert(database):
+    old = page_lines()
+    # Mirror A alerted on content C
+    content = old + ['Forum index updated']
+    a_fingerprint = simhash(' '.join(content))
+    record_fingerprint('http://a.onion/', a_fingerprint)
+    a_change = change_digest(diff_blocks(old, content))
+    assert claim_alert('http://a.onion/', a_fingerprint, a_change, ['dump']) is None
+
+    # Mirror B then shows a new listing on C; the page SimHash hardly moves
+    listing = content + ['database dump for sale']
+    b_fingerprint = simhash(' '.join(listing))
+    record_fingerprint('http://b.onion/', b_fingerprint)
+    assert distance(a_fingerprint, b_fingerprint) <= MIRROR_DISTANCE
+    b_change = change_digest(diff_blocks(content, listing))
+    assert claim_alert('http://b.onion/', b_fingerprint, b_change, ['dump']) is None
+
+
+def test_same_change_on_a_mirror_is_collapsed(database):
+    old = page_lines()
+    new = old + ['database dump for sale']
+    fingerprints = {}
+    for url, name in (('http://a.onion/', 'Mirror a'), ('http://b.onion/', 'Mirror b')):
+        fingerprints[url] = simhash(' '.join([name] + new))
+        record_fingerprint(url, fingerprints[url])
+    # Each mirror diffs against its own history, so the hunk positions differ but the change does not
+    a_change = change_digest(diff_blocks(['Mirror a'] + old, ['Mirror a'] + new))
+    b_change = change_digest(diff_blocks(old + ['Mirror b'], new + ['Mirror b']))
+    assert a_change == b_change
+    assert claim_alert('http://a.onion/', fingerprints['http://a.onion/'], a_change, ['dump']) is None
+    assert claim_alert('http://b.onion/', fingerprints['http://b.onion/'], b_change, ['dump']) == 'http://a.onion/'
+    # More keywords than the earlier alert had is news
+    assert claim_alert('http://b.onion/', fingerprints['http://b.onion/'], b_change, ['dump', 'sale']) is None
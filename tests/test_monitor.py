@@ -0,0 +1,142 @@
+import asyncio
+import functools
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import pytest
+
+from backend import db, export, monitor, pdf_report, scraper, workers
+from backend.breaker import CircuitBreaker
+from backend.cache import link_cache
+from backend.crawler import crawl
+from backend.daemon import MonitorDaemon
+from backend.engine import FetchEngine
+from backend.scheduling import ensure_schedules
+
+
+class Site:
+    # Pages served by a local HTTP server, editable between cycles
+    def __init__(self):
+        self.pages = {}
+        # path -> (status, headers) answered instead of the page
+        self.errors = {}
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path in site.errors:
+                    status, headers = site.errors[self.path]
+                    self.send_response(status)
+                    for name, value in headers.items():
+                        self.send_header(name, value)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                body = site.pages.get(self.path)
+                if body is None:
+                    self.send_error(404)
+                    return
+                data = body.encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/html')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.base = f'http://127.0.0.1:{self.server.server_address[1]}'
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+
+@pytest.fixture
+def site(database, monkeypatch):
+    monkeypatch.setattr(workers, 'WORKER_PROCESSES', 0)
+    monkeypatch.setattr(pdf_report, 'CONSOLIDATED_REPORTS', False)
+    monkeypatch.setattr(export, 'LOG_FILE', str(database / 'log.csv'))
+    monkeypatch.setattr(monitor, 'DATA_DIR', str(database / 'store'))
+    monkeypatch.setattr(monitor, 'submit_pdf_report', lambda *args: None)
+    monkeypatch.setattr(monitor, 'release_held', lambda: None)
+    # A breaker of its own, so hosts failed by other tests are not skipped
+    monkeypatch.setattr(scraper, 'breaker', CircuitBreaker(threshold=1))
+    # The crawler only follows .onion links; every crawl fetches them again
+    monkeypatch.setattr(monitor, 'crawl', functools.partial(crawl, link_filter=lambda link: True))
+    monkeypatch.setattr(link_cache, 'ttl', -1)
+    site = Site()
+    yield site
+    site.server.shutdown()
+
+
+@pytest.fixture
+def alerts(monkeypatch):
+    sent = []
+    monkeypatch.setattr(monitor, 'alert_user', lambda url, keywords, message: sent.append(message))
+    return sent
+
+
+def test_unchanged_page_still_crawls_its_links(site, alerts):
+    site.pages['/'] = '<p>Index</p><a href="/post">post</a>'
+    site.pages['/post'] = '<p>Nothing yet</p>'
+    url = site.base + '/'
+
+    first = monitor.run_cycle([url], ['leak'])[url]
+    assert first['backlinks'] == [site.base + '/post'] and not first['unchanged']
+    # The first scan alerts on the whole page as new
+    assert len(alerts) == 1
+
+    # The index is unchanged, but the linked page now has a keyword
+    site.pages['/post'] = '<p>New leak posted</p>'
+    second = monitor.run_cycle([url], ['leak'])[url]
+    assert second['unchanged']
+    assert second['backlinks'] == [site.base + '/post']
+    assert second['additional_results'] == [{'url': site.base + '/post', 'found_keywords': ['leak']}]
+    assert len(alerts) == 2
+
+    # The same hit is not news on the next unchanged scan
+    third = monitor.run_cycle([url], ['leak'])[url]
+    assert third['unchanged'] and third['additional_results'] == second['additional_results']
+    assert len(alerts) == 2
+
+
+def results_of(url):
+    with db.connect() as conn:
+        rows = conn.execute("SELECT id, error FROM monitoring_results WHERE url = ? ORDER BY id", (url,)).fetchall()
+        last = conn.execute("SELECT last_result_id FROM url_stats WHERE url = ?", (url,)).fetchone()
+    return rows, last[0] if last else None
+
+
+def test_skipped_host_is_not_recorded_as_a_scan(site, alerts):
+    site.pages['/'] = '<p>Index</p>'
+    url = site.base + '/'
+    monitor.run_cycle([url], [])
+    before = results_of(url)
+    assert len(before[0]) == 1 and before[0][0][1] is None
+
+    scraper.breaker.record_failure(url)
+    result = monitor.run_cycle([url], [])[url]
+    assert result['retry_after'] > 0
+    # Still one row, and the dashboard still points at the good scan
+    assert results_of(url) == before
+
+
+def test_transient_error_requeues_through_the_schedule(site, alerts):
+    url = site.base + '/'
+    site.errors['/'] = (503, {'Retry-After': '120'})
+    ensure_schedules([url])
+
+    async def scan():
+        async with FetchEngine(defer_retries=True) as engine:
+            await MonitorDaemon([url], [])._scan(engine, [url], [])
+
+    now = time.time()
+    asyncio.run(scan())
+    with db.connect() as conn:
+        failures, next_due = conn.execute("SELECT failures, next_due FROM url_schedule WHERE url = ?",
+                                          (url,)).fetchone()
+    assert failures == 1
+    # Retry-After is honoured, jitter aside
+    assert next_due >= now + 120 * 0.9
+    assert results_of(url) == ([], None)
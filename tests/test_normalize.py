@@ -0,0 +1,47 @@
+import pytest
+
+from backend import normalize
+from backend.diff import diff_blocks
+from backend.monitor import detect_keywords
+from backend.normalize import Normalizer
+from backend.page import Page
+
+HASH = '9f86d081884c7d659a2feaa0c55ad015a3bf4f1b2b0b822cd15d6c15b0f00a08'
+
+
+def test_keywords_match_text_the_diff_masks(database):
+    page = Page(f'<p>Dump {HASH} posted at 12:30</p><script>var x = "leak";</script>', 'http://a.onion/')
+    assert page.blocks == [f'Dump {HASH} posted at ***']
+    assert detect_keywords(page, [HASH, '12:30', 'leak']) == [HASH, '12:30']
+
+
+def test_hashes_are_content_but_session_tokens_are_not(database):
+    old = Page(f'<p>tx {HASH}</p><p>csrf_token: {"ab" * 16}</p>')
+    new = Page(f'<p>tx {HASH[::-1]}</p><p>csrf_token: {"cd" * 16}</p>')
+    assert new.blocks[1] == 'csrf_token: ***'
+    diff = diff_blocks(old.blocks, new.blocks)
+    assert f'+tx {HASH[::-1]}' in diff
+    assert '+csrf' not in diff
+
+
+def test_noise_elements_and_whitespace(database):
+    page = Page('<head><title>T</title><style>p {}</style></head><body><p>Hello \t  world\nagain</p>'
+                '<noscript>enable js</noscript><!-- comment --><p>  </p><div>Bye</div></body>')
+    assert page.lines == ['T', 'Hello world', 'again', 'Bye']
+
+
+def test_site_rules_apply_to_their_site_only(database):
+    normalize.set_filters('a.onion', ignore=['.ads'], mask=[r'Visitors: \d+'])
+    html = '<p>Post</p><div class="ads">Buy now</div><p>Visitors: 1234</p>'
+    assert Page(html, 'http://a.onion/page').blocks == ['Post', '***']
+    assert Page(html, 'http://b.onion/page').blocks == ['Post', 'Buy now', 'Visitors: 1234']
+    with pytest.raises(ValueError):
+        normalize.set_filters('a.onion', mask=['('])
+
+
+def test_clean_is_idempotent():
+    normalizer = Normalizer()
+    line = 'Updated 2026-01-02 10:30 by 550e8400-e29b-41d4-a716-446655440000, 5 minutes ago'
+    once = normalizer.clean(line)
+    assert once == 'Updated *** by ***, ***'
+    assert normalizer.clean(once) == once
@@ -0,0 +1,33 @@
+from backend.page import Page, SectionParser
+
+
+def feed_in_chunks(parser, html, size=7):
+    # Returns how much of html the parser read before it had the section
+    for start in range(0, len(html), size):
+        if parser.feed(html[start:start + size]):
+            return start + size
+    parser.close()
+    return len(html)
+
+
+def test_section_is_cut_out_without_reading_the_rest(database):
+    html = ('<html><body><div id="nav"><p>Menu</p></div>'
+            '<div id="main"><p>Post <b>one</b></p><div><p>nested</p></div></div>'
+            + '<p>footer</p>' * 1000 + '</body></html>')
+    parser = SectionParser('main')
+    read = feed_in_chunks(parser, html)
+    assert parser.html == '<div id="main"><p>Post <b>one</b></p><div><p>nested</p></div></div>'
+    assert read < len(html) // 10
+    assert Page(parser.html).blocks == ['Post', 'one', 'nested']
+
+
+def test_missing_section():
+    parser = SectionParser('main')
+    feed_in_chunks(parser, '<html><body><p>No such element</p></body></html>')
+    assert parser.html is None
+
+
+def test_section_at_the_end_of_an_unclosed_document():
+    parser = SectionParser('main')
+    feed_in_chunks(parser, '<html><body><p>intro</p><div id="main"><p>last')
+    assert parser.close() == '<div id="main"><p>last</p></div>'
@@ -0,0 +1,64 @@
+import pytest
+
+from backend import db, scheduling
+from backend.scheduling import ensure_schedules, configure, due_targets, record_outcomes, next_due_time
+
+
+@pytest.fixture
+def schedule(database, monkeypatch):
+    monkeypatch.setattr(scheduling, 'JITTER', 0)
+    return database
+
+
+def row(url):
+    with db.connect() as conn:
+        return conn.execute("SELECT interval, failures, next_due FROM url_schedule WHERE url = ?",
+                            (url,)).fetchone()
+
+
+def test_new_targets_are_due_by_priority_then_lateness(schedule):
+    ensure_schedules(['http://a.onion', 'http://b.onion'], now=100)
+    ensure_schedules(['http://c.onion'], now=50)
+    configure('http://b.onion', priority=5)
+    assert due_targets(['http://a.onion', 'http://b.onion', 'http://c.onion'], now=100) == [
+        'http://b.onion', 'http://c.onion', 'http://a.onion']
+    assert due_targets(['http://a.onion'], now=100) == ['http://a.onion']
+    assert due_targets(['http://a.onion'], now=99) == []
+    assert next_due_time(['http://a.onion', 'http://c.onion']) == 50
+
+
+def test_interval_adapts_to_changes(schedule):
+    url = 'http://a.onion'
+    ensure_schedules([url], base_interval=1000, now=0)
+    record_outcomes({url: {"changes": "", "error": None}}, now=0)
+    assert row(url) == (1500, 0, 1500)
+    record_outcomes({url: {"changes": "diff", "error": None}}, now=0)
+    assert row(url) == (750, 0, 750)
+    for _ in range(5):
+        record_outcomes({url: {"changes": "diff", "error": None}}, now=0)
+    assert row(url)[0] == scheduling.MIN_INTERVAL
+
+
+def test_errors_back_off_without_losing_the_interval(schedule):
+    url = 'http://a.onion'
+    ensure_schedules([url], base_interval=1000, now=0)
+    record_outcomes({url: {"error": "down"}}, now=0)
+    record_outcomes({url: {"error": "down"}}, now=0)
+    assert row(url) == (1000, 2, 4000)
+    record_outcomes({url: {"changes": "", "error": None}}, now=0)
+    assert row(url) == (1500, 0, 1500)
+
+
+def test_deferred_targets_come_back_soon(schedule):
+    url = 'http://a.onion'
+    ensure_schedules([url], base_interval=1000, now=0)
+    record_outcomes({url: {"error": "Deferred", "retry_after": 30}}, now=0)
+    assert row(url) == (1000, 1, 30)
+    record_outcomes({url: {"error": "Deferred", "retry_after": 30}}, now=0)
+    assert row(url) == (1000, 2, 60)
+    # Never later than the URL's own interval, never sooner than asked
+    for _ in range(10):
+        record_outcomes({url: {"error": "Deferred", "retry_after": 30}}, now=0)
+    assert row(url)[2] == 1000
+    record_outcomes({url: {"error": "Deferred", "retry_after": 5000}}, now=0)
+    assert row(url)[2] == 5000